@@ -1,24 +1,30 @@
-from fastapi import FastAPI, UploadFile, File
-import shutil
-import os
-from scripts.backend_service import analyze_image
+from fastapi import FastAPI, UploadFile, File, HTTPException
+from scripts.backend_service import analyze_upload_async, lifespan
+from scripts.worker_pool import AdmissionController, Overloaded
+from scripts.uploads import BodySizeLimitMiddleware, UploadTooLarge, read_upload
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(BodySizeLimitMiddleware)
 
-UPLOAD_FOLDER = "temp_uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+admission = AdmissionController()
 
 
 @app.post("/analyze/")
 async def analyze(file: UploadFile = File(...)):
 
-    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
+    try:
+        async with admission.admit():
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+            # Decoded straight from the request body, nothing written to disk
+            data = await read_upload(file)
 
-    result = analyze_image(file_path)
+            return await analyze_upload_async(data, explain="sync")
 
-    os.remove(file_path)
-
-    return result
\ No newline at end of file
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Upload too large.")
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
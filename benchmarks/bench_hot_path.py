@@ -0,0 +1,210 @@
+import os
+import sys
+import argparse
+import tempfile
+import numpy as np
+import warnings
+
+warnings.filterwarnings("ignore")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from benchmarks.harness import measure, save_results, load_results, compare, print_table, print_comparison
+from benchmarks.fake_llm import start_fake_llm
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+SIZES = [256, 512, 1024, 2048]
+BATCH_SIZES = [1, 64]
+IMAGE_EXTENSIONS = (".png", ".tif", ".tiff", ".jpg", ".jpeg", ".bmp", ".pgm")
+FIXTURE_DIR = os.path.join(BASE_DIR, "test_images")
+
+# Camera-original sized colour inputs, timed by the load stage only
+CAMERA_SIZE = (3000, 4000)
+CAMERA_FORMATS = (".jpg", ".png", ".tif")
+
+# ---------------------------------------------------
+# Inputs
+# ---------------------------------------------------
+def synthetic_image(size, seed=0):
+    import cv2
+
+    # Blurred noise: natural-ish texture, passes the texture check
+    noise = np.random.default_rng(seed).integers(0, 256, (size, size), dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (3, 3), 0)
+
+def write_image(folder, size):
+    import cv2
+
+    path = os.path.join(folder, f"synthetic_{size}.png")
+    cv2.imwrite(path, synthetic_image(size))
+    return path
+
+def write_camera_images(folder):
+    import cv2
+
+    # Three channels from shifted noise: colour, but still natural-ish
+    height, width = CAMERA_SIZE
+    color = cv2.merge([synthetic_image(max(height, width), seed)[:height, :width] for seed in range(3)])
+
+    inputs = {}
+    for ext in CAMERA_FORMATS:
+        path = os.path.join(folder, f"camera{ext}")
+        cv2.imwrite(path, color)
+        inputs[f"camera{ext}"] = path
+
+    return inputs
+
+def fixture_images(folder):
+    if not folder or not os.path.isdir(folder):
+        return []
+    return [
+        os.path.join(folder, name)
+        for name in sorted(os.listdir(folder))
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+# ---------------------------------------------------
+# Stages
+# ---------------------------------------------------
+def bench_loading(inputs, repeats):
+    from scripts.predict_and_explain import safe_load_image
+
+    return {
+        f"load/safe_load_image/{label}": measure(lambda p=path: safe_load_image(p), repeats)
+        for label, path in inputs.items()
+    }
+
+def bench_features(inputs, repeats):
+    import cv2
+    from scripts import feature_extract
+    from scripts.glcm import glcm_features
+
+    helpers = {
+        "histogram": feature_extract.histogram_features,
+        "lsb": feature_extract.lsb_features,
+        "pixel_diff": feature_extract.pixel_diff_features,
+        "residual": feature_extract.residual_features,
+        "frequency": feature_extract.frequency_features,
+        "glcm": glcm_features,
+        "fused_extractor": feature_extract.extract_features,
+        "fast_extractor": feature_extract.extract_fast_features
+    }
+
+    results = {}
+    for label, path in inputs.items():
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        for name, fn in helpers.items():
+            results[f"features/{name}/{label}"] = measure(lambda f=fn, i=img: f(i), repeats)
+
+    return results
+
+def bench_inference(inputs, repeats):
+    import cv2
+    from scripts.feature_extract import extract_features
+    from scripts.predict_and_explain import current_model
+
+    engine = current_model().engine
+
+    rows = np.asarray([
+        extract_features(cv2.imread(path, cv2.IMREAD_GRAYSCALE))
+        for path in inputs.values()
+    ])
+
+    results = {}
+    for batch in BATCH_SIZES:
+        X = np.resize(rows, (batch, rows.shape[1]))
+
+        results[f"inference/ensemble_proba/batch{batch}"] = measure(
+            lambda X=X: engine.log_weight * engine.log_proba(X) + engine.rf_weight * engine.rf_proba(X),
+            repeats, items=batch
+        )
+        results[f"inference/top_k_influence/batch{batch}"] = measure(
+            lambda X=X: engine.top_influences(X), repeats, items=batch
+        )
+
+    return results
+
+def bench_end_to_end(inputs, repeats):
+    from scripts import backend_service
+    from scripts.result_cache import ResultCache
+
+    results = {}
+    for label, path in inputs.items():
+
+        def run(path=path):
+            # Fresh cache every call: decode, features, model and LLM each time
+            backend_service.result_cache = ResultCache()
+            response = backend_service.analyze_image(path)
+            if response["status"] != "success":
+                raise RuntimeError(response["message"])
+
+        results[f"e2e/analyze_image/{label}"] = measure(run, repeats, warmup=1)
+
+    return results
+
+STAGES = {
+    "load": bench_loading,
+    "features": bench_features,
+    "inference": bench_inference,
+    "e2e": bench_end_to_end
+}
+
+# ---------------------------------------------------
+# Main
+# ---------------------------------------------------
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Time every stage of the detection hot path.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--images", default=FIXTURE_DIR, help="folder of fixture images to include")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--e2e-repeats", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="fake LLM delay per call (s)")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p50 slowdown before failing")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    # The LLM client reads its URL at import: start the stub first
+    server, url = start_fake_llm(latency=args.llm_latency)
+    os.environ["OLLAMA_URL"] = url
+
+    results = {}
+
+    with tempfile.TemporaryDirectory() as folder:
+
+        inputs = {str(size): write_image(folder, size) for size in args.sizes}
+        for path in fixture_images(args.images):
+            inputs[f"fixture:{os.path.basename(path)}"] = path
+
+        for stage in args.stages:
+            repeats = args.e2e_repeats if stage == "e2e" else args.repeats
+            stage_inputs = {**inputs, **write_camera_images(folder)} if stage == "load" else inputs
+            results.update(STAGES[stage](stage_inputs, repeats))
+
+    server.shutdown()
+
+    print_table(results)
+
+    if args.output:
+        save_results(args.output, results)
+        print(f"\nSaved: {args.output}")
+
+    if args.baseline:
+        rows = compare(results, load_results(args.baseline), args.tolerance, args.min_delta_ms)
+        print()
+        print_comparison(rows)
+
+        if any(row["regression"] for row in rows):
+            print(f"\nRegressions beyond {args.tolerance:.0%} p50 slowdown.")
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
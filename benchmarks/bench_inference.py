@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import warnings
+
+warnings.filterwarnings("ignore")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from scripts.inference_engine import LOG_WEIGHT, RF_WEIGHT, EnsembleEngine, reference_results
+from scripts.tree_shap import reference_tree_shap
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+BATCH_SIZES = [1, 64, 4096]
+REPEATS = 5
+
+# Results are compared with the per-row reference on this many rows
+CHECK_ROWS = 64
+
+# ---------------------------------------------------
+# Timing
+# ---------------------------------------------------
+def best_of(fn, repeats):
+
+    timings = []
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+def timed_once(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def sklearn_proba(log_model, rf_model, scaler, X):
+    log_prob = log_model.predict_proba(scaler.transform(X))[:, 1]
+    return LOG_WEIGHT * log_prob + RF_WEIGHT * rf_model.predict_proba(X)[:, 1]
+
+def reference_attribution(rf_model, X):
+
+    # The recursive TreeSHAP the per-row path runs, one tree at a time
+    for row in X:
+        phi = np.zeros(len(row))
+        for estimator in rf_model.estimators_:
+            reference_tree_shap(estimator.tree_, row, phi, 1.0 / len(rf_model.estimators_))
+
+def sample_rows(scaler, n, seed=0):
+
+    # Rows drawn around the training distribution the scaler saw
+    rng = np.random.default_rng(seed)
+    return scaler.mean_ + rng.standard_normal((n, len(scaler.mean_))) * scaler.scale_
+
+# ---------------------------------------------------
+# Main
+# ---------------------------------------------------
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Compare the compiled ensemble with the sklearn path.")
+    parser.add_argument("--models", default=os.path.join(BASE_DIR, "models"))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--check-rows", type=int, default=CHECK_ROWS)
+    args = parser.parse_args(argv)
+
+    engine = EnsembleEngine.load(args.models)
+
+    import joblib
+    log_model = joblib.load(os.path.join(args.models, "log_model.pkl"))
+    rf_model = joblib.load(os.path.join(args.models, "rf_model.pkl"))
+    scaler = joblib.load(os.path.join(args.models, "scaler.pkl"))
+    names = engine.feature_names
+
+    # Every number is measured on the full batch: probabilities best of
+    # --repeats, the slow reference attribution a single run
+    print(f"{'batch':>6} {'sklearn proba ms':>17} {'engine proba ms':>16} {'speedup':>8} "
+          f"{'reference SHAP ms':>18} {'engine SHAP ms':>15} {'speedup':>8}  identical")
+
+    for n in args.batch_sizes:
+        X = sample_rows(scaler, n)
+
+        sklearn = best_of(lambda: sklearn_proba(log_model, rf_model, scaler, X), args.repeats)
+        compiled = best_of(lambda: engine.predict(X, top_k=0), args.repeats)
+
+        reference_shap = timed_once(lambda: reference_attribution(rf_model, X))
+        engine_shap = best_of(lambda: engine.contributions(X), args.repeats)
+
+        rows = X[:args.check_rows]
+        identical = engine.results(rows) == reference_results(log_model, rf_model, scaler, names, rows)
+
+        print(f"{n:>6} {sklearn * 1e3:>17.2f} {compiled * 1e3:>16.2f} {sklearn / compiled:>7.1f}x "
+              f"{reference_shap * 1e3:>18.2f} {engine_shap * 1e3:>15.2f} {reference_shap / engine_shap:>7.1f}x  {identical}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the serving path should not need
+HEAVY_MODULES = ["pandas", "sklearn", "scipy.stats", "skimage", "tqdm", "requests", "joblib"]
+
+# ---------------------------------------------------
+# Child (one cold process)
+# ---------------------------------------------------
+def cold_start():
+
+    start = time.perf_counter()
+
+    sys.path.append(BASE_DIR)
+    from scripts import backend_service
+    imported = time.perf_counter()
+
+    bundle = backend_service.current_model()
+    loaded = time.perf_counter()
+
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    image = cv2.GaussianBlur(rng.integers(0, 256, (512, 512), dtype=np.uint8), (3, 3), 0)
+    backend_service.predict_keyed(cv2.imencode(".png", image)[1].tobytes())
+    predicted = time.perf_counter()
+
+    report = {
+        "import_s": imported - start,
+        "model_load_s": loaded - imported,
+        "first_prediction_s": predicted - start,
+        "compiled": isinstance(bundle.engine.node_value, np.memmap),
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules]
+    }
+
+    # For comparison: what unpickling the sklearn models costs cold
+    from scripts.model_registry import _engine_from_pickles, LEGACY_DIR
+    from scripts.feature_extract import FEATURE_NAMES
+
+    start = time.perf_counter()
+    _engine_from_pickles(LEGACY_DIR, {"feature_names": FEATURE_NAMES})
+    report["pickle_load_s"] = time.perf_counter() - start
+
+    print(json.dumps(report))
+
+# ---------------------------------------------------
+# Main
+# ---------------------------------------------------
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Import time and time-to-first-prediction of a fresh process.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return cold_start()
+
+    runs = []
+    for _ in range(args.repeats):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    # The first run may have compiled the engine; report medians
+    print(f"{'stage':<22} {'median s':>9} {'min s':>9}")
+    for key in ("import_s", "model_load_s", "first_prediction_s", "pickle_load_s"):
+        values = [run[key] for run in runs]
+        print(f"{key:<22} {statistics.median(values):>9.3f} {min(values):>9.3f}")
+
+    print(f"compiled engine: {runs[-1]['compiled']}")
+    print(f"heavy modules on the serving path: {', '.join(runs[-1]['heavy_modules']) or 'none'}")
+
+if __name__ == "__main__":
+    main()
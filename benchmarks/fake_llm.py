@@ -0,0 +1,68 @@
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------------------------------------------
+# Fake Ollama /api/generate (benchmarks without a real model)
+# ---------------------------------------------------
+REPLY = (
+    "The image shows statistical traces consistent with the prediction. "
+    "The listed features deviate from typical cover images. "
+    "These deviations drive the classifier's decision."
+)
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+
+    latency = 0.0
+    calls = 0
+
+    def do_POST(self):
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        type(self).calls += 1
+        time.sleep(self.latency)
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for word in REPLY.split(" "):
+                self.wfile.write(json.dumps({"response": word + " ", "done": False}).encode() + b"\n")
+            self.wfile.write(json.dumps({"response": "", "done": True}).encode() + b"\n")
+            return
+
+        payload = json.dumps({"response": REPLY, "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+def start_fake_llm(port=0, latency=0.0):
+
+    # Returns (server, url); server.shutdown() stops it
+    handler = type("Handler", (FakeOllamaHandler,), {"latency": latency, "calls": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama /api/generate endpoint")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each reply")
+    args = parser.parse_args()
+
+    server, url = start_fake_llm(args.port, args.latency)
+    print(f"Fake LLM listening on {url}")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import subprocess
+import numpy as np
+
+# ---------------------------------------------------
+# Timing
+# ---------------------------------------------------
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def measure(fn, repeats=30, warmup=3, items=1):
+
+    # items: how many images / rows one call processes (for throughput)
+    for _ in range(warmup):
+        fn()
+
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - start
+
+    return {
+        "repeats": repeats,
+        "items": items,
+        "mean_ms": float(timings.mean() * 1e3),
+        "p50_ms": float(np.percentile(timings, 50) * 1e3),
+        "p99_ms": float(np.percentile(timings, 99) * 1e3),
+        "min_ms": float(timings.min() * 1e3),
+        "throughput_per_s": float(items / np.median(timings)),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+# ---------------------------------------------------
+# Results
+# ---------------------------------------------------
+def environment():
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+def save_results(path, results):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+def compare(results, baseline, tolerance=0.10, min_delta_ms=0.1, metric="p50_ms"):
+
+    # Slower than baseline by more than tolerance (and by more than
+    # min_delta_ms, so sub-millisecond jitter is not flagged) -> regression
+    rows = []
+
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+
+        before = baseline[name][metric]
+        after = stats[metric]
+        change = (after - before) / before if before else 0.0
+
+        rows.append({
+            "stage": name,
+            "baseline": before,
+            "current": after,
+            "change": change,
+            "regression": change > tolerance and after - before > min_delta_ms
+        })
+
+    return rows
+
+def print_table(results):
+
+    print(f"{'stage':<44} {'p50 ms':>9} {'p99 ms':>9} {'items/s':>10} {'rss MB':>8}")
+    for name, stats in results.items():
+        print(
+            f"{name:<44} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+            f"{stats['throughput_per_s']:>10.1f} {stats['peak_rss_mb']:>8.1f}"
+        )
+
+def print_comparison(rows, metric="p50_ms"):
+
+    print(f"{'stage':<44} {'baseline':>9} {'current':>9} {'change':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['stage']:<44} {row['baseline']:>9.2f} {row['current']:>9.2f} {row['change']:>+7.1%}{flag}")
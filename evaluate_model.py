@@ -1,31 +1,243 @@
 import os
-import joblib
-import pandas as pd
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
+import sys
+import json
+import time
+import argparse
+import numpy as np
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
 
-log_model = joblib.load(os.path.join(BASE_DIR, "models", "log_model.pkl"))
-rf_model = joblib.load(os.path.join(BASE_DIR, "models", "rf_model.pkl"))
-scaler = joblib.load(os.path.join(BASE_DIR, "models", "scaler.pkl"))
+from scripts.evaluation import (
+    WEIGHT_GRID, THRESHOLD_GRID, OBJECTIVES,
+    model_scores, sweep, recommend, curves, breakdown
+)
+from scripts.model_registry import REGISTRY_DIR, LEGACY_DIR, ModelRegistry, read_manifest, publish_bundle
 
-# Load dataset features
-data = pd.read_csv(os.path.join(BASE_DIR, "features", "dataset_features.csv"))
+STORE_DIR = os.path.join(BASE_DIR, "features", "store")
 
-X = data.iloc[:, :-1]
-y = data.iloc[:, -1]
+# ---------------------------------------------------
+# Data
+# ---------------------------------------------------
+def load_dataset(feature_names, csv_path=None, store_dir=STORE_DIR):
 
-X_scaled = scaler.transform(X)
+    # Feature store rows carry method / payload; a CSV may have them as columns.
+    # Either way, columns are picked by name in the serving model's order
+    if not csv_path:
+        from scripts.feature_store import FeatureStore
+        X, y, index = FeatureStore(store_dir, feature_names).load(latest=True)
+        groups = {
+            "method": [row.get("method") for row in index],
+            "payload": [row.get("payload") for row in index]
+        }
+        return np.asarray(X, dtype=np.float64), np.asarray(y, dtype=int), groups
 
-log_prob = log_model.predict_proba(X_scaled)[:, 1]
-rf_prob = rf_model.predict_proba(X)[:, 1]
+    import pandas as pd
+    data = pd.read_csv(csv_path)
 
-final_prob = 0.6 * log_prob + 0.4 * rf_prob
-y_pred = y_pred = (final_prob > 0.4).astype(int)
+    missing = [name for name in list(feature_names) + ["label"] if name not in data.columns]
+    if missing:
+        raise ValueError(f"{csv_path} lacks columns: {', '.join(missing)}")
 
-print("Accuracy:", accuracy_score(y, y_pred))
-print("Precision:", precision_score(y, y_pred))
-print("Recall:", recall_score(y, y_pred))
-print("F1 Score:", f1_score(y, y_pred))
-print("Confusion Matrix:\n", confusion_matrix(y, y_pred))
- 
\ No newline at end of file
+    groups = {
+        name: [None if pd.isna(v) else v for v in data[name]]
+        for name in ("method", "payload") if name in data.columns
+    }
+    return data[list(feature_names)].to_numpy(dtype=np.float64), data["label"].to_numpy(dtype=int), groups
+
+def held_out(X):
+
+    # The rows train_models.py keeps out of every fit (same hash split);
+    # the rest are in-sample for the serving models
+    from scripts.train_models import row_hashes, TEST_FRACTION
+    return (row_hashes(X) >> np.uint64(32)) % np.uint64(TEST_FRACTION) == 0
+
+def model_source(registry):
+
+    # Directory holding the pickles of the bundle being evaluated
+    manifest = read_manifest(registry.registry_dir)
+    if manifest is not None:
+        return os.path.join(registry.registry_dir, manifest["active"])
+    return registry.legacy_dir
+
+# ---------------------------------------------------
+# Report
+# ---------------------------------------------------
+def _curve_json(curve, points=200):
+
+    # Thin long curves; the AUC / AP are computed on the full curve
+    step = max(1, len(curve["fpr"]) // points)
+    keep = lambda a: [round(float(v), 6) for v in np.r_[a[::step], a[-1:]]]
+
+    return {
+        "roc_auc": curve["roc_auc"],
+        "average_precision": curve["average_precision"],
+        "fpr": keep(curve["fpr"]),
+        "tpr": keep(curve["tpr"]),
+        "precision": keep(curve["precision"]),
+        "recall": keep(curve["recall"])
+    }
+
+def evaluate(engine, X, y, groups=None, weights=WEIGHT_GRID, thresholds=THRESHOLD_GRID,
+             objective="f1", max_fpr=None):
+
+    start = time.perf_counter()
+    log_prob, rf_prob = model_scores(engine, X)
+    scored = time.perf_counter()
+
+    result = sweep(log_prob, rf_prob, y, weights, thresholds)
+    best = recommend(result, objective, max_fpr, prefer=(engine.log_weight, engine.threshold))
+    swept = time.perf_counter()
+
+    configs = {
+        "current": {"log_weight": engine.log_weight, "rf_weight": engine.rf_weight, "threshold": engine.threshold},
+        "recommended": best
+    }
+
+    report = {
+        "rows": int(len(y)),
+        "positives": int(np.sum(y)),
+        "grid": {"weights": len(result["weights"]), "thresholds": len(result["thresholds"])},
+        "seconds": {"scoring": scored - start, "sweep": swept - scored},
+        "auc_by_weight": {f"{w:g}": float(a) for w, a in zip(result["weights"], result["auc"])},
+        "configs": {}
+    }
+
+    for name, config in configs.items():
+
+        scores = config["log_weight"] * log_prob + config["rf_weight"] * rf_prob
+        predicted = scores > config["threshold"]
+
+        entry = {
+            "log_weight": config["log_weight"],
+            "rf_weight": config["rf_weight"],
+            "threshold": config["threshold"],
+            "confusion_matrix": [
+                [int(np.sum(~predicted & (y == 0))), int(np.sum(predicted & (y == 0)))],
+                [int(np.sum(~predicted & (y == 1))), int(np.sum(predicted & (y == 1)))]
+            ],
+            "curves": _curve_json(curves(scores, y)),
+            "breakdown": {
+                key: breakdown(scores, y, values, config["threshold"])
+                for key, values in (groups or {}).items()
+            }
+        }
+        entry.update(_exact_metrics(y, predicted))
+        report["configs"][name] = entry
+
+    report["recommended"] = best
+    return report
+
+def _exact_metrics(y, predicted):
+
+    # Counted directly: the serving config may sit between grid points
+    tp = int(np.sum(predicted & (y == 1)))
+    fp = int(np.sum(predicted & (y == 0)))
+    fn = int(np.sum(~predicted & (y == 1)))
+    tn = int(np.sum(~predicted & (y == 0)))
+
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+
+    return {
+        "accuracy": (tp + tn) / max(len(y), 1),
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "fpr": fp / (fp + tn) if fp + tn else 0.0
+    }
+
+def print_report(report):
+
+    print(f"Rows: {report['rows']} ({report['positives']} stego)")
+    print(
+        f"Sweep: {report['grid']['weights']} weights x {report['grid']['thresholds']} thresholds "
+        f"in {report['seconds']['sweep'] * 1e3:.1f} ms (scoring {report['seconds']['scoring'] * 1e3:.1f} ms)"
+    )
+
+    for name, entry in report["configs"].items():
+        print(f"\n{name.title()} config: log {entry['log_weight']:g} / rf {entry['rf_weight']:g}, threshold {entry['threshold']:g}")
+        print("Accuracy:", round(entry["accuracy"], 4))
+        print("Precision:", round(entry["precision"], 4))
+        print("Recall:", round(entry["recall"], 4))
+        print("F1 Score:", round(entry["f1"], 4))
+        print("FPR:", round(entry["fpr"], 4))
+        print("ROC AUC:", round(entry["curves"]["roc_auc"], 4), " AP:", round(entry["curves"]["average_precision"], 4))
+        print("Confusion Matrix:\n", np.array(entry["confusion_matrix"]))
+
+        for key, groups in entry["breakdown"].items():
+            print(f"\n  {'by ' + key:<16} {'count':>6} {'detected':>9} {'AUC':>7}")
+            for group, stats in groups.items():
+                print(f"  {group:<16} {stats['count']:>6} {stats['detection_rate']:>9.3f} {stats['auc']:>7.3f}")
+
+# ---------------------------------------------------
+# Main
+# ---------------------------------------------------
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Evaluate the serving ensemble and sweep blend weights / thresholds.")
+    parser.add_argument("--store", default=STORE_DIR, help="feature store directory (rows carry method / payload)")
+    parser.add_argument("--csv", help="evaluate on a features CSV instead of the store")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    parser.add_argument("--weights", type=int, default=len(WEIGHT_GRID), help="number of log weights in [0, 1]")
+    parser.add_argument("--thresholds", type=int, default=len(THRESHOLD_GRID), help="number of thresholds in (0, 1)")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="f1")
+    parser.add_argument("--max-fpr", type=float, help="only recommend configs at or below this false positive rate")
+    parser.add_argument("--output", help="write the full report (curves, breakdowns, sweep) as JSON")
+    parser.add_argument("--apply", action="store_true", help="publish the recommended config as a new bundle and activate it")
+    parser.add_argument("--in-sample", action="store_true", help="evaluate on every row, including the training rows (not with --apply)")
+    args = parser.parse_args(argv)
+
+    if args.apply and args.in_sample:
+        parser.error("--apply needs held-out rows; drop --in-sample")
+
+    registry = ModelRegistry(args.registry, LEGACY_DIR)
+    bundle = registry.current()
+
+    try:
+        X, y, groups = load_dataset(bundle.feature_names, args.csv, args.store)
+    except ValueError as e:
+        print("EVALUATION ERROR:", str(e))
+        return 1
+
+    if not args.in_sample:
+        test = held_out(X)
+        X, y = X[test], y[test]
+        groups = {key: [v for v, t in zip(values, test) if t] for key, values in groups.items()}
+
+    if not len(y):
+        print("EVALUATION ERROR:", f"no {'' if args.in_sample else 'held-out '}rows in {args.csv or args.store}")
+        return 1
+
+    report = evaluate(
+        bundle.engine, X, y, groups,
+        weights=np.round(np.linspace(0.0, 1.0, args.weights), 4),
+        thresholds=np.round(np.linspace(0.0, 1.0, args.thresholds + 2)[1:-1], 4),
+        objective=args.objective,
+        max_fpr=args.max_fpr
+    )
+    report["model_version"] = bundle.version
+    report["rows_used"] = "all" if args.in_sample else "held_out"
+
+    print(f"Model version: {bundle.version}")
+    print("Evaluated on:", "all rows (in-sample)" if args.in_sample else "held-out rows")
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved: {args.output}")
+
+    if args.apply:
+        best = report["recommended"]
+        version = publish_bundle(
+            model_source(registry), bundle.feature_names, args.registry,
+            log_weight=best["log_weight"], rf_weight=best["rf_weight"], threshold=best["threshold"],
+            extra={"evaluation": {
+                **best, "rows": report["rows"], "rows_used": report["rows_used"], "evaluated_version": bundle.version
+            }}
+        )
+        print(f"\nPublished and activated {version}")
+
+if __name__ == "__main__":
+    main()
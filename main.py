@@ -1,10 +1,33 @@
-from fastapi import FastAPI, UploadFile, File
-from fastapi.middleware.cors import CORSMiddleware
-import shutil
 import os
-from scripts.backend_service import analyze_image
+import hmac
+from typing import List, Optional
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException
+from fastapi.responses import StreamingResponse, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from scripts.backend_service import (
+    analyze_upload_async, analyze_batch_async, analyze_tiled_async, read_archive, lifespan, explanation_jobs,
+    model_status, reload_models, ArchiveTooLarge, MAX_BATCH_IMAGES
+)
+from scripts.explanation_jobs import webhook_allowed
+from scripts.worker_pool import AdmissionController, Overloaded
+from scripts.uploads import (
+    BodySizeLimitMiddleware, UploadRoute, UploadTooLarge, read_upload, MAX_BATCH_UPLOAD_BYTES, MAX_TILED_UPLOAD_BYTES
+)
+from scripts.tiling import TILE_SIZE
+from scripts.metrics import metrics, Timings, REJECTED, CONTENT_TYPE
+
+app = FastAPI(lifespan=lifespan)
+
+# Larger in-memory spool for multipart uploads, on this app's routes only
+app.router.route_class = UploadRoute
 
-app = FastAPI()
+# Rejects oversized bodies while they stream in (413). Added before CORS,
+# so it sits inside it and its 413s carry the CORS headers too
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    path_limits={"/analyze/batch": MAX_BATCH_UPLOAD_BYTES, "/analyze/tiled": MAX_TILED_UPLOAD_BYTES}
+)
 
 # ✅ CORS Middleware (Required for frontend integration)
 app.add_middleware(
@@ -15,23 +38,204 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-UPLOAD_FOLDER = "temp_uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+admission = AdmissionController()
+
+metrics.gauge("stego_requests_in_flight", "Requests holding a worker slot.", function=lambda: admission.in_flight)
+metrics.gauge("stego_requests_queued", "Requests waiting for a worker slot.", function=lambda: admission.waiting)
+
+def overloaded_response(e):
+    REJECTED.inc(status=e.status_code)
+    return HTTPException(
+        status_code=e.status_code,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def finish(response, timer, endpoint, timings=False):
+
+    # Every request feeds the histograms; the per-request breakdown
+    # (milliseconds) is only added to the body when asked for
+    timer.record(endpoint, response.get("status", "success"))
+    if timings:
+        response["timings"] = timer.as_dict()
+    return response
 
 @app.get("/")
 def root():
     return {"message": "Stego Detection API Running"}
 
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
 @app.post("/analyze/")
-async def analyze(file: UploadFile = File(...)):
+async def analyze(
+    file: UploadFile = File(...),
+    explain: str = "async",
+    callback_url: Optional[str] = Form(None),
+    timings: bool = False
+):
+
+    timer = Timings()
+
+    # async: verdict now + explanation job, sync: wait for the LLM, none: skip it
+    if explain not in ("async", "sync", "none"):
+        raise HTTPException(status_code=422, detail="explain must be one of: async, sync, none.")
+
+    if callback_url and not webhook_allowed(callback_url):
+        raise HTTPException(status_code=422, detail="callback_url is not allowed.")
+
+    try:
+        async with admission.admit():
+            # Everything before admission was spent waiting for a slot
+            timer.add("queue", timer.total())
+
+            # Decoded straight from the request body, nothing written to disk
+            with timer.stage("upload"):
+                data = await read_upload(file)
+
+            response = await analyze_upload_async(data, explain=explain, callback_url=callback_url, timings=timer)
+            return finish(response, timer, "analyze", timings)
+
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Upload too large.")
+    except Overloaded as e:
+        raise overloaded_response(e)
+
+@app.post("/analyze/tiled")
+async def analyze_tiled(
+    file: UploadFile = File(...),
+    stride: int = TILE_SIZE,
+    explain: str = "none",
+    callback_url: Optional[str] = Form(None),
+    timings: bool = False
+):
+
+    timer = Timings()
+
+    # Every 512x512 tile is scored (stride < 512 overlaps them) and the
+    # response carries an aggregate verdict plus a per-tile heatmap
+    if explain not in ("async", "sync", "none"):
+        raise HTTPException(status_code=422, detail="explain must be one of: async, sync, none.")
+
+    if stride < 1:
+        raise HTTPException(status_code=422, detail="stride must be positive.")
+
+    if callback_url and not webhook_allowed(callback_url):
+        raise HTTPException(status_code=422, detail="callback_url is not allowed.")
+
+    try:
+        async with admission.admit():
+            timer.add("queue", timer.total())
+
+            with timer.stage("upload"):
+                data = await read_upload(file, MAX_TILED_UPLOAD_BYTES)
+
+            response = await analyze_tiled_async(
+                data, stride=stride, explain=explain, callback_url=callback_url, timings=timer
+            )
+            return finish(response, timer, "tiled", timings)
+
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Upload too large.")
+    except Overloaded as e:
+        raise overloaded_response(e)
+
+@app.post("/analyze/batch")
+async def analyze_many(
+    files: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None),
+    explain: bool = False,
+    timings: bool = False
+):
+
+    timer = Timings()
+
+    try:
+        async with admission.admit():
+            timer.add("queue", timer.total())
+
+            items = []
+
+            with timer.stage("upload"):
+                for upload in files or []:
+                    items.append((upload.filename, await upload.read()))
+
+                if archive is not None:
+                    # Files already sent count towards the image limit
+                    limit = max(MAX_BATCH_IMAGES - len(items), 0)
+                    try:
+                        items.extend(await run_in_threadpool(lambda: list(read_archive(archive.file, max_images=limit))))
+                    except ArchiveTooLarge as e:
+                        raise HTTPException(status_code=413, detail=str(e))
+                    except Exception as e:
+                        raise HTTPException(status_code=400, detail=f"Unreadable archive: {str(e)}")
+
+            if not items:
+                raise HTTPException(status_code=400, detail="No images provided.")
+
+            try:
+                response = await analyze_batch_async(items, explain=explain, timings=timer)
+                return finish(response, timer, "batch", timings)
+            except ValueError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+
+    except Overloaded as e:
+        raise overloaded_response(e)
+
+
+# ---------------------------------------------------
+# Explanation Jobs
+# ---------------------------------------------------
+@app.get("/explanations/{job_id}")
+def explanation_status(job_id: str):
+
+    job = explanation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired explanation job.")
+
+    return job.to_dict()
+
+@app.get("/explanations/{job_id}/stream")
+def explanation_stream(job_id: str):
+
+    if explanation_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired explanation job.")
+
+    return StreamingResponse(
+        explanation_jobs.stream(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+# ---------------------------------------------------
+# Model Admin
+# ---------------------------------------------------
+# Disabled unless STEGO_ADMIN_TOKEN is set; callers send it as X-Admin-Token
+ADMIN_TOKEN = os.environ.get("STEGO_ADMIN_TOKEN", "")
 
-    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
+def check_admin(token):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled.")
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+@app.get("/admin/model")
+def model_info(x_admin_token: Optional[str] = Header(None)):
+    check_admin(x_admin_token)
+    return model_status()
 
-    result = analyze_image(file_path)
+@app.post("/admin/reload")
+async def model_reload(version: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
 
-    os.remove(file_path)
+    # No version: pick up a manifest / model file change now.
+    # With a version: validate that bundle, then make it the active one
+    check_admin(x_admin_token)
 
-    return result
\ No newline at end of file
+    try:
+        return await reload_models(version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Bundle failed to load: {str(e)}")
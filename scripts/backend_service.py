@@ -1,30 +1,549 @@
 import os
-from scripts.predict_and_explain import predict_image, build_prompt, generate_explanation
+import time
+import asyncio
+import tarfile
+import functools
+import zipfile
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from scripts.predict_and_explain import (
+    predict_image, build_prompt, generate_explanation,
+    decode_image_bytes, image_features, predict_features, fast_decision, score_image,
+    current_model, model_version, registry
+)
+from scripts.result_cache import ResultCache, pixel_key, upload_key
+from scripts.explanation_jobs import ExplanationJobs
+from scripts.explanation_cache import ExplanationCache, explanation_key
+from scripts.llm_service import generate_explanation_async, close_client, LLM_FAILED_MESSAGE
+from scripts.worker_pool import WORKERS, get_executor, run_in_pool, shutdown_executor
+from scripts.shm_ring import get_ring, current_ring, close_ring, slots_in_use, attach
+from scripts.tiling import TILE_SIZE, analyze_tiles
+from scripts.model_registry import ModelBundle, activate, read_manifest
+from scripts.metrics import metrics, Timings, timed, record_cache, record_decision
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-def analyze_image(image_path):
+FEATURE_THREADS = int(os.environ.get("STEGO_FEATURE_THREADS", os.cpu_count() or 1))
+MAX_BATCH_IMAGES = int(os.environ.get("STEGO_MAX_BATCH_IMAGES", 5000))
+
+# Uncompressed limits for archive uploads, checked from the headers
+# before a member is read: a small zip / tar bomb never gets inflated
+MAX_MEMBER_BYTES = int(os.environ.get("STEGO_MAX_MEMBER_BYTES", 256 * 1024 * 1024))
+MAX_ARCHIVE_BYTES = int(os.environ.get("STEGO_MAX_ARCHIVE_BYTES", 2 * 1024 * 1024 * 1024))
+BATCH_CHUNK_SIZE = int(os.environ.get("STEGO_BATCH_CHUNK_SIZE", 256))
+
+result_cache = ResultCache()
+explanation_cache = ExplanationCache()
+explanation_jobs = ExplanationJobs(cache=explanation_cache)
+
+# Read at scrape time, nothing to keep up to date on the request path
+metrics.gauge("stego_result_cache_entries", "Entries in the in-memory result cache.",
+              function=lambda: result_cache.stats()["entries"])
+metrics.gauge("stego_result_cache_bytes", "Bytes held by the in-memory result cache.",
+              function=lambda: result_cache.stats()["bytes"])
+metrics.gauge("stego_explanation_jobs_inflight", "LLM generations currently running or queued.",
+              function=lambda: explanation_cache.stats()["inflight"])
+metrics.gauge("stego_shm_slots_in_use", "Shared memory image slots handed to workers.",
+              function=slots_in_use)
+
+def _success_response(result, explanation, cached=False):
+    return {
+        "status": "success",
+        "prediction": result["prediction"],
+        "confidence": result["confidence"],
+        "top_features": result["top_features"],
+        "llm_explanation": explanation,
+        "model_version": result.get("model_version"),
+        "decided_by": result.get("decided_by", "full"),
+        "cached": cached
+    }
+
+def _read_bytes(image_path):
+    if not os.path.exists(image_path):
+        raise ValueError("Image file does not exist.")
+    with open(image_path, "rb") as f:
+        return f.read()
+
+def _cache_entry(features, result, explanation):
+
+    # Failed LLM calls are not cached, the next hit retries the explanation
+    return {
+        "features": [float(v) for v in features],
+        "result": result,
+        "explanation": explanation if explanation != LLM_FAILED_MESSAGE else None
+    }
+
+def analyze_image(image_path, timings=None):
     try:
-        # Step 1: Model Prediction
-        result = predict_image(image_path)
+        with timed(timings, "read"):
+            data = _read_bytes(image_path)
 
-        # Step 2: Build Structured Prompt
-        prompt = build_prompt(result)
+        bundle = current_model()
+        upload = upload_key(data, bundle.version)
 
-        # Step 3: Call Local LLM
-        explanation = generate_explanation(prompt)
+        # Step 1: Cache lookup (byte-identical upload, then identical pixels)
+        with timed(timings, "cache"):
+            key = result_cache.resolve(upload)
+            entry = result_cache.get(key) if key is not None else None
+
+        if entry is None:
+            with timed(timings, "decode"):
+                img = decode_image_bytes(data)
+            key = pixel_key(img, bundle.version)
+            result_cache.alias(upload, key)
+            entry = result_cache.get(key)
+
+        # Step 2: Model Prediction (fast stage first, full ensemble if unsure)
+        if entry is None:
+            features, result = score_image(img, bundle, timings)
+            entry = _cache_entry(features, result, None)
+            record_decision(result)
+            cached = False
+        else:
+            cached = True
+
+        record_cache(cached)
+        result = entry["result"]
+
+        # Step 3: Build Structured Prompt + Call Local LLM
+        explanation = entry["explanation"]
+        if explanation is None:
+            with timed(timings, "llm"):
+                explanation = generate_explanation(build_prompt(result))
+            result_cache.put(key, _cache_entry(entry["features"], result, explanation))
 
         # Step 4: Return Final Response
+        return _success_response(result, explanation, cached=cached)
+
+    except Exception as e:
         return {
+            "status": "error",
+            "message": str(e)
+        }
+
+# ---------------------------------------------------
+# BATCH ANALYSIS
+# ---------------------------------------------------
+class ArchiveTooLarge(ValueError):
+    pass
+
+def read_archive(fileobj, max_images=MAX_BATCH_IMAGES, max_member_bytes=MAX_MEMBER_BYTES, max_total_bytes=MAX_ARCHIVE_BYTES):
+
+    # Limits are enforced while iterating, so reading stops at the first
+    # member over budget instead of after the whole archive is in memory
+    count = 0
+    total = 0
+
+    def admit(name, size):
+        nonlocal count, total
+        count += 1
+        total += size
+        if count > max_images:
+            raise ArchiveTooLarge(f"Archive holds more than {max_images} images.")
+        if size > max_member_bytes:
+            raise ArchiveTooLarge(f"{name} is {size} bytes uncompressed (limit {max_member_bytes}).")
+        if total > max_total_bytes:
+            raise ArchiveTooLarge(f"Archive exceeds {max_total_bytes} bytes uncompressed.")
+
+    # Zip needs random access, tar can be read as a stream. zipfile never
+    # returns more than the declared file_size (the CRC check fails first)
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                admit(info.filename, info.file_size)
+                yield info.filename, archive.read(info)
+        return
+
+    fileobj.seek(0)
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            admit(member.name, member.size)
+            yield member.name, archive.extractfile(member).read()
+
+def _batch_features(item, bundle=None):
+
+    # -> (name, features, error, result). Images the fast stage settles
+    # come back with their result and skip the batched model call
+    name, data = item
+    bundle = bundle or current_model()
+
+    try:
+        img = decode_image_bytes(data)
+
+        decided = fast_decision(img, bundle)
+        if decided is not None:
+            return name, decided[0], None, decided[1]
+
+        return name, image_features(img, bundle), None, None
+    except Exception as e:
+        return name, None, str(e), None
+
+def score_batch(items, threads=1):
+
+    # One bundle for the whole batch, even if a reload lands meanwhile
+    bundle = current_model()
+    extract = functools.partial(_batch_features, bundle=bundle)
+
+    # Step 1: Decode + extract features (in parallel when threads > 1)
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            extracted = list(pool.map(extract, items))
+    else:
+        extracted = [extract(item) for item in items]
+
+    # Step 2: Score every undecided image with a single model call
+    valid = [features for _, features, error, decided in extracted if error is None and decided is None]
+
+    try:
+        predictions = iter(predict_features(valid, bundle)) if valid else iter(())
+        batch_error = None
+    except Exception as e:
+        predictions = None
+        batch_error = str(e)
+
+    # Step 3: Per-image results, errors reported alongside successes
+    results = []
+
+    for name, features, error, decided in extracted:
+
+        if error is None and decided is None and batch_error is not None:
+            error = batch_error
+
+        if error is not None:
+            results.append({
+                "filename": name,
+                "status": "error",
+                "message": error
+            })
+            continue
+
+        result = decided if decided is not None else next(predictions)
+        results.append({
+            "filename": name,
             "status": "success",
             "prediction": result["prediction"],
             "confidence": result["confidence"],
             "top_features": result["top_features"],
-            "llm_explanation": explanation
+            "model_version": result["model_version"],
+            "decided_by": result["decided_by"]
+        })
+
+    return results
+
+def _batch_response(results):
+    return {
+        "status": "success",
+        "count": len(results),
+        "failed": sum(1 for r in results if r["status"] == "error"),
+        "results": results
+    }
+
+def _check_batch_size(items):
+    if len(items) > MAX_BATCH_IMAGES:
+        raise ValueError(f"Batch exceeds {MAX_BATCH_IMAGES} images.")
+
+def analyze_batch(items, explain=False):
+
+    items = list(items)
+    _check_batch_size(items)
+
+    results = score_batch(items, threads=FEATURE_THREADS)
+
+    for result in results:
+        if result["status"] == "success":
+            record_decision(result)
+
+    if explain:
+        for result in results:
+            if result["status"] == "success":
+                result["llm_explanation"] = generate_explanation(build_prompt(result))
+
+    return _batch_response(results)
+
+# ---------------------------------------------------
+# ASYNC ANALYSIS (CPU work in the process pool)
+# ---------------------------------------------------
+def predict_keyed(data):
+
+    # Worker task: decode, key and score one upload. Stage times travel
+    # back with the result; metrics only live in the API process
+    bundle = current_model()
+    timings = Timings()
+
+    with timings.stage("decode"):
+        img = decode_image_bytes(data)
+
+    features, result = score_image(img, bundle, timings)
+
+    return pixel_key(img, bundle.version), features, result, timings.stages
+
+def score_slot(descriptor, index, shape):
+
+    # Worker task: score the prepared image the API process left in a
+    # shared memory slot. The pixels are read in place; the feature
+    # vector goes back through the slot's result area
+    ring = attach(descriptor)
+    bundle = current_model()
+    timings = Timings()
+
+    features, result = score_image(ring.image(index, shape), bundle, timings)
+    ring.result(index)[:len(features)] = features
+
+    return len(features), result, timings.stages
+
+async def _score_shared(ring, img, timings=None):
+
+    # Only the slot descriptor and the small result dict are pickled
+    start = time.perf_counter()
+
+    async with ring.slot() as index:
+        dispatched = time.perf_counter()
+        if timings is not None:
+            timings.add("slot_wait", dispatched - start)
+
+        ring.image(index, img.shape)[:] = img
+        task = asyncio.ensure_future(run_in_pool(score_slot, ring.describe(), index, img.shape))
+
+        try:
+            count, result, stages = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            ring.release_after(index, task)
+            raise
+
+        features = ring.result(index)[:count].tolist()
+
+    return features, result, stages, time.perf_counter() - dispatched
+
+async def _score_pickled(data):
+
+    start = time.perf_counter()
+    key, features, result, stages = await run_in_pool(predict_keyed, data)
+
+    return key, features, result, stages, time.perf_counter() - start
+
+async def explain_result_async(result):
+
+    # Similar images share one cached / coalesced generation
+    prompt = build_prompt(result)
+    return await explanation_cache.generate(
+        explanation_key(result),
+        lambda: generate_explanation_async(prompt)
+    )
+
+async def score_upload_async(data, timings=None):
+
+    version = model_version()
+    upload = upload_key(data, version)
+
+    # Byte-identical re-upload: no decode, no features
+    with timed(timings, "cache"):
+        key = result_cache.resolve(upload)
+        entry = result_cache.get(key) if key is not None else None
+
+    if entry is not None:
+        record_cache(True)
+        return key, entry, True
+
+    ring = current_ring()
+
+    if ring is None:
+        key, features, result, stages, elapsed = await _score_pickled(data)
+    else:
+        # Decode here (cv2 releases the GIL), so identical pixels are
+        # answered from the cache without a worker round trip
+        with timed(timings, "decode"):
+            img = await asyncio.to_thread(decode_image_bytes, data)
+        key = pixel_key(img, version)
+
+        entry = result_cache.get(key)
+        if entry is not None:
+            result_cache.alias(upload, key)
+            record_cache(True)
+            return key, entry, True
+
+        if ring.fits(img):
+            features, result, stages, elapsed = await _score_shared(ring, img, timings)
+            if result["model_version"] != version:
+                key = pixel_key(img, result["model_version"])
+        else:
+            key, features, result, stages, elapsed = await _score_pickled(data)
+
+    # Whatever the worker didn't spend computing was queueing and IPC
+    if timings is not None:
+        timings.merge(stages)
+        timings.add("pool_wait", max(0.0, elapsed - sum(stages.values())))
+
+    # A worker still finishing its switch to a new bundle scored this with
+    # another version: don't file it under this version's upload key
+    if result["model_version"] == version:
+        result_cache.alias(upload, key)
+
+    # Same pixels from a differently encoded file
+    entry = result_cache.get(key)
+    if entry is not None:
+        record_cache(True)
+        return key, entry, True
+
+    entry = _cache_entry(features, result, None)
+    result_cache.put(key, entry)
+    record_cache(False)
+    record_decision(result)
+
+    return key, entry, False
+
+async def analyze_upload_async(data, explain="async", callback_url=None, timings=None):
+    try:
+        key, entry, cached = await score_upload_async(data, timings)
+
+        result = entry["result"]
+        explanation = entry["explanation"]
+
+        def remember(text):
+            result_cache.put(key, _cache_entry(entry["features"], result, text))
+
+        # Wait for the prose (old behaviour)
+        if explanation is None and explain == "sync":
+            with timed(timings, "llm"):
+                explanation = await explain_result_async(result)
+            remember(explanation)
+
+        response = _success_response(result, explanation, cached=cached)
+
+        # Verdict now, prose later: poll, SSE stream or webhook
+        if explanation is None and explain == "async":
+            job = explanation_jobs.submit(
+                build_prompt(result),
+                key=explanation_key(result),
+                callback_url=callback_url,
+                context={
+                    "prediction": result["prediction"],
+                    "confidence": result["confidence"],
+                    "top_features": result["top_features"]
+                },
+                on_complete=remember
+            )
+            response["explanation_job"] = job.describe()
+
+        return response
+
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": str(e)
         }
 
+async def analyze_batch_async(items, explain=False, timings=None):
+
+    items = list(items)
+    _check_batch_size(items)
+
+    # One chunk per worker so every core scores its share with one model call
+    chunk_size = min(max(1, -(-len(items) // WORKERS)), BATCH_CHUNK_SIZE)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    with timed(timings, "scoring"):
+        parts = await asyncio.gather(*(run_in_pool(score_batch, chunk) for chunk in chunks))
+    results = [result for part in parts for result in part]
+
+    for result in results:
+        if result["status"] == "success":
+            record_decision(result)
+
+    if explain:
+        successes = [r for r in results if r["status"] == "success"]
+        with timed(timings, "llm"):
+            explanations = await asyncio.gather(
+                *(explain_result_async(r) for r in successes)
+            )
+        for result, explanation in zip(successes, explanations):
+            result["llm_explanation"] = explanation
+
+    return _batch_response(results)
+
+# ---------------------------------------------------
+# TILED ANALYSIS (whole image instead of the center crop)
+# ---------------------------------------------------
+def predict_tiled(data, stride=TILE_SIZE):
+
+    bundle = current_model()
+    result = analyze_tiles(data, bundle.engine, stride=stride)
+    result["model_version"] = bundle.version
+    result["decided_by"] = "full"
+
+    return result
+
+async def analyze_tiled_async(data, stride=TILE_SIZE, explain="none", callback_url=None, timings=None):
+    try:
+        with timed(timings, "tiles"):
+            result = await run_in_pool(predict_tiled, data, stride)
+
+        response = {"status": "success", **result, "llm_explanation": None}
+
+        if explain == "sync":
+            with timed(timings, "llm"):
+                response["llm_explanation"] = await explain_result_async(result)
+
+        elif explain == "async":
+            job = explanation_jobs.submit(
+                build_prompt(result),
+                key=explanation_key(result),
+                callback_url=callback_url,
+                context={
+                    "prediction": result["prediction"],
+                    "confidence": result["confidence"],
+                    "top_features": result["top_features"]
+                }
+            )
+            response["explanation_job"] = job.describe()
+
+        return response
+
     except Exception as e:
         return {
             "status": "error",
             "message": str(e)
-        }
\ No newline at end of file
+        }
+
+# ---------------------------------------------------
+# MODEL REGISTRY
+# ---------------------------------------------------
+def model_status():
+    manifest = read_manifest(registry.registry_dir)
+    return {
+        "active": model_version(),
+        "registry": manifest is not None,
+        "versions": manifest["versions"] if manifest else {}
+    }
+
+async def reload_models(version=None):
+
+    # Make sure the bundle loads before any worker is pointed at it
+    if version is not None:
+        path = os.path.join(registry.registry_dir, version)
+        if not os.path.isdir(path):
+            raise ValueError(f"Unknown model version: {version}")
+        await asyncio.to_thread(ModelBundle.load, path, version)
+        activate(version, registry.registry_dir)
+
+    # Workers notice the manifest within STEGO_MODEL_RELOAD_INTERVAL and
+    # load the new bundle beside the one serving their current requests
+    registry.active_version(force=True)
+    return model_status()
+
+@asynccontextmanager
+async def lifespan(app):
+
+    # Map the model before forking: workers inherit it instead of loading
+    current_model()
+    get_executor()
+    get_ring()
+    yield
+    await explanation_jobs.close()
+    shutdown_executor()
+    close_ring()
+    await close_client()
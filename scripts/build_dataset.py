@@ -0,0 +1,219 @@
+import os
+import sys
+import argparse
+import multiprocessing
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+# ---------------------------------------------------
+# Project Base Directory
+# ---------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from scripts.feature_extract import FEATURE_NAMES, extract_features
+from scripts.feature_store import FeatureStore
+from scripts.dataset_extract import content_hash, store_path
+from scripts.embedding import METHODS, PAYLOADS, embed, image_rng, variant_name, write_png
+
+cover_folder = os.path.join(BASE_DIR, "dataset", "cover")
+stego_folder = os.path.join(BASE_DIR, "dataset", "stego")
+store_folder = os.path.join(BASE_DIR, "features", "store")
+output_csv = os.path.join(BASE_DIR, "features", "dataset_features.csv")
+
+COVER_EXTENSIONS = (".png", ".tif", ".tiff", ".bmp", ".pgm")
+TARGET_SIZE = 512
+
+# ---------------------------------------------------
+# Worker
+# ---------------------------------------------------
+_done = set()
+_options = {}
+
+def _init_worker(done, options):
+    global _done, _options
+    _done = done
+    _options = options
+
+def variant_hash(cover_hash, method, payload, seed):
+
+    # Stego rows never touch disk, so their key is derived from the
+    # cover bytes and everything that determines the embedding
+    return content_hash(f"{cover_hash}:{variant_name(method, payload)}:{seed}".encode())
+
+def decode_cover(data, prepare):
+
+    if not prepare:
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+
+    # Same conversion preprocess.py applies to raw UCID TIFFs
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (TARGET_SIZE, TARGET_SIZE))
+
+def build_job(cover_path):
+
+    methods = _options["methods"]
+    payloads = _options["payloads"]
+    seed = _options["seed"]
+    stego_dir = _options["stego_dir"]
+
+    try:
+        with open(cover_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return "error", []
+
+    cover_hash = content_hash(data)
+    filename = os.path.splitext(os.path.basename(cover_path))[0] + ".png"
+
+    # Everything this cover contributes, minus what the store already has
+    pending = [("cover", 0.0, cover_path, cover_hash)]
+    for method in methods:
+        for payload in payloads:
+            path = os.path.join(stego_dir, variant_name(method, payload), filename)
+            pending.append((method, payload, path, variant_hash(cover_hash, method, payload, seed)))
+
+    pending = [item for item in pending if (store_path(item[2]), item[3]) not in _done]
+    if not pending:
+        return "skipped", []
+
+    # The one decode of this cover
+    img = decode_cover(data, _options["prepare"])
+    if img is None:
+        return "error", []
+
+    rows = []
+
+    for method, payload, path, key in pending:
+
+        if method == "cover":
+            variant = img
+        else:
+            variant = embed(img, method, payload, rng=image_rng(seed, filename, method, payload))
+
+            if _options["write_stego"]:
+                write_png(path, variant)
+
+        rows.append({
+            "path": store_path(path),
+            "hash": key,
+            "label": 0 if method == "cover" else 1,
+            "method": method,
+            "payload": payload,
+            "features": extract_features(variant)
+        })
+
+    return "done", rows
+
+# ---------------------------------------------------
+# Pipeline
+# ---------------------------------------------------
+def collect_covers(cover_dir=cover_folder):
+    return [
+        os.path.join(cover_dir, f)
+        for f in sorted(os.listdir(cover_dir))
+        if f.lower().endswith(COVER_EXTENSIONS)
+    ]
+
+def run_build(covers, store, stego_dir=stego_folder, methods=METHODS, payloads=PAYLOADS,
+              seed=0, prepare=False, write_stego=False, workers=None, chunk_size=2000):
+
+    options = {
+        "methods": list(methods),
+        "payloads": list(payloads),
+        "seed": seed,
+        "prepare": prepare,
+        "write_stego": write_stego,
+        "stego_dir": stego_dir
+    }
+
+    if write_stego:
+        for method in methods:
+            for payload in payloads:
+                os.makedirs(os.path.join(stego_dir, variant_name(method, payload)), exist_ok=True)
+
+    done = store.keys()
+    counts = {"done": 0, "skipped": 0, "error": 0}
+    rows_written = 0
+    pending = []
+
+    workers = workers or os.cpu_count() or 1
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(done, options)) as pool:
+
+        results = pool.imap_unordered(build_job, covers, chunksize=2)
+
+        with tqdm(total=len(covers), desc="Building") as progress:
+            for status, rows in results:
+
+                counts[status] += 1
+                progress.update(1)
+                progress.set_postfix(counts)
+
+                pending.extend(rows)
+
+                # Flush finished chunks so a crash loses at most one chunk
+                if len(pending) >= chunk_size:
+                    store.append(pending)
+                    rows_written += len(pending)
+                    pending = []
+
+    store.append(pending)
+    counts["rows"] = rows_written + len(pending)
+    return counts
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Embed and extract the whole dataset in one streaming pass")
+    parser.add_argument("--cover", default=cover_folder)
+    parser.add_argument("--stego", default=stego_folder, help="where --write-stego puts PNGs (and the row paths)")
+    parser.add_argument("--store", default=store_folder)
+    parser.add_argument("--csv", help=f"also export the store as CSV (e.g. {output_csv})")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument("--payloads", nargs="+", type=float, default=PAYLOADS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prepare", action="store_true", help="raw covers: grayscale + resize to 512x512 in memory")
+    parser.add_argument("--write-stego", action="store_true", help="also write every stego variant as PNG")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    print("=====================================")
+    print("Building Dataset (embed + extract)")
+    print("=====================================")
+
+    store = FeatureStore(args.store, FEATURE_NAMES)
+    covers = collect_covers(args.cover)
+
+    print(f"Cover images    : {len(covers)}")
+    print(f"Variants        : {', '.join(variant_name(m, p) for m in args.methods for p in args.payloads)}")
+    print(f"Already stored  : {len(store)}")
+    print("-------------------------------------")
+
+    counts = run_build(
+        covers, store, args.stego, args.methods, args.payloads,
+        seed=args.seed, prepare=args.prepare, write_stego=args.write_stego,
+        workers=args.workers, chunk_size=args.chunk_size
+    )
+
+    print("-------------------------------------")
+    print(f"Covers: {counts['done']} built, {counts['skipped']} up to date, {counts['error']} unreadable")
+    print(f"Rows added: {counts['rows']}")
+    print(f"Store: {args.store}")
+
+    if args.csv:
+        os.makedirs(os.path.dirname(args.csv), exist_ok=True)
+        rows = store.export_csv(args.csv)
+        print(f"Saved {rows} rows to: {args.csv}")
+
+    print("✅ Dataset build completed successfully!")
+    print("=====================================")
+
+
+if __name__ == "__main__":
+    main()
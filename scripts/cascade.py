@@ -0,0 +1,219 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+# ---------------------------------------------------
+# Project Base Directory
+# ---------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from scripts.feature_extract import FAST_FEATURE_NAMES
+from scripts.inference_engine import LOG_WEIGHT, RF_WEIGHT, THRESHOLD, TOP_K, linear_contributions
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+# Stored next to the model pickles and copied into every bundle
+CASCADE_FILE = "cascade.json"
+
+# STEGO_CASCADE=0 sends every image through full extraction
+CASCADE_ENABLED = os.environ.get("STEGO_CASCADE", "1") != "0"
+
+# Overrides the calibrated band: images whose first-stage probability is
+# within this distance of the threshold go on to the full ensemble
+CASCADE_BAND = os.environ.get("STEGO_CASCADE_BAND")
+
+# Calibration: widest early-exit share whose verdicts still agree with
+# the full ensemble at least this often
+TARGET_AGREEMENT = 0.995
+BAND_GRID = np.round(np.arange(0.0, 0.61, 0.01), 4)
+
+# Never calibrate narrower than this: small or easy calibration sets
+# would otherwise send every image down the fast path
+MIN_BAND = float(os.environ.get("STEGO_CASCADE_MIN_BAND", 0.1))
+
+# ---------------------------------------------------
+# First Stage (logistic model on the fast features)
+# ---------------------------------------------------
+class Cascade:
+
+    def __init__(self, weights, bias, mean, threshold=THRESHOLD, band=0.25, stats=None, ensemble=None):
+        self.feature_names = list(FAST_FEATURE_NAMES)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.threshold = float(threshold)
+        self.band = float(CASCADE_BAND) if CASCADE_BAND else float(band)
+        self.stats = stats or {}
+
+        # The (log weight, rf weight, threshold) the band was calibrated
+        # against; files without it were fitted for the default ensemble
+        self.ensemble = tuple(ensemble or (LOG_WEIGHT, RF_WEIGHT, self.threshold))
+
+    def matches(self, engine):
+        return np.allclose(self.ensemble, (engine.log_weight, engine.rf_weight, engine.threshold))
+
+    @classmethod
+    def fit(cls, X, y, threshold=THRESHOLD):
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.linear_model import LogisticRegression
+
+        X = np.asarray(X, dtype=np.float64)
+        scaler = StandardScaler().fit(X)
+        model = LogisticRegression(max_iter=2000).fit(scaler.transform(X), y)
+
+        # Scaler folded into the weights, as in the full engine
+        weights = model.coef_[0] / scaler.scale_
+        bias = model.intercept_[0] - np.dot(scaler.mean_, weights)
+
+        return cls(weights, bias, scaler.mean_, threshold)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+
+        if data["features"] != list(FAST_FEATURE_NAMES):
+            raise ValueError("Cascade features do not match the fast extractor.")
+
+        return cls(
+            data["weights"], data["bias"], data["mean"], data["threshold"], data["band"],
+            data.get("stats"), data.get("ensemble")
+        )
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({
+                "features": self.feature_names,
+                "weights": self.weights.tolist(),
+                "bias": self.bias,
+                "mean": self.mean.tolist(),
+                "threshold": self.threshold,
+                "band": self.band,
+                "stats": self.stats,
+                "ensemble": list(self.ensemble)
+            }, f, indent=2)
+
+    def proba(self, X):
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.feature_names))
+        return 1.0 / (1.0 + np.exp(-(X @ self.weights + self.bias)))
+
+    def decide(self, X, top_k=TOP_K):
+
+        # One entry per row: a finished result when the first stage is
+        # sure (outside the band), None when the full ensemble must decide
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.feature_names))
+        prob = self.proba(X)
+        sure = np.abs(prob - self.threshold) > self.band
+
+        # Same units as the full engine: shares of the probability
+        influence = linear_contributions(X, self.weights, self.mean, self.bias + np.dot(self.mean, self.weights), prob)
+        k = min(top_k, X.shape[1])
+        top = np.argsort(-np.abs(influence), axis=1, kind="stable")[:, :k]
+
+        results = []
+        for row in range(len(X)):
+            if not sure[row]:
+                results.append(None)
+                continue
+
+            results.append({
+                "prediction": "STEGO" if prob[row] > self.threshold else "COVER",
+                "confidence": round(float(prob[row]), 4),
+                "top_features": [
+                    {
+                        "feature": self.feature_names[index],
+                        "influence_score": round(float(influence[row, index]), 6)
+                    }
+                    for index in top[row]
+                ],
+                "decided_by": "fast"
+            })
+
+        return results
+
+# ---------------------------------------------------
+# Calibration
+# ---------------------------------------------------
+def choose_band(fast_prob, full_verdict, threshold=THRESHOLD, target=TARGET_AGREEMENT, bands=BAND_GRID):
+
+    # For every candidate band at once: which rows exit early, and how
+    # often their early verdict matches what the full ensemble said
+    bands = np.asarray(bands)
+    bands = bands[bands >= MIN_BAND]
+    fast_prob = np.asarray(fast_prob, dtype=np.float64)
+    full_verdict = np.asarray(full_verdict, dtype=bool)
+
+    decided = np.abs(fast_prob - threshold)[None, :] > np.asarray(bands)[:, None]
+    agree = (fast_prob > threshold) == full_verdict
+
+    counts = decided.sum(axis=1)
+    agreement = np.where(counts > 0, (decided & agree).sum(axis=1) / np.maximum(counts, 1), 1.0)
+
+    # Narrowest band (most early exits) that meets the target
+    ok = np.flatnonzero((agreement >= target) & (counts > 0))
+    if not len(ok):
+        return {"band": 1.0, "early_fraction": 0.0, "agreement": None}
+
+    best = ok[0]
+    return {
+        "band": float(bands[best]),
+        "early_fraction": float(counts[best] / len(fast_prob)),
+        "agreement": float(agreement[best])
+    }
+
+def fit_cascade(X_train, y_train, X_valid, full_prob_valid, feature_names,
+                threshold=THRESHOLD, target=TARGET_AGREEMENT, weights=(LOG_WEIGHT, RF_WEIGHT)):
+
+    # X_* hold full feature rows; the first stage only sees the fast columns
+    columns = [list(feature_names).index(name) for name in FAST_FEATURE_NAMES]
+
+    cascade = Cascade.fit(np.asarray(X_train)[:, columns], y_train, threshold)
+    calibration = choose_band(
+        cascade.proba(np.asarray(X_valid)[:, columns]), np.asarray(full_prob_valid) > threshold, threshold, target
+    )
+
+    cascade.band = calibration["band"]
+    cascade.ensemble = (weights[0], weights[1], threshold)
+    cascade.stats = {**calibration, "target_agreement": target, "calibration_rows": int(len(X_valid))}
+
+    return cascade
+
+# ---------------------------------------------------
+# CLI (first stage for already trained models)
+# ---------------------------------------------------
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Fit and calibrate the cascade's fast first stage")
+    parser.add_argument("--store", default=os.path.join(BASE_DIR, "features", "store"))
+    parser.add_argument("--csv", help="read a features CSV instead of the store")
+    parser.add_argument("--models", default=os.path.join(BASE_DIR, "models"))
+    parser.add_argument("--target", type=float, default=TARGET_AGREEMENT)
+    args = parser.parse_args(argv)
+
+    from scripts.inference_engine import EnsembleEngine
+    from scripts.feature_extract import FEATURE_NAMES
+    from scripts.train_models import load_features
+
+    X, y, _ = load_features(args.csv, args.store)
+
+    # Fit on half the rows, calibrate the band on the other half
+    engine = EnsembleEngine.load(args.models, FEATURE_NAMES)
+    full_prob = engine.log_weight * engine.log_proba(X) + engine.rf_weight * engine.rf_proba(X)
+    valid = np.arange(len(y)) % 2 == 1
+
+    cascade = fit_cascade(
+        X[~valid], y[~valid], X[valid], full_prob[valid], FEATURE_NAMES,
+        engine.threshold, args.target, (engine.log_weight, engine.rf_weight)
+    )
+    cascade.save(os.path.join(args.models, CASCADE_FILE))
+
+    print(f"Band: ±{cascade.band:g} around {cascade.threshold:g}")
+    print(f"Early exits: {cascade.stats['early_fraction']:.1%}, agreement with full ensemble: {cascade.stats['agreement']}")
+    print(f"Saved: {os.path.join(args.models, CASCADE_FILE)} (publish the models to serve it)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+import sys
+import hashlib
+import argparse
+import multiprocessing
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+# ---------------------------------------------------
+# Project Base Directory
+# ---------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from scripts.feature_extract import FEATURE_NAMES, extract_features
+from scripts.feature_store import FeatureStore
+
+cover_folder = os.path.join(BASE_DIR, "dataset", "cover")
+stego_folder = os.path.join(BASE_DIR, "dataset", "stego")
+store_folder = os.path.join(BASE_DIR, "features", "store")
+output_csv = os.path.join(BASE_DIR, "features", "dataset_features.csv")
+
+# ---------------------------------------------------
+# Job Discovery
+# ---------------------------------------------------
+def parse_variant(folder_name):
+
+    # "lsb_0.2" -> ("lsb", 0.2)
+    method, _, payload = folder_name.rpartition("_")
+    try:
+        return method, float(payload)
+    except ValueError:
+        return folder_name, None
+
+def collect_jobs(cover_dir=cover_folder, stego_dir=stego_folder):
+
+    jobs = []
+
+    if os.path.isdir(cover_dir):
+        for file in sorted(os.listdir(cover_dir)):
+            jobs.append((os.path.join(cover_dir, file), 0, "cover", 0.0))
+
+    for root, dirs, files in os.walk(stego_dir):
+        dirs.sort()
+        method, payload = parse_variant(os.path.basename(root))
+        for file in sorted(files):
+            jobs.append((os.path.join(root, file), 1, method, payload))
+
+    return jobs
+
+# ---------------------------------------------------
+# Worker
+# ---------------------------------------------------
+_done = set()
+
+def _init_worker(done):
+    global _done
+    _done = done
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def store_path(path):
+
+    # Project-relative where possible so stores survive a checkout move
+    path = os.path.abspath(path)
+    if path.startswith(BASE_DIR + os.sep):
+        path = os.path.relpath(path, BASE_DIR)
+
+    return path.replace(os.sep, "/")
+
+def extract_job(job):
+
+    path, label, method, payload = job
+
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return "error", None
+
+    key = (store_path(path), content_hash(data))
+    if key in _done:
+        return "skipped", None
+
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return "error", None
+
+    return "done", {
+        "path": key[0],
+        "hash": key[1],
+        "label": label,
+        "method": method,
+        "payload": payload,
+        "features": extract_features(img)
+    }
+
+# ---------------------------------------------------
+# Pipeline
+# ---------------------------------------------------
+def run_extraction(jobs, store, workers=None, chunk_size=2000):
+
+    done = store.keys()
+    counts = {"done": 0, "skipped": 0, "error": 0}
+    pending = []
+
+    workers = workers or os.cpu_count() or 1
+
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(done,)) as pool:
+
+        results = pool.imap_unordered(extract_job, jobs, chunksize=16)
+
+        with tqdm(total=len(jobs), desc="Extracting") as progress:
+            for status, row in results:
+
+                counts[status] += 1
+                progress.update(1)
+                progress.set_postfix(counts)
+
+                if row is not None:
+                    pending.append(row)
+
+                # Flush finished chunks so a crash loses at most one chunk
+                if len(pending) >= chunk_size:
+                    store.append(pending)
+                    pending = []
+
+    store.append(pending)
+    return counts
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Parallel, resumable dataset feature extraction")
+    parser.add_argument("--cover", default=cover_folder)
+    parser.add_argument("--stego", default=stego_folder)
+    parser.add_argument("--store", default=store_folder)
+    parser.add_argument("--csv", help=f"also export the store as CSV (e.g. {output_csv})")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    print("=====================================")
+    print("Extracting Features From Dataset")
+    print("=====================================")
+
+    store = FeatureStore(args.store, FEATURE_NAMES)
+    jobs = collect_jobs(args.cover, args.stego)
+
+    print(f"Images found    : {len(jobs)}")
+    print(f"Already stored  : {len(store)}")
+    print("-------------------------------------")
+
+    counts = run_extraction(jobs, store, workers=args.workers, chunk_size=args.chunk_size)
+
+    print("-------------------------------------")
+    print(f"Extracted: {counts['done']}  Skipped: {counts['skipped']}  Failed: {counts['error']}")
+    print(f"Store: {args.store}")
+
+    if args.csv:
+        os.makedirs(os.path.dirname(args.csv), exist_ok=True)
+        rows = store.export_csv(args.csv)
+        print(f"Saved {rows} rows to: {args.csv}")
+
+    print("✅ Feature extraction completed successfully!")
+    print("=====================================")
+
+
+if __name__ == "__main__":
+    main()
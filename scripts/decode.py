@@ -0,0 +1,333 @@
+import io
+import os
+import struct
+import cv2
+import numpy as np
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+# Decompression-bomb guard: images whose header claims more pixels are
+# rejected before anything is allocated
+MAX_PIXELS = int(os.environ.get("STEGO_MAX_PIXELS", 100_000_000))
+
+# Side of the centre crop the detector scores
+CROP_SIZE = 512
+
+# Bytes read from a file path to probe its header (JPEG SOF markers sit
+# after EXIF / ICC segments, which are at most a few 64 KB segments)
+HEADER_BYTES = 256 * 1024
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+TIFF_MAGIC = (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+")
+PNG_CHANNELS = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+
+# ---------------------------------------------------
+# Header Probing (dimensions and bit depth, no pixel decode)
+# ---------------------------------------------------
+def _info(fmt, width, height, channels, bit_depth):
+    return {"format": fmt, "width": int(width), "height": int(height), "channels": int(channels), "bit_depth": int(bit_depth)}
+
+def _probe_jpeg(data):
+
+    # Walk the marker segments up to the first start-of-frame
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            i += 2
+            continue
+
+        length = struct.unpack(">H", data[i + 2:i + 4])[0]
+
+        # SOF0..SOF15, minus DHT / JPG / DAC which share the range
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if i + 10 > len(data):
+                return None
+            precision, height, width, channels = struct.unpack(">BHHB", data[i + 4:i + 10])
+            return _info("jpeg", width, height, channels, precision)
+
+        i += 2 + length
+
+    return None
+
+def _probe_bmp(data):
+
+    if len(data) < 34:
+        return None
+
+    width, height, _, bits = struct.unpack("<iiHH", data[18:30])
+    return _info("bmp", abs(width), abs(height), 1 if bits <= 8 else bits // 8, 8)
+
+def _pnm_header(data):
+
+    # -> (magic, width, height, maxval, pixel offset) for binary P5 / P6
+    tokens = []
+    i = 2
+
+    while len(tokens) < 3 and i < len(data):
+        if data[i:i + 1] == b"#":
+            while i < len(data) and data[i:i + 1] not in (b"\n", b"\r"):
+                i += 1
+        elif data[i:i + 1].isspace():
+            i += 1
+        else:
+            start = i
+            while i < len(data) and not data[i:i + 1].isspace():
+                i += 1
+            tokens.append(int(data[start:i]))
+
+    if len(tokens) < 3:
+        return None
+
+    # Exactly one whitespace byte separates maxval from the pixels
+    return data[:2], tokens[0], tokens[1], tokens[2], i + 1
+
+def _probe_pnm(data):
+
+    try:
+        header = _pnm_header(data)
+    except ValueError:
+        return None
+    if header is None:
+        return None
+
+    magic, width, height, maxval, _ = header
+    return _info("pnm", width, height, 3 if magic == b"P6" else 1, 8 if maxval < 256 else 16)
+
+def _probe_tiff(source):
+    try:
+        import tifffile
+    except ImportError:
+        return None
+
+    try:
+        with tifffile.TiffFile(source if isinstance(source, str) else io.BytesIO(source)) as tif:
+            page = tif.pages[0]
+            bits = page.bitspersample if np.isscalar(page.bitspersample) else max(page.bitspersample)
+            return _info("tiff", page.imagewidth, page.imagelength, page.samplesperpixel, bits)
+    except Exception:
+        return None
+
+def probe(source):
+
+    # source: raw bytes or a file path. None when the format is not one
+    # we can read a header for (OpenCV then decodes it as before)
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            data = f.read(HEADER_BYTES)
+    else:
+        data = bytes(source[:HEADER_BYTES]) if len(source) > HEADER_BYTES else bytes(source)
+
+    if data.startswith(PNG_MAGIC) and data[12:16] == b"IHDR":
+        width, height, bits, color = struct.unpack(">IIBB", data[16:26])
+        return _info("png", width, height, PNG_CHANNELS.get(color, 3), max(bits, 8) if color != 3 else 8)
+
+    if data.startswith(b"\xff\xd8"):
+        return _probe_jpeg(data)
+
+    if data[:4] in TIFF_MAGIC:
+        return _probe_tiff(source)
+
+    if data.startswith(b"BM"):
+        return _probe_bmp(data)
+
+    if data[:2] in (b"P5", b"P6"):
+        return _probe_pnm(data)
+
+    return None
+
+def check_limits(info, max_pixels=MAX_PIXELS):
+
+    if info is None:
+        return
+
+    width, height = info["width"], info["height"]
+    if width <= 0 or height <= 0:
+        raise ValueError("Invalid or corrupted image.")
+
+    if width * height > max_pixels:
+        raise ValueError(f"Image is {width}x{height} ({width * height / 1e6:.0f} MP); the limit is {max_pixels / 1e6:.0f} MP.")
+
+# ---------------------------------------------------
+# Grayscale Conversion
+# ---------------------------------------------------
+def to_gray(region, channel_order="BGR"):
+
+    if region.ndim == 3:
+        channels = region.shape[2]
+
+        if channels <= 2:
+            # Gray (+ alpha)
+            region = region[:, :, 0]
+        else:
+            if region.dtype not in (np.uint8, np.uint16, np.float32):
+                region = region.astype(np.float32)
+            code = {
+                ("BGR", 3): cv2.COLOR_BGR2GRAY, ("BGR", 4): cv2.COLOR_BGRA2GRAY,
+                ("RGB", 3): cv2.COLOR_RGB2GRAY, ("RGB", 4): cv2.COLOR_RGBA2GRAY
+            }[(channel_order, min(channels, 4))]
+            region = cv2.cvtColor(np.ascontiguousarray(region[:, :, :min(channels, 4)]), code)
+
+    return region
+
+def center_box(height, width, size=CROP_SIZE):
+
+    # (y0, x0, y1, x1) of the crop prepare_image takes: the centre
+    # size x size window when both sides are larger, else everything
+    if height > size and width > size:
+        y0 = (height - size) // 2
+        x0 = (width - size) // 2
+        return y0, x0, y0 + size, x0 + size
+
+    return 0, 0, height, width
+
+# ---------------------------------------------------
+# Region Readers (only the crop's pixels are decoded / copied)
+# ---------------------------------------------------
+def _tiff_region(data, box):
+    import tifffile
+
+    y0, x0, y1, x1 = box
+
+    with tifffile.TiffFile(io.BytesIO(data)) as tif:
+        page = tif.pages[0]
+
+        # 8-bit gray or RGB, one plane, no volume: anything else is decoded whole
+        if page.dtype != np.uint8 or page.photometric not in (1, 2) or page.imagedepth > 1:
+            return None
+        if page.planarconfig == 2 and page.samplesperpixel > 1:
+            return None
+
+        # Uncompressed and contiguous: a view of the upload buffer
+        if page.is_final:
+            array = np.frombuffer(data, dtype=np.uint8, count=int(np.prod(page.shape)), offset=page.dataoffsets[0])
+            return array.reshape(page.shape)[y0:y1, x0:x1].copy()
+
+        # Strips or tiles: decode only the segments the crop touches
+        rows, cols = page.chunks[0], page.chunks[1]
+        across = -(-page.imagewidth // cols)
+        region = np.zeros((y1 - y0, x1 - x0) + tuple(page.shape[2:]), dtype=np.uint8)
+
+        for ty in range(y0 // rows, (y1 - 1) // rows + 1):
+            for tx in range(x0 // cols, (x1 - 1) // cols + 1):
+
+                index = ty * across + tx
+                offset, count = page.dataoffsets[index], page.databytecounts[index]
+                if not count:
+                    continue
+
+                segment, indices, _ = page.decode(data[offset:offset + count], index, jpegtables=page.jpegtables)
+                if segment is None:
+                    continue
+
+                sy, sx = indices[-3], indices[-2]
+                segment = segment.reshape(segment.shape[-3], segment.shape[-2], -1)
+
+                top, bottom = max(y0, sy), min(y1, sy + segment.shape[0])
+                left, right = max(x0, sx), min(x1, sx + segment.shape[1])
+                if top >= bottom or left >= right:
+                    continue
+
+                region[top - y0:bottom - y0, left - x0:right - x0] = segment[
+                    top - sy:bottom - sy, left - sx:right - sx
+                ].reshape(region[top - y0:bottom - y0, left - x0:right - x0].shape)
+
+        return region
+
+def _bmp_region(data, box):
+
+    # Uncompressed 24-bit only; palettes, bitfields and RLE go to OpenCV
+    offset, = struct.unpack("<I", data[10:14])
+    width, height, _, bits, compression = struct.unpack("<iiHHI", data[18:34])
+    if bits != 24 or compression != 0 or width <= 0 or height == 0:
+        return None
+
+    rows = abs(height)
+    stride = ((24 * width + 31) // 32) * 4
+    if offset + stride * rows > len(data):
+        return None
+
+    array = np.frombuffer(data, dtype=np.uint8, count=stride * rows, offset=offset).reshape(rows, stride)
+    array = array[:, :width * 3].reshape(rows, width, 3)
+
+    # Positive height: rows are stored bottom-up
+    if height > 0:
+        array = array[::-1]
+
+    y0, x0, y1, x1 = box
+    return array[y0:y1, x0:x1].copy()
+
+def _pnm_region(data, box):
+
+    magic, width, height, maxval, offset = _pnm_header(data)
+    channels = 3 if magic == b"P6" else 1
+    if maxval > 255 or offset + width * height * channels > len(data):
+        return None
+
+    array = np.frombuffer(data, dtype=np.uint8, count=width * height * channels, offset=offset)
+    array = array.reshape(height, width, channels)
+
+    y0, x0, y1, x1 = box
+    return array[y0:y1, x0:x1].copy()
+
+REGION_READERS = {
+    "tiff": (_tiff_region, "RGB"),
+    "bmp": (_bmp_region, "BGR"),
+    "pnm": (_pnm_region, "RGB")
+}
+
+# ---------------------------------------------------
+# Decode
+# ---------------------------------------------------
+def decode_gray(data, size=CROP_SIZE):
+
+    # Single-channel image ready for prepare_image. 8-bit inputs come back
+    # already cropped to the centre window (identical pixels to a full
+    # decode + crop); deeper inputs come back whole, since their min-max
+    # scaling is taken over the entire image
+    info = probe(data)
+    check_limits(info)
+
+    if info is not None and info["bit_depth"] == 8:
+        box = center_box(info["height"], info["width"], size)
+        y0, x0, y1, x1 = box
+
+        # Region reads pay off once the crop is smaller than the image
+        if info["format"] in REGION_READERS and (y1 - y0, x1 - x0) != (info["height"], info["width"]):
+            reader, channel_order = REGION_READERS[info["format"]]
+            try:
+                region = reader(data, box)
+            except Exception:
+                region = None
+            if region is not None:
+                return to_gray(region, channel_order)
+
+        # libjpeg hands over the luma plane directly: no chroma upsampling
+        # or colour conversion, a third of the memory
+        if info["format"] == "jpeg" and info["channels"] in (1, 3):
+            img = cv2.imdecode(
+                np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE | cv2.IMREAD_IGNORE_ORIENTATION
+            )
+            if img is None:
+                raise ValueError("Invalid or corrupted image.")
+            return img[y0:y1, x0:x1].copy()
+
+    # Everything else: full decode (OpenCV's own pixel limit applies to
+    # formats without a probe)
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError("Invalid or corrupted image.")
+
+    img = to_gray(img)
+    if img.dtype == np.uint8:
+        y0, x0, y1, x1 = center_box(*img.shape[:2], size)
+        img = img[y0:y1, x0:x1].copy()
+
+    return img
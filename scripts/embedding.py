@@ -0,0 +1,263 @@
+import os
+import sys
+import zlib
+import argparse
+import multiprocessing
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+# ---------------------------------------------------
+# Project Base Directory
+# ---------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+cover_folder = os.path.join(BASE_DIR, "dataset", "cover")
+stego_folder = os.path.join(BASE_DIR, "dataset", "stego")
+
+METHODS = ["lsb", "pvd", "hill", "wow"]
+PAYLOADS = [0.2, 0.5]
+
+# ---------------------------------------------------
+# Shared Helpers
+# ---------------------------------------------------
+def _generator(rng):
+    return rng if rng is not None else np.random.default_rng()
+
+def _set_lsbs(flat, indices, rng):
+
+    # One fancy-indexed write instead of a Python loop per bit
+    bits = rng.integers(0, 2, len(indices), dtype=np.uint8)
+    flat[indices] = (flat[indices] & 0xFE) | bits
+
+def top_k_indices(cost, k):
+
+    # The k largest entries, unordered: O(n) instead of a full argsort
+    n = cost.size
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= n:
+        return np.arange(n)
+
+    return np.argpartition(cost.ravel(), n - k)[n - k:]
+
+# ---------------------------------------------------
+# Embedding Functions
+# ---------------------------------------------------
+def lsb_embed(image, bpp, rng=None):
+
+    rng = _generator(rng)
+    stego = image.copy()
+    flat = stego.reshape(-1)
+
+    bits_to_embed = int(bpp * flat.size)
+
+    # Random pixel positions (without replacement), random LSBs
+    indices = rng.choice(flat.size, bits_to_embed, replace=False)
+    _set_lsbs(flat, indices, rng)
+
+    return stego
+
+def pvd_embed(image, bpp, rng=None):
+
+    # Simplified PVD: nudge random disjoint pixel pairs apart / together
+    rng = _generator(rng)
+    stego = image.copy()
+    flat = stego.reshape(-1)
+
+    bits_to_embed = int(bpp * flat.size)
+    num_pairs = flat.size // 2
+    pairs_to_modify = min(bits_to_embed, num_pairs)
+
+    first = rng.choice(num_pairs, pairs_to_modify, replace=False) * 2
+    second = first + 1
+
+    p1 = flat[first].astype(np.int16)
+    p2 = flat[second].astype(np.int16)
+
+    change = rng.integers(-2, 3, pairs_to_modify).astype(np.int16)
+    change = np.where(p1 >= p2, change, -change)
+
+    flat[first] = np.clip(p1 + change, 0, 255)
+    flat[second] = np.clip(p2 - change, 0, 255)
+
+    return stego
+
+def hill_like_embed(image, bpp, rng=None):
+
+    rng = _generator(rng)
+    stego = image.copy()
+    flat = stego.reshape(-1)
+
+    bits_to_embed = int(bpp * flat.size)
+
+    # High-pass filter (Laplacian): embed where the residual is strongest
+    residual = np.abs(cv2.Laplacian(image, cv2.CV_32F))
+
+    _set_lsbs(flat, top_k_indices(residual, bits_to_embed), rng)
+
+    return stego
+
+def wow_like_embed(image, bpp, rng=None):
+
+    rng = _generator(rng)
+    stego = image.copy()
+    flat = stego.reshape(-1)
+
+    bits_to_embed = int(bpp * flat.size)
+
+    # Local texture strength: distance from a 5x5 Gaussian blur
+    blur = cv2.GaussianBlur(image, (5, 5), 0)
+    texture = np.abs(image.astype(np.float32) - blur.astype(np.float32))
+
+    _set_lsbs(flat, top_k_indices(texture, bits_to_embed), rng)
+
+    return stego
+
+EMBEDDERS = {
+    "lsb": lsb_embed,
+    "pvd": pvd_embed,
+    "hill": hill_like_embed,
+    "wow": wow_like_embed
+}
+
+def embed(image, method, bpp, rng=None):
+    return EMBEDDERS[method](image, bpp, rng=rng)
+
+# ---------------------------------------------------
+# Reproducible Streams
+# ---------------------------------------------------
+def variant_name(method, payload):
+    # ("lsb", 0.2) -> "lsb_0.2", the folder layout dataset_extract expects
+    return f"{method}_{payload:g}"
+
+def image_rng(seed, filename, method, payload):
+
+    # Keyed on the image and variant only, so the stream is identical
+    # whichever worker (and however many workers) produce it
+    return np.random.default_rng([
+        seed,
+        zlib.crc32(filename.encode()),
+        zlib.crc32(variant_name(method, payload).encode())
+    ])
+
+# ---------------------------------------------------
+# Worker
+# ---------------------------------------------------
+def write_png(path, img):
+
+    # Encode first, then rename into place: a killed run never leaves
+    # a truncated PNG that a resumed run would skip
+    ok, encoded = cv2.imencode(".png", img)
+    if not ok:
+        raise ValueError("PNG encoding failed.")
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(encoded.tobytes())
+    os.replace(tmp, path)
+
+def embed_job(job):
+
+    cover_path, stego_dir, methods, payloads, seed, overwrite = job
+    filename = os.path.basename(cover_path)
+
+    targets = [
+        (method, payload, os.path.join(stego_dir, variant_name(method, payload), filename))
+        for method in methods
+        for payload in payloads
+    ]
+
+    if not overwrite:
+        targets = [t for t in targets if not os.path.exists(t[2])]
+    if not targets:
+        return "skipped", 0
+
+    # One read of the cover for every method x payload
+    img = cv2.imread(cover_path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return "error", 0
+
+    for method, payload, out_path in targets:
+        stego = embed(img, method, payload, rng=image_rng(seed, filename, method, payload))
+        write_png(out_path, stego)
+
+    return "done", len(targets)
+
+# ---------------------------------------------------
+# Pipeline
+# ---------------------------------------------------
+def collect_covers(cover_dir=cover_folder):
+    return [
+        os.path.join(cover_dir, f)
+        for f in sorted(os.listdir(cover_dir))
+        if f.endswith(".png")
+    ]
+
+def run_embedding(covers, stego_dir=stego_folder, methods=METHODS, payloads=PAYLOADS,
+                  seed=0, workers=None, overwrite=False):
+
+    for method in methods:
+        for payload in payloads:
+            os.makedirs(os.path.join(stego_dir, variant_name(method, payload)), exist_ok=True)
+
+    jobs = [(path, stego_dir, list(methods), list(payloads), seed, overwrite) for path in covers]
+    counts = {"done": 0, "skipped": 0, "error": 0}
+    written = 0
+
+    workers = workers or os.cpu_count() or 1
+
+    with multiprocessing.Pool(workers) as pool:
+
+        results = pool.imap_unordered(embed_job, jobs, chunksize=4)
+
+        with tqdm(total=len(jobs), desc="Embedding") as progress:
+            for status, count in results:
+                counts[status] += 1
+                written += count
+                progress.update(1)
+                progress.set_postfix(counts)
+
+    counts["written"] = written
+    return counts
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Generate stego variants for every cover image")
+    parser.add_argument("--cover", default=cover_folder)
+    parser.add_argument("--stego", default=stego_folder)
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument("--payloads", nargs="+", type=float, default=PAYLOADS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--overwrite", action="store_true", help="regenerate variants that already exist")
+    args = parser.parse_args(argv)
+
+    covers = collect_covers(args.cover)
+    variants = [variant_name(m, p) for m in args.methods for p in args.payloads]
+
+    print("=====================================")
+    print("Generating Stego Images")
+    print("=====================================")
+    print(f"Total cover images found: {len(covers)}")
+    print(f"Variants: {', '.join(variants)}")
+    print("-------------------------------------")
+
+    counts = run_embedding(
+        covers, args.stego, args.methods, args.payloads,
+        seed=args.seed, workers=args.workers, overwrite=args.overwrite
+    )
+
+    print("-------------------------------------")
+    print(f"Covers: {counts['done']} embedded, {counts['skipped']} up to date, {counts['error']} unreadable")
+    print(f"Stego images written: {counts['written']}")
+    print("Folders:")
+    for variant in variants:
+        print(f" - dataset/stego/{variant}")
+    print("✅ Embedding completed successfully!")
+    print("=====================================")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import numpy as np
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+# Blend weight of the logistic model (the forest gets 1 - w)
+WEIGHT_GRID = np.round(np.linspace(0.0, 1.0, 21), 4)
+THRESHOLD_GRID = np.round(np.linspace(0.01, 0.99, 99), 4)
+
+# Rows per engine call when scoring a whole dataset
+SCORE_CHUNK = 256
+
+OBJECTIVES = ("f1", "accuracy", "balanced_accuracy", "youden")
+
+# ---------------------------------------------------
+# Scores (each model evaluated once per dataset)
+# ---------------------------------------------------
+def model_scores(engine, X, chunk_size=SCORE_CHUNK):
+
+    X = np.asarray(X, dtype=np.float64)
+    log_prob = engine.log_proba(X)
+    rf_prob = np.concatenate([
+        engine.rf_proba(X[i:i + chunk_size]) for i in range(0, len(X), chunk_size)
+    ]) if len(X) else np.empty(0)
+
+    return log_prob, rf_prob
+
+def blend(log_prob, rf_prob, weights):
+    # (weights, rows): one ensemble score vector per log weight
+    weights = np.asarray(weights, dtype=np.float64)[:, None]
+    return weights * log_prob[None, :] + (1.0 - weights) * rf_prob[None, :]
+
+# ---------------------------------------------------
+# Confusion counts for every (weight, threshold) at once
+# ---------------------------------------------------
+def _count_below(scores, queries, side="right"):
+
+    # scores (rows, n), queries (t,) or (rows, t) -> (rows, t) counts of
+    # score <= q ("right") or score < q ("left") within each row. Rows are
+    # sorted, then shifted apart (scores live in [0, 1]) so a single
+    # searchsorted over the flattened array answers every row at once
+    rows, n = scores.shape
+    queries = np.asarray(queries, dtype=np.float64)
+    queries = np.broadcast_to(queries, (rows, queries.shape[-1]))
+
+    if n == 0:
+        return np.zeros(queries.shape, dtype=np.int64)
+
+    offsets = 2.0 * np.arange(rows)[:, None]
+    flat = (np.sort(scores, axis=1) + offsets).ravel()
+
+    found = np.searchsorted(flat, (queries + offsets).ravel(), side=side).reshape(queries.shape)
+    return found - np.arange(rows)[:, None] * n
+
+def _count_above(scores, thresholds):
+    return scores.shape[1] - _count_below(scores, thresholds)
+
+def confusion_grid(scores, labels, thresholds):
+
+    # Prediction rule matches the engine: stego when score > threshold
+    scores = np.atleast_2d(scores)
+    labels = np.asarray(labels).astype(bool)
+
+    tp = _count_above(scores[:, labels], thresholds)
+    fp = _count_above(scores[:, ~labels], thresholds)
+    positives = int(labels.sum())
+    negatives = len(labels) - positives
+
+    return tp, fp, positives - tp, negatives - fp
+
+def metrics_grid(tp, fp, fn, tn):
+
+    tp, fp, fn, tn = (np.asarray(a, dtype=np.float64) for a in (tp, fp, fn, tn))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        specificity = np.where(tn + fp > 0, tn / (tn + fp), 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+    return {
+        "accuracy": (tp + tn) / np.maximum(tp + fp + fn + tn, 1),
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "fpr": 1.0 - specificity,
+        "balanced_accuracy": (recall + specificity) / 2,
+        "youden": recall + specificity - 1
+    }
+
+# ---------------------------------------------------
+# Threshold-free metrics
+# ---------------------------------------------------
+def auc_grid(scores, labels):
+
+    # Mann-Whitney U: for every stego score, the covers it beats (ties
+    # count half), from the same sorted-row search. One AUC per row
+    scores = np.atleast_2d(scores)
+    labels = np.asarray(labels).astype(bool)
+    positives = int(labels.sum())
+    negatives = len(labels) - positives
+
+    if positives == 0 or negatives == 0:
+        return np.full(len(scores), np.nan)
+
+    stego, covers = scores[:, labels], scores[:, ~labels]
+    below = _count_below(covers, stego, side="left")
+    at_or_below = _count_below(covers, stego, side="right")
+
+    return (below + at_or_below).sum(axis=1) / (2.0 * positives * negatives)
+
+def curves(scores, labels):
+
+    # Cumulative TP/FP over descending scores, one point per distinct score
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels).astype(bool)
+
+    order = np.argsort(-scores, kind="mergesort")
+    sorted_scores = scores[order]
+    hits = labels[order]
+
+    last = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(scores) - 1]
+    tps = np.cumsum(hits)[last]
+    fps = (last + 1) - tps
+
+    positives = max(int(labels.sum()), 1)
+    negatives = max(len(labels) - int(labels.sum()), 1)
+
+    tpr = np.r_[0.0, tps / positives]
+    fpr = np.r_[0.0, fps / negatives]
+    precision = np.r_[1.0, tps / (tps + fps)]
+
+    return {
+        "thresholds": sorted_scores[last],
+        "fpr": fpr,
+        "tpr": tpr,
+        "precision": precision,
+        "recall": tpr,
+        "roc_auc": float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)),
+        "average_precision": float(np.sum(np.diff(tpr) * precision[1:]))
+    }
+
+# ---------------------------------------------------
+# Sweep
+# ---------------------------------------------------
+def sweep(log_prob, rf_prob, labels, weights=WEIGHT_GRID, thresholds=THRESHOLD_GRID):
+
+    weights = np.asarray(weights, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    scores = blend(log_prob, rf_prob, weights)
+    grid = metrics_grid(*confusion_grid(scores, labels, thresholds))
+
+    return {
+        "weights": weights,
+        "thresholds": thresholds,
+        "auc": auc_grid(scores, labels),
+        **grid
+    }
+
+def recommend(result, objective="f1", max_fpr=None, prefer=None):
+
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of: {', '.join(OBJECTIVES)}")
+
+    value = np.where(np.isnan(result[objective]), -np.inf, result[objective])
+
+    # Optional operating constraint: best objective among low-FPR points
+    if max_fpr is not None:
+        value = np.where(result["fpr"] <= max_fpr, value, -np.inf)
+        if not np.isfinite(value).any():
+            raise ValueError(f"No configuration reaches FPR <= {max_fpr}.")
+
+    # Ties (common on small or separable sets): stay closest to prefer,
+    # the (log_weight, threshold) currently served
+    best = np.argwhere(value == value.max())
+    if prefer is not None and len(best) > 1:
+        distance = np.hypot(result["weights"][best[:, 0]] - prefer[0], result["thresholds"][best[:, 1]] - prefer[1])
+        best = best[np.argsort(distance, kind="stable")]
+    w, t = best[0]
+    log_weight = float(result["weights"][w])
+
+    return {
+        "log_weight": log_weight,
+        "rf_weight": round(1.0 - log_weight, 6),
+        "threshold": float(result["thresholds"][t]),
+        "objective": objective,
+        "max_fpr": max_fpr,
+        "auc": float(result["auc"][w]),
+        **{name: float(result[name][w, t]) for name in ("accuracy", "precision", "recall", "f1", "fpr")}
+    }
+
+# ---------------------------------------------------
+# Breakdowns (per embedding method / payload)
+# ---------------------------------------------------
+def breakdown(scores, labels, groups, threshold):
+
+    # Each group's stego images against every cover image: detection rate
+    # at the chosen threshold and the AUC of that group alone
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels).astype(bool)
+    groups = np.asarray(groups, dtype=object)
+
+    covers = ~labels
+    report = {}
+
+    for group in sorted({g for g in groups[labels] if g is not None}, key=str):
+        members = labels & (groups == group)
+        subset = members | covers
+        report[str(group)] = {
+            "count": int(members.sum()),
+            "detection_rate": float((scores[members] > threshold).mean()),
+            "mean_score": float(scores[members].mean()),
+            "auc": float(auc_grid(scores[subset], labels[subset])[0])
+        }
+
+    return report
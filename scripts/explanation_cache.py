@@ -0,0 +1,121 @@
+import os
+import math
+import time
+import asyncio
+from collections import OrderedDict
+from scripts.llm_service import LLM_FAILED_MESSAGE
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+EXPLANATION_CACHE_SIZE = int(os.environ.get("STEGO_EXPLANATION_CACHE_SIZE", 4096))
+EXPLANATION_CACHE_TTL = float(os.environ.get("STEGO_EXPLANATION_CACHE_TTL", 24 * 3600))
+
+# Influence scores are compared at this many significant digits
+EXPLANATION_SIG_DIGITS = int(os.environ.get("STEGO_EXPLANATION_SIG_DIGITS", 2))
+
+# ---------------------------------------------------
+# Prompt Key
+# ---------------------------------------------------
+def quantize(value, digits=EXPLANATION_SIG_DIGITS):
+    if value == 0 or not math.isfinite(value):
+        return 0.0
+    return round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+def explanation_key(result, digits=EXPLANATION_SIG_DIGITS):
+
+    # build_prompt only sees the label and the top features, so that is the key
+    return (
+        result["prediction"],
+        tuple(
+            (f["feature"], quantize(float(f["influence_score"]), digits))
+            for f in result["top_features"]
+        )
+    )
+
+# ---------------------------------------------------
+# TTL / LRU Cache with In-Flight Coalescing
+# ---------------------------------------------------
+class ExplanationCache:
+
+    def __init__(self, max_entries=EXPLANATION_CACHE_SIZE, ttl=EXPLANATION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key):
+
+        item = self._entries.get(key)
+
+        if item is not None and item[1] < time.monotonic():
+            del self._entries[key]
+            item = None
+
+        if item is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def put(self, key, text):
+
+        # Never remember an LLM outage
+        if not text or text == LLM_FAILED_MESSAGE:
+            return
+
+        self._entries[key] = (text, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def inflight(self, key):
+        return self._inflight.get(key)
+
+    def claim(self, key):
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    def release(self, key, text):
+        self.put(key, text)
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(text)
+
+    async def generate(self, key, factory):
+
+        text = self.get(key)
+        if text is not None:
+            return text
+
+        # Someone is already generating this explanation: wait for theirs
+        future = self.inflight(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        self.claim(key)
+        text = LLM_FAILED_MESSAGE
+        try:
+            text = await factory()
+        finally:
+            self.release(key, text)
+
+        return text
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced
+        }
@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from scripts.llm_service import get_client, stream_explanation, LLM_FAILED_MESSAGE
+from scripts.metrics import record_llm
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+JOB_TTL = float(os.environ.get("STEGO_EXPLANATION_TTL", 3600))
+MAX_JOBS = int(os.environ.get("STEGO_MAX_EXPLANATION_JOBS", 10000))
+
+# Comma-separated URL prefixes webhooks may target, e.g.
+# https://hooks.example.com/stego/. Unset means no webhooks: otherwise any
+# client could make the server POST to loopback or metadata addresses
+WEBHOOK_ALLOW = [p for p in os.environ.get("STEGO_WEBHOOK_ALLOW", "").split(",") if p]
+
+def _url_parts(url):
+    try:
+        parts = urlsplit(url)
+        return parts.scheme, (parts.hostname or "").lower(), parts.port, parts.path
+    except ValueError:
+        return None
+
+def webhook_allowed(url, allow=None):
+
+    # Scheme, host and port must match an allowed prefix exactly, and the
+    # path must sit under its path: no "https://allowed.com.evil.net"
+    target = _url_parts(url)
+    if target is None or target[0] not in ("http", "https") or not target[1]:
+        return False
+
+    for prefix in WEBHOOK_ALLOW if allow is None else allow:
+        allowed = _url_parts(prefix)
+        if allowed is None or target[:3] != allowed[:3]:
+            continue
+        path = allowed[3].rstrip("/")
+        if target[3] == path or target[3].startswith(path + "/"):
+            return True
+
+    return False
+
+# ---------------------------------------------------
+# Explanation Job
+# ---------------------------------------------------
+class ExplanationJob:
+
+    def __init__(self, callback_url=None, context=None):
+        self.id = uuid.uuid4().hex
+        self.status = "pending"
+        self.created = time.time()
+        self.finished = None
+        self.tokens = []
+        self.explanation = None
+        self.callback_url = callback_url
+        self.context = context or {}
+        self._subscribers = []
+
+    @property
+    def text(self):
+        return "".join(self.tokens)
+
+    def describe(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "poll": f"/explanations/{self.id}",
+            "stream": f"/explanations/{self.id}/stream"
+        }
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "llm_explanation": self.explanation if self.explanation is not None else (self.text or None),
+            **self.context
+        }
+
+    def _publish(self, event):
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def subscribe(self):
+
+        # Replay what was generated so far, then follow live tokens
+        queue = asyncio.Queue()
+
+        if self.tokens:
+            queue.put_nowait(("token", self.text))
+
+        if self.status in ("done", "failed"):
+            queue.put_nowait((self.status, self.explanation))
+        else:
+            self._subscribers.append(queue)
+
+        return queue
+
+    def unsubscribe(self, queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+# ---------------------------------------------------
+# Job Store
+# ---------------------------------------------------
+class ExplanationJobs:
+
+    def __init__(self, cache=None, ttl=JOB_TTL, max_jobs=MAX_JOBS):
+        self.cache = cache
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._leaders = {}
+        self._tasks = set()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def submit(self, prompt, key=None, callback_url=None, context=None, on_complete=None):
+
+        self._prune()
+
+        job = ExplanationJob(callback_url=callback_url, context=context)
+        self._jobs[job.id] = job
+
+        cache = self.cache if key is not None else None
+        text = cache.get(key) if cache is not None else None
+
+        if text is not None:
+            # Same label + top features explained before
+            job.tokens = [text]
+            self._spawn(self._finish(job, "done", text, on_complete))
+
+        elif key is not None and key in self._leaders:
+            # Identical prompt streaming right now: mirror its tokens
+            if cache is not None:
+                cache.coalesced += 1
+            self._spawn(self._follow(job, self._leaders[key], on_complete))
+
+        elif cache is not None and cache.inflight(key) is not None:
+            # A blocking (?explain=sync) generation is running for this prompt
+            cache.coalesced += 1
+            self._spawn(self._await(job, cache.inflight(key), on_complete))
+
+        else:
+            if key is not None:
+                self._leaders[key] = job
+                if cache is not None:
+                    cache.claim(key)
+            self._spawn(self._run(job, prompt, key, on_complete))
+
+        return job
+
+    async def _run(self, job, prompt, key, on_complete):
+
+        job.status = "running"
+        start = time.perf_counter()
+
+        try:
+            async for token in stream_explanation(prompt):
+                job.tokens.append(token)
+                job._publish(("token", token))
+
+            status, text = "done", job.text.strip()
+
+        except Exception as e:
+            print("LLM ERROR:", str(e))
+            status, text = "failed", LLM_FAILED_MESSAGE
+
+        record_llm("stream", time.perf_counter() - start, status == "failed")
+
+        if key is not None:
+            self._leaders.pop(key, None)
+            if self.cache is not None:
+                self.cache.release(key, text)
+
+        await self._finish(job, status, text, on_complete)
+
+    async def _follow(self, job, leader, on_complete):
+
+        job.status = "running"
+        queue = leader.subscribe()
+
+        try:
+            while True:
+                event, value = await queue.get()
+                if event == "token":
+                    job.tokens.append(value)
+                    job._publish(("token", value))
+                    continue
+                await self._finish(job, event, value, on_complete)
+                break
+        finally:
+            leader.unsubscribe(queue)
+
+    async def _await(self, job, future, on_complete):
+
+        job.status = "running"
+        text = await asyncio.shield(future)
+
+        job.tokens = [text]
+        job._publish(("token", text))
+        status = "failed" if text == LLM_FAILED_MESSAGE else "done"
+
+        await self._finish(job, status, text, on_complete)
+
+    async def _finish(self, job, status, text, on_complete):
+
+        job.explanation = text
+        job.status = status
+        job.finished = time.time()
+        job._publish((job.status, job.explanation))
+        job._subscribers.clear()
+
+        if on_complete is not None:
+            on_complete(job.explanation)
+
+        if job.callback_url:
+            await self._notify(job)
+
+    async def _notify(self, job):
+        try:
+            response = await get_client().post(job.callback_url, json=job.to_dict())
+            response.raise_for_status()
+        except Exception as e:
+            print("WEBHOOK ERROR:", str(e))
+
+    def _prune(self):
+
+        # Expired jobs go, then the oldest finished ones until there is room
+        # for one more. Running jobs are never evicted, only skipped
+        now = time.time()
+        excess = len(self._jobs) + 1 - self.max_jobs
+
+        for job_id, job in list(self._jobs.items()):
+            if job.finished is None:
+                continue
+            if excess > 0 or now - job.finished > self.ttl:
+                del self._jobs[job_id]
+                excess -= 1
+
+    async def stream(self, job_id):
+
+        job = self._jobs[job_id]
+        queue = job.subscribe()
+
+        try:
+            while True:
+                event, value = await queue.get()
+
+                if event == "token":
+                    yield f"event: token\ndata: {json.dumps({'token': value})}\n\n"
+                    continue
+
+                yield f"event: {event}\ndata: {json.dumps(job.to_dict())}\n\n"
+                break
+        finally:
+            job.unsubscribe(queue)
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
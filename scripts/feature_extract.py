@@ -1,28 +1,28 @@
 import os
+import sys
+import threading
 import cv2
 import numpy as np
-import pandas as pd
-from tqdm import tqdm
-from scipy.stats import skew, kurtosis
-from skimage.feature import graycomatrix, graycoprops
-from scipy.fft import fft2
 
 # ---------------------------------------------------
 # Project Base Directory
 # ---------------------------------------------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
 
-cover_folder = os.path.join(BASE_DIR, "dataset", "cover")
-stego_folder = os.path.join(BASE_DIR, "dataset", "stego")
-output_csv = os.path.join(BASE_DIR, "features", "dataset_features.csv")
+from scripts.glcm import glcm_features
 
 os.makedirs(os.path.join(BASE_DIR, "features"), exist_ok=True)
 
 # ---------------------------------------------------
 # Feature Extraction Functions
 # ---------------------------------------------------
+# Reference helpers; scipy is imported on use since serving only
+# runs the fused FeatureExtractor below
 
 def histogram_features(img):
+    from scipy.stats import skew, kurtosis
+
     return [
         np.mean(img),
         np.var(img),
@@ -40,6 +40,8 @@ def lsb_features(img):
     return [entropy, ratio, transitions]
 
 def pixel_diff_features(img):
+    from scipy.stats import skew
+
     diff = img[:, :-1] - img[:, 1:]
     return [
         np.mean(diff),
@@ -47,27 +49,9 @@ def pixel_diff_features(img):
         skew(diff.flatten())
     ]
 
-def glcm_features(img):
-    angles = [0, np.pi/4, np.pi/2, 3*np.pi/4]
-
-    glcm = graycomatrix(
-        img,
-        distances=[1],
-        angles=angles,
-        levels=256,
-        symmetric=True,
-        normed=True
-    )
-
-    features = []
-
-    for prop in ['contrast', 'correlation', 'energy', 'homogeneity']:
-        values = graycoprops(glcm, prop)[0]
-        features.extend(values)
-
-    return features
-
 def residual_features(img):
+    from scipy.stats import skew
+
     blur = cv2.GaussianBlur(img, (3, 3), 0)
     residual = img.astype(np.float32) - blur.astype(np.float32)
     return [
@@ -77,6 +61,8 @@ def residual_features(img):
     ]
 
 def frequency_features(img):
+    from scipy.fft import fft2
+
     f = fft2(img)
     magnitude = np.abs(f)
 
@@ -90,7 +76,7 @@ def frequency_features(img):
 
     return [high_freq_energy, spectral_entropy]
 
-def extract_features(img):
+def extract_features_reference(img):
     features = []
     features += histogram_features(img)
     features += lsb_features(img)
@@ -100,6 +86,211 @@ def extract_features(img):
     features += frequency_features(img)
     return features
 
+# ---------------------------------------------------
+# Fused Extractor (shared intermediates, reused buffers)
+# ---------------------------------------------------
+FEATURE_NAMES = [
+    "mean", "variance", "skewness", "kurtosis",
+    "lsb_entropy", "lsb_ratio", "lsb_transitions",
+    "diff_mean", "diff_variance", "diff_skew",
+
+    "glcm_contrast_0", "glcm_contrast_45", "glcm_contrast_90", "glcm_contrast_135",
+    "glcm_correlation_0", "glcm_correlation_45", "glcm_correlation_90", "glcm_correlation_135",
+    "glcm_energy_0", "glcm_energy_45", "glcm_energy_90", "glcm_energy_135",
+    "glcm_homogeneity_0", "glcm_homogeneity_45", "glcm_homogeneity_90", "glcm_homogeneity_135",
+
+    "residual_variance", "residual_energy", "residual_skew",
+    "high_freq_energy", "spectral_entropy"
+]
+
+# Bump whenever a feature's definition changes: stored rows are tied to
+# the version that computed them and older ones stop being used
+EXTRACTOR_VERSION = 1
+
+def _moments(values, centered, squared):
+
+    # mean, variance, skew, kurtosis from one centered buffer
+    # (population moments, same as np.var / scipy.stats defaults)
+    n = values.size
+    mean = values.mean()
+
+    np.subtract(values, mean, out=centered)
+    np.multiply(centered, centered, out=squared)
+
+    centered = centered.reshape(-1)
+    squared = squared.reshape(-1)
+
+    m2 = squared.sum() / n
+    m3 = np.dot(squared, centered) / n
+    m4 = np.dot(squared, squared) / n
+
+    if m2 <= (np.finfo(centered.dtype).resolution * mean) ** 2:
+        return mean, m2, np.nan, np.nan
+
+    return mean, m2, m3 / m2 ** 1.5, m4 / m2 ** 2 - 3.0
+
+def _spectrum_weights(h, w):
+
+    # Map every bin of the full fft2 onto its rfft2 twin (Hermitian symmetry)
+    half = w // 2 + 1
+    u = np.arange(h)[:, None]
+    v = np.arange(w)[None, :]
+
+    mirrored = v >= half
+    rows = np.where(mirrored, (-u) % h, u)
+    cols = np.where(mirrored, w - v, v)
+    index = rows * half + cols
+
+    total = np.bincount(index.ravel(), minlength=h * half)
+    high = np.bincount(index[h//4:, w//4:].ravel(), minlength=h * half)
+
+    return total.reshape(h, half).astype(np.float64), high.reshape(h, half).astype(np.float64)
+
+class FeatureExtractor:
+
+    def __init__(self, shape=(512, 512)):
+        self.shape = None
+        self._allocate(shape)
+
+    def _allocate(self, shape):
+        h, w = shape
+
+        self.shape = (h, w)
+        self._pixels = np.empty((h, w), dtype=np.float64)
+        self._centered = np.empty((h, w), dtype=np.float64)
+        self._squared = np.empty((h, w), dtype=np.float64)
+        self._lsb = np.empty((h, w), dtype=np.uint8)
+        self._lsb_change = np.empty((h, w - 1), dtype=np.uint8)
+        self._diff = np.empty((h, w - 1), dtype=np.uint8)
+        self._diff_values = np.empty((h, w - 1), dtype=np.float64)
+        self._diff_centered = np.empty((h, w - 1), dtype=np.float64)
+        self._diff_squared = np.empty((h, w - 1), dtype=np.float64)
+        self._blur = np.empty((h, w), dtype=np.uint8)
+        self._residual = np.empty((h, w), dtype=np.float64)
+        self._spectrum_total, self._spectrum_high = _spectrum_weights(h, w)
+
+    def extract(self, img):
+
+        img = np.ascontiguousarray(img, dtype=np.uint8)
+        if img.shape != self.shape:
+            self._allocate(img.shape)
+
+        features = np.empty(len(FEATURE_NAMES), dtype=np.float64)
+        size = img.size
+
+        # Cast once, reused by moments and spectrum
+        pixels = self._pixels
+        np.copyto(pixels, img)
+
+        # Histogram moments
+        features[0:4] = _moments(pixels, self._centered, self._squared)
+
+        # LSB plane
+        lsb = np.bitwise_and(img, 1, out=self._lsb)
+        ratio = np.count_nonzero(lsb) / size
+        probs = np.array([1.0 - ratio, ratio])
+        features[4] = -np.sum(probs * np.log2(probs + 1e-10))
+        features[5] = ratio
+        np.bitwise_xor(lsb[:, :-1], lsb[:, 1:], out=self._lsb_change)
+        features[6] = np.count_nonzero(self._lsb_change) / self._lsb_change.size
+
+        # Horizontal differences (uint8 wrap-around, as the models were trained)
+        np.subtract(img[:, :-1], img[:, 1:], out=self._diff)
+        np.copyto(self._diff_values, self._diff)
+        mean, var, skewness, _ = _moments(self._diff_values, self._diff_centered, self._diff_squared)
+        features[7:10] = (mean, var, skewness)
+
+        # GLCM
+        features[10:26] = glcm_features(img)
+
+        # Residual
+        cv2.GaussianBlur(img, (3, 3), 0, dst=self._blur)
+        residual = np.subtract(pixels, self._blur, out=self._residual)
+        energy = np.dot(residual.reshape(-1), residual.reshape(-1))
+        _, var, skewness, _ = _moments(residual, self._centered, self._squared)
+        features[26:29] = (var, energy, skewness)
+
+        # Spectrum (real input -> half-plane rfft2)
+        magnitude = np.abs(np.fft.rfft2(pixels))
+        total_energy = np.vdot(magnitude, self._spectrum_total)
+        features[29] = np.vdot(magnitude, self._spectrum_high) / (total_energy + 1e-10)
+        magnitude /= (total_energy + 1e-10)
+        features[30] = -np.vdot(self._spectrum_total, magnitude * np.log2(magnitude + 1e-10))
+
+        return features
+
+# ---------------------------------------------------
+# Fast Extractor (cascade first stage, float32)
+# ---------------------------------------------------
+# Histogram, LSB and pixel-difference features only: no GLCM, no FFT
+FAST_FEATURE_NAMES = FEATURE_NAMES[:10]
+
+class FastFeatureExtractor:
+
+    def __init__(self, shape=(512, 512)):
+        self.shape = None
+        self._allocate(shape)
+
+    def _allocate(self, shape):
+        h, w = shape
+
+        self.shape = (h, w)
+        self._pixels = np.empty((h, w), dtype=np.float32)
+        self._centered = np.empty((h, w), dtype=np.float32)
+        self._squared = np.empty((h, w), dtype=np.float32)
+        self._lsb = np.empty((h, w), dtype=np.uint8)
+        self._lsb_change = np.empty((h, w - 1), dtype=np.uint8)
+        self._diff = np.empty((h, w - 1), dtype=np.uint8)
+        self._diff_values = np.empty((h, w - 1), dtype=np.float32)
+        self._diff_centered = np.empty((h, w - 1), dtype=np.float32)
+        self._diff_squared = np.empty((h, w - 1), dtype=np.float32)
+
+    def extract(self, img):
+
+        img = np.ascontiguousarray(img, dtype=np.uint8)
+        if img.shape != self.shape:
+            self._allocate(img.shape)
+
+        features = np.empty(len(FAST_FEATURE_NAMES), dtype=np.float64)
+        size = img.size
+
+        np.copyto(self._pixels, img)
+        features[0:4] = _moments(self._pixels, self._centered, self._squared)
+
+        lsb = np.bitwise_and(img, 1, out=self._lsb)
+        ratio = np.count_nonzero(lsb) / size
+        probs = np.array([1.0 - ratio, ratio])
+        features[4] = -np.sum(probs * np.log2(probs + 1e-10))
+        features[5] = ratio
+        np.bitwise_xor(lsb[:, :-1], lsb[:, 1:], out=self._lsb_change)
+        features[6] = np.count_nonzero(self._lsb_change) / self._lsb_change.size
+
+        np.subtract(img[:, :-1], img[:, 1:], out=self._diff)
+        np.copyto(self._diff_values, self._diff)
+        mean, var, skewness, _ = _moments(self._diff_values, self._diff_centered, self._diff_squared)
+        features[7:10] = (mean, var, skewness)
+
+        return features
+
+_local = threading.local()
+
+def extract_features(img):
+
+    # One extractor (and one set of buffers) per thread
+    extractor = getattr(_local, "extractor", None)
+    if extractor is None:
+        extractor = _local.extractor = FeatureExtractor()
+
+    return extractor.extract(img)
+
+def extract_fast_features(img):
+
+    extractor = getattr(_local, "fast_extractor", None)
+    if extractor is None:
+        extractor = _local.fast_extractor = FastFeatureExtractor()
+
+    return extractor.extract(img)
+
 
 # ===================================================
 # RUN DATASET EXTRACTION ONLY IF FILE EXECUTED
@@ -107,56 +298,7 @@ def extract_features(img):
 
 if __name__ == "__main__":
 
-    data = []
-
-    print("=====================================")
-    print("Extracting Features From Dataset")
-    print("=====================================")
-
-    # COVER IMAGES
-    cover_files = os.listdir(cover_folder)
-
-    for file in tqdm(cover_files, desc="Processing Cover"):
-        img_path = os.path.join(cover_folder, file)
-        img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-        if img is None:
-            continue
-        features = extract_features(img)
-        data.append(features + [0])
-
-    # STEGO IMAGES
-    for root, dirs, files in os.walk(stego_folder):
-        for file in tqdm(files, desc="Processing Stego"):
-            img_path = os.path.join(root, file)
-            img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-            if img is None:
-                continue
-            features = extract_features(img)
-            data.append(features + [1])
-
-    columns = [
-        "mean", "variance", "skewness", "kurtosis",
-        "lsb_entropy", "lsb_ratio", "lsb_transitions",
-        "diff_mean", "diff_variance", "diff_skew",
-
-        "glcm_contrast_0", "glcm_contrast_45", "glcm_contrast_90", "glcm_contrast_135",
-        "glcm_correlation_0", "glcm_correlation_45", "glcm_correlation_90", "glcm_correlation_135",
-        "glcm_energy_0", "glcm_energy_45", "glcm_energy_90", "glcm_energy_135",
-        "glcm_homogeneity_0", "glcm_homogeneity_45", "glcm_homogeneity_90", "glcm_homogeneity_135",
-
-        "residual_variance", "residual_energy", "residual_skew",
-        "high_freq_energy", "spectral_entropy",
-        "label"
-    ]
-
-    df = pd.DataFrame(data, columns=columns)
-
-    df = df.replace([np.inf, -np.inf], np.nan)
-    df = df.fillna(0)
-
-    df.to_csv(output_csv, index=False)
+    # Parallel, resumable pipeline (see scripts/dataset_extract.py)
+    from scripts.dataset_extract import main
 
-    print("-------------------------------------")
-    print("✅ Feature extraction completed successfully!")
-    print(f"Saved to: {output_csv}")
-    print("=====================================")
\ No newline at end of file
+    main()
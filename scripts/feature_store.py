@@ -0,0 +1,374 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import numpy as np
+
+# ---------------------------------------------------
+# Project Base Directory
+# ---------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from scripts.feature_extract import FEATURE_NAMES, EXTRACTOR_VERSION
+
+# ---------------------------------------------------
+# Chunked Feature Store
+# ---------------------------------------------------
+# <root>/schema.json               (feature names, in column order)
+#       /part-00000/features.npy   (n x features, column-major)
+#                  /labels.npy     (n,)
+#                  /index.json     (path, hash, method, payload per row)
+#                  /meta.json      (extractor version, row count)
+#
+# Parts are written to a temp dir and renamed into place, so a crash
+# never leaves a half-written part behind. Only parts written by the
+# current extractor version are read; older ones are kept but ignored.
+# Appends never delete: a re-extracted path leaves its old row behind
+# (load(latest=True) skips it), and rows of deleted source files stay
+# until compact() rewrites the store.
+
+STORE_DIR = os.path.join(BASE_DIR, "features", "store")
+PART_PREFIX = "part-"
+SCHEMA_FILE = "schema.json"
+STORE_FORMAT = 2
+
+# Parts from before meta.json existed were computed by version 1
+LEGACY_EXTRACTOR_VERSION = 1
+
+# Rows per part when importing a CSV
+IMPORT_CHUNK = 100000
+
+def _write_json(path, data):
+    temp = path + ".tmp"
+    with open(temp, "w") as f:
+        json.dump(data, f)
+    os.replace(temp, path)
+
+def _source_exists(path):
+    # Stored paths are project-relative where possible; CSV rows without a
+    # path column are keyed "<csv name>#<row>" and have no file to check
+    name, _, row = path.rpartition("#")
+    if name and row.isdigit() and "/" not in name:
+        return True
+    return os.path.exists(os.path.join(BASE_DIR, path))
+
+class FeatureStore:
+
+    def __init__(self, root, feature_names=FEATURE_NAMES, extractor_version=EXTRACTOR_VERSION):
+        self.root = root
+        self.feature_names = list(feature_names)
+        self.extractor_version = extractor_version
+        os.makedirs(root, exist_ok=True)
+
+        # Leftovers from an interrupted write
+        for name in os.listdir(root):
+            if name.endswith(".tmp"):
+                path = os.path.join(root, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+
+        self._check_schema()
+
+    # ---------------------------------------------------
+    # Schema
+    # ---------------------------------------------------
+    def _check_schema(self):
+
+        path = os.path.join(self.root, SCHEMA_FILE)
+
+        if os.path.exists(path):
+            with open(path) as f:
+                stored = json.load(f)["feature_names"]
+        else:
+            # New store, or one from before schema.json: its parts were only
+            # checked for the column count, which is all we can check here
+            stored = self.feature_names
+            for part in self.parts():
+                columns = np.load(os.path.join(part, "features.npy"), mmap_mode="r").shape[1]
+                if columns != len(stored):
+                    raise ValueError(f"Feature store {self.root} has {columns} columns, extractor has {len(stored)}.")
+            _write_json(path, {"format": STORE_FORMAT, "feature_names": stored})
+
+        if stored != self.feature_names:
+            position = next(
+                (i for i, (a, b) in enumerate(zip(stored, self.feature_names)) if a != b),
+                min(len(stored), len(self.feature_names))
+            )
+            raise ValueError(
+                f"Feature store schema mismatch at column {position}: store has "
+                f"{stored[position] if position < len(stored) else None!r}, extractor has "
+                f"{self.feature_names[position] if position < len(self.feature_names) else None!r}."
+            )
+
+    def column_indices(self, names):
+        try:
+            return [self.feature_names.index(name) for name in names]
+        except ValueError as e:
+            raise ValueError(f"Unknown feature column: {e}")
+
+    # ---------------------------------------------------
+    # Parts
+    # ---------------------------------------------------
+    def parts(self, current=False):
+
+        parts = sorted(
+            os.path.join(self.root, name)
+            for name in os.listdir(self.root)
+            if name.startswith(PART_PREFIX) and not name.endswith(".tmp")
+        )
+
+        if current:
+            parts = [part for part in parts if self.part_meta(part)["extractor_version"] == self.extractor_version]
+
+        return parts
+
+    @staticmethod
+    def part_meta(part):
+
+        path = os.path.join(part, "meta.json")
+        if not os.path.exists(path):
+            return {"extractor_version": LEGACY_EXTRACTOR_VERSION}
+
+        with open(path) as f:
+            return json.load(f)
+
+    def index(self, parts=None):
+        rows = []
+        for part in self.parts(current=True) if parts is None else parts:
+            with open(os.path.join(part, "index.json")) as f:
+                rows.extend(json.load(f))
+        return rows
+
+    def keys(self):
+        # Rows from an older extractor are not "done": they get recomputed
+        return {(row["path"], row["hash"]) for row in self.index()}
+
+    def __len__(self):
+        return len(self.index())
+
+    def describe(self):
+
+        versions = {}
+        for part in self.parts():
+            version = self.part_meta(part)["extractor_version"]
+            rows = np.load(os.path.join(part, "labels.npy"), mmap_mode="r").shape[0]
+            versions[version] = versions.get(version, 0) + rows
+
+        return {
+            "root": self.root,
+            "features": len(self.feature_names),
+            "extractor_version": self.extractor_version,
+            "parts": len(self.parts()),
+            "rows": versions.get(self.extractor_version, 0),
+            "stale_rows": sum(n for v, n in versions.items() if v != self.extractor_version),
+            "rows_by_version": versions
+        }
+
+    # ---------------------------------------------------
+    # Writes (append-only)
+    # ---------------------------------------------------
+    def _write_part(self, features, labels, index):
+
+        existing = self.parts()
+        number = int(os.path.basename(existing[-1])[len(PART_PREFIX):]) + 1 if existing else 0
+        final = os.path.join(self.root, f"{PART_PREFIX}{number:05d}")
+        temp = final + ".tmp"
+
+        os.makedirs(temp)
+        np.save(os.path.join(temp, "features.npy"), np.asfortranarray(features))
+        np.save(os.path.join(temp, "labels.npy"), labels)
+        with open(os.path.join(temp, "index.json"), "w") as f:
+            json.dump(index, f)
+        with open(os.path.join(temp, "meta.json"), "w") as f:
+            json.dump({"extractor_version": self.extractor_version, "rows": len(labels)}, f)
+
+        os.rename(temp, final)
+        return final
+
+    def append(self, rows):
+
+        if not rows:
+            return None
+
+        features = np.asarray([row["features"] for row in rows], dtype=np.float64)
+        features = np.nan_to_num(features, nan=0.0, posinf=0.0, neginf=0.0)
+
+        if features.shape[1] != len(self.feature_names):
+            raise ValueError("Feature mismatch with store schema.")
+
+        labels = np.asarray([row["label"] for row in rows], dtype=np.int8)
+        index = [
+            {
+                "path": row["path"],
+                "hash": row["hash"],
+                "method": row.get("method"),
+                "payload": row.get("payload")
+            }
+            for row in rows
+        ]
+
+        return self._write_part(features, labels, index)
+
+    def import_csv(self, csv_path, chunk_size=IMPORT_CHUNK):
+        import pandas as pd
+
+        # Columns are matched by name, never by position. CSV rows have no
+        # image behind them: the key is the CSV path (or its path column)
+        # plus a hash of the feature values
+        imported = 0
+        name = os.path.basename(csv_path)
+
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+
+            missing = [column for column in self.feature_names + ["label"] if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"{csv_path} lacks columns: {', '.join(missing)}")
+
+            features = np.nan_to_num(chunk[self.feature_names].to_numpy(dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+            rows = np.ascontiguousarray(features)
+            paths = chunk["path"].tolist() if "path" in chunk.columns else [f"{name}#{imported + i}" for i in range(len(chunk))]
+            optional = lambda column: [None if pd.isna(v) else v for v in chunk[column]] if column in chunk.columns else [None] * len(chunk)
+
+            index = [
+                {
+                    "path": path,
+                    "hash": hashlib.sha256(row.tobytes()).hexdigest(),
+                    "method": method,
+                    "payload": payload
+                }
+                for path, row, method, payload in zip(paths, rows, optional("method"), optional("payload"))
+            ]
+
+            self._write_part(features, chunk["label"].to_numpy(dtype=np.int8), index)
+            imported += len(chunk)
+
+        return imported
+
+    # ---------------------------------------------------
+    # Reads
+    # ---------------------------------------------------
+    def column(self, name):
+
+        # One feature column. Parts are column-major, so this touches only
+        # that column's pages; a single part comes back as a memmap view
+        position = self.column_indices([name])[0]
+        blocks = [np.load(os.path.join(p, "features.npy"), mmap_mode="r")[:, position] for p in self.parts(current=True)]
+
+        if len(blocks) == 1:
+            return blocks[0]
+        return np.concatenate(blocks) if blocks else np.empty(0)
+
+    def load(self, columns=None, latest=False):
+
+        # -> (features, labels, index) for the current extractor version.
+        # columns: feature names to read (default all, in schema order);
+        # latest: keep only the last row written for each path
+        parts = self.parts(current=True)
+        names = list(columns) if columns is not None else self.feature_names
+        positions = self.column_indices(names)
+
+        if not parts:
+            return np.empty((0, len(names))), np.empty(0, dtype=np.int8), []
+
+        whole = positions == list(range(len(self.feature_names)))
+        features = np.concatenate([
+            np.load(os.path.join(p, "features.npy"), mmap_mode="r")[:, slice(None) if whole else positions]
+            for p in parts
+        ])
+        labels = np.concatenate([np.load(os.path.join(p, "labels.npy")) for p in parts])
+        index = self.index(parts)
+
+        if latest:
+            last = {row["path"]: i for i, row in enumerate(index)}
+            keep = np.zeros(len(index), dtype=bool)
+            keep[list(last.values())] = True
+            if not keep.all():
+                features, labels = features[keep], labels[keep]
+                index = [row for row, k in zip(index, keep) if k]
+
+        return features, labels, index
+
+    def export_csv(self, csv_path):
+        import pandas as pd
+
+        features, labels, _ = self.load(latest=True)
+
+        df = pd.DataFrame(features, columns=self.feature_names)
+        df["label"] = labels.astype(int)
+        df.to_csv(csv_path, index=False)
+
+        return len(df)
+
+    # ---------------------------------------------------
+    # Compaction (run while nothing else writes to the store)
+    # ---------------------------------------------------
+    def compact(self, drop_missing=False):
+
+        # Current rows, latest per path, rewritten as one part; superseded
+        # rows and parts from older extractor versions are removed.
+        # drop_missing also drops rows whose source image no longer exists
+        old_parts = self.parts()
+        features, labels, index = self.load(latest=True)
+        features = np.array(features)
+
+        if drop_missing:
+            keep = np.array([_source_exists(row["path"]) for row in index], dtype=bool)
+            features, labels = features[keep], labels[keep]
+            index = [row for row, k in zip(index, keep) if k]
+
+        # The new part is in place before the old ones go: a crash in
+        # between leaves duplicates, which load(latest=True) resolves
+        if len(index):
+            self._write_part(features, labels, index)
+        for part in old_parts:
+            shutil.rmtree(part)
+
+        return len(index)
+
+# ---------------------------------------------------
+# CLI
+# ---------------------------------------------------
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Inspect the feature store, or import / export CSV")
+    parser.add_argument("--store", default=STORE_DIR)
+    parser.add_argument("--import-csv", help="append the rows of a features CSV (columns matched by name)")
+    parser.add_argument("--export-csv", help="write the current rows as CSV (latest row per path)")
+    parser.add_argument("--compact", action="store_true",
+                        help="rewrite the store without superseded rows and older extractor versions")
+    parser.add_argument("--drop-missing", action="store_true", help="with --compact, also drop rows whose image is gone")
+    args = parser.parse_args(argv)
+
+    try:
+        store = FeatureStore(args.store)
+    except ValueError as e:
+        print("FEATURE STORE ERROR:", str(e))
+        return 1
+
+    if args.import_csv:
+        print(f"Imported {store.import_csv(args.import_csv)} rows from {args.import_csv}")
+
+    if args.compact:
+        before = store.describe()
+        kept = store.compact(drop_missing=args.drop_missing)
+        print(f"Compacted {before['rows'] + before['stale_rows']} rows in {before['parts']} parts to {kept}")
+
+    if args.export_csv:
+        print(f"Saved {store.export_csv(args.export_csv)} rows to: {args.export_csv}")
+
+    info = store.describe()
+    print(f"Store           : {info['root']}")
+    print(f"Extractor       : version {info['extractor_version']}, {info['features']} features")
+    print(f"Rows            : {info['rows']} in {info['parts']} parts")
+    if info["stale_rows"]:
+        print(f"Stale rows      : {info['stale_rows']} from older extractor versions (ignored)")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
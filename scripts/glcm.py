@@ -0,0 +1,98 @@
+import numpy as np
+
+# ---------------------------------------------------
+# Vectorized GLCM (distance 1, angles 0/45/90/135)
+# ---------------------------------------------------
+LEVELS = 256
+
+# (row, col) offsets matching skimage's angle convention
+OFFSETS = [(0, 1), (1, 1), (1, 0), (1, -1)]
+
+PROPS = ["contrast", "correlation", "energy", "homogeneity"]
+
+_i, _j = np.divmod(np.arange(LEVELS * LEVELS, dtype=np.float64), LEVELS)
+
+# Per-cell weights, applied to all four normalized matrices in one matmul
+_WEIGHTS = np.stack([
+    (_i - _j) ** 2,               # contrast
+    1.0 / (1.0 + (_i - _j) ** 2), # homogeneity
+    _i,                           # mean
+    _i * _i,                      # second moment
+    _i * _j                       # cross moment
+], axis=1)
+
+def _pair_slices(shape, offset):
+    dy, dx = offset
+    h, w = shape
+
+    c0 = max(0, -dx)
+    c1 = w - max(0, dx)
+
+    return (slice(0, h - dy), slice(c0, c1)), (slice(dy, h), slice(c0 + dx, c1 + dx))
+
+def cooccurrence(img):
+
+    img = np.ascontiguousarray(img, dtype=np.uint8)
+
+    # Reference pixel pre-shifted into the row index of the code
+    high = img.astype(np.int32)
+    high <<= 8
+
+    # One bincount over the pixel pairs of all four directions
+    pairs = [_pair_slices(img.shape, offset) for offset in OFFSETS]
+    sizes = [high[ref].size for ref, _ in pairs]
+    codes = np.empty(sum(sizes), dtype=np.int32)
+
+    start = 0
+    for k, ((ref, nbr), size) in enumerate(zip(pairs, sizes)):
+        out = codes[start:start + size].reshape(high[ref].shape)
+        np.add(high[ref], img[nbr], out=out)
+        if k:
+            out += k * LEVELS * LEVELS
+        start += size
+
+    counts = np.bincount(codes, minlength=len(OFFSETS) * LEVELS * LEVELS)
+    counts = counts.reshape(len(OFFSETS), LEVELS, LEVELS).astype(np.float64)
+
+    # Symmetric, then normalized per direction
+    glcm = counts + counts.transpose(0, 2, 1)
+    totals = glcm.sum(axis=(1, 2), keepdims=True)
+    totals[totals == 0] = 1
+
+    return glcm / totals
+
+def glcm_props(glcm):
+
+    flat = glcm.reshape(len(glcm), -1)
+    moments = flat @ _WEIGHTS
+
+    contrast = moments[:, 0]
+    homogeneity = moments[:, 1]
+    energy = np.sqrt(np.einsum("ij,ij->i", flat, flat))
+
+    # Symmetric matrices: row and column marginals are identical
+    mean = moments[:, 2]
+    var = np.maximum(moments[:, 3] - mean * mean, 0)
+    cov = moments[:, 4] - mean * mean
+
+    # skimage reports correlation 1 for constant images
+    flat_mask = np.sqrt(var) < 1e-15
+    correlation = np.ones_like(var)
+    correlation[~flat_mask] = cov[~flat_mask] / var[~flat_mask]
+
+    return {
+        "contrast": contrast,
+        "correlation": correlation,
+        "energy": energy,
+        "homogeneity": homogeneity
+    }
+
+def glcm_features(img):
+
+    props = glcm_props(cooccurrence(img))
+
+    features = []
+    for prop in PROPS:
+        features.extend(props[prop])
+
+    return features
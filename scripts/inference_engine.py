@@ -0,0 +1,349 @@
+import os
+import json
+import numpy as np
+
+from scripts.tree_shap import PATH_ARRAYS, compile_paths, path_shap, reference_tree_shap
+
+# ---------------------------------------------------
+# Ensemble Defaults
+# ---------------------------------------------------
+LOG_WEIGHT = 0.6
+RF_WEIGHT = 0.4
+THRESHOLD = 0.4
+TOP_K = 5
+
+# (row, tree) paths walked together: bounds the traversal's working set,
+# so the cost per row stays flat however large the batch
+RF_BLOCK = 1 << 15
+
+# Flat arrays written by save(); bump COMPILED_FORMAT when the layout changes
+COMPILED_FORMAT = 3
+COMPILED_ARRAYS = (
+    "log_weights", "log_mean",
+    "node_feature", "node_threshold", "node_children",
+    "node_value", "node_is_leaf", "tree_roots"
+) + PATH_ARRAYS
+
+def sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+def linear_contributions(X, weights, mean, intercept, prob):
+
+    # Exact per-feature terms of a logistic model, w * (x - mean), which sum
+    # to logit(prob) - intercept. They are shared into probability units
+    # in proportion, so they sum to prob - sigmoid(intercept) instead
+    terms = (X - mean) * weights
+    delta = terms.sum(axis=1)
+    base = sigmoid(intercept)
+
+    small = np.abs(delta) < 1e-12
+    rate = np.where(small, base * (1.0 - base), (prob - base) / np.where(small, 1.0, delta))
+
+    return terms * rate[:, None]
+
+# ---------------------------------------------------
+# Compiled LR + RF Ensemble
+# ---------------------------------------------------
+class EnsembleEngine:
+
+    def __init__(self, log_model, rf_model, scaler, feature_names,
+                 log_weight=LOG_WEIGHT, rf_weight=RF_WEIGHT, threshold=THRESHOLD):
+
+        self.feature_names = list(feature_names)
+        self.log_weight = log_weight
+        self.rf_weight = rf_weight
+        self.threshold = threshold
+
+        # StandardScaler folded into the logistic weights:
+        # ((x - mean) / scale) . coef + b  ==  x . w + bias
+        n = len(self.feature_names)
+        mean = scaler.mean_ if getattr(scaler, "mean_", None) is not None and scaler.with_mean else np.zeros(n)
+        scale = scaler.scale_ if getattr(scaler, "scale_", None) is not None and scaler.with_std else np.ones(n)
+
+        coef = np.asarray(log_model.coef_[0], dtype=np.float64)
+        self.log_weights = coef / scale
+        self.log_bias = float(log_model.intercept_[0] - np.dot(mean, self.log_weights))
+        self.log_mean = np.asarray(mean, dtype=np.float64)
+        self.log_intercept = float(log_model.intercept_[0])
+
+        self._flatten_forest(rf_model)
+
+        # Root-to-leaf paths for the per-sample tree contributions
+        for name, array in compile_paths(rf_model).items():
+            setattr(self, name, array)
+
+    def _flatten_forest(self, rf_model):
+
+        # All trees in one set of contiguous node arrays. node_children
+        # holds (left, right) per node; leaves point at themselves
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+
+        for estimator in rf_model.estimators_:
+            tree = estimator.tree_
+            count = tree.node_count
+            local = np.arange(count)
+            leaf = tree.children_left == -1
+
+            proba = tree.value[:, 0, :]
+            proba = proba / proba.sum(axis=1, keepdims=True)
+
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(np.where(leaf, np.inf, tree.threshold))
+            lefts.append(np.where(leaf, local, tree.children_left) + offset)
+            rights.append(np.where(leaf, local, tree.children_right) + offset)
+            values.append(proba[:, 1])
+            roots.append(offset)
+
+            offset += count
+            depth = max(depth, tree.max_depth)
+
+        self.node_feature = np.concatenate(features).astype(np.intp)
+        self.node_threshold = np.concatenate(thresholds).astype(np.float64)
+        self.node_children = np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1).ravel().astype(np.intp)
+        self.node_value = np.concatenate(values).astype(np.float64)
+        self.node_is_leaf = self.node_children[0::2] == np.arange(offset)
+        self.tree_roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = depth
+
+    # ---------------------------------------------------
+    # Probabilities
+    # ---------------------------------------------------
+    def log_proba(self, X):
+        logits = X @ self.log_weights + self.log_bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def rf_leaves(self, X, block=RF_BLOCK):
+
+        # sklearn compares float32 features against float64 thresholds
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        n, width = X32.shape
+        flat = X32.ravel().astype(np.float64)
+
+        trees = len(self.tree_roots)
+        leaves = np.empty((trees, n), dtype=np.intp)
+        rows = max(1, block // trees)
+
+        for start in range(0, n, rows):
+            count = min(rows, n - start)
+
+            # One (tree, sample) path per slot, tree-major
+            nodes = np.repeat(self.tree_roots, count)
+            offsets = np.tile(np.arange(start, start + count, dtype=np.intp) * width, trees)
+            slots = np.arange(nodes.size)
+            reached = np.empty(nodes.size, dtype=np.intp)
+
+            # Finished paths stay put (leaves point at themselves); they are
+            # dropped once they make up a quarter of the live ones
+            while True:
+                right = np.take(flat, offsets + np.take(self.node_feature, nodes)) > np.take(self.node_threshold, nodes)
+                nodes = np.take(self.node_children, nodes + nodes + right)
+                done = np.take(self.node_is_leaf, nodes)
+                finished = np.count_nonzero(done)
+
+                if finished == nodes.size:
+                    reached[slots] = nodes
+                    break
+
+                if 4 * finished >= nodes.size:
+                    reached[slots[done]] = nodes[done]
+                    keep = ~done
+                    nodes, offsets, slots = nodes[keep], offsets[keep], slots[keep]
+
+            leaves[:, start:start + count] = reached.reshape(trees, count)
+
+        return leaves
+
+    def rf_proba(self, X):
+        values = self.node_value[self.rf_leaves(X)]
+        return values.sum(axis=0) / len(self.tree_roots)
+
+    # ---------------------------------------------------
+    # Per-sample Contributions
+    # ---------------------------------------------------
+    # Influence scores are shares of final_prob: each row sums to
+    # final_prob minus expected_value(), the score of an average image.
+    # LR: its exact linear terms; RF: path-dependent TreeSHAP, exact.
+    def expected_value(self):
+        rf_base = float(np.mean(self.node_value[self.tree_roots]))
+        return self.log_weight * sigmoid(self.log_intercept) + self.rf_weight * rf_base
+
+    def log_contributions(self, X, log_prob=None):
+        log_prob = self.log_proba(X) if log_prob is None else log_prob
+        return linear_contributions(X, self.log_weights, self.log_mean, self.log_intercept, log_prob)
+
+    def rf_contributions(self, X):
+        return path_shap(X, {name: getattr(self, name) for name in PATH_ARRAYS}, len(self.feature_names))
+
+    def contributions(self, X, log_prob=None):
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.feature_names))
+        return self.log_weight * self.log_contributions(X, log_prob) + self.rf_weight * self.rf_contributions(X)
+
+    def predict(self, X, top_k=TOP_K):
+
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.feature_names))
+
+        log_prob = self.log_proba(X)
+        rf_prob = self.rf_proba(X)
+        final_prob = self.log_weight * log_prob + self.rf_weight * rf_prob
+
+        # top_k=0: probabilities only, no TreeSHAP pass
+        if top_k > 0:
+            top, top_score = self.top_influences(X, top_k, log_prob)
+        else:
+            top, top_score = np.zeros((len(X), 0), dtype=np.intp), np.zeros((len(X), 0))
+
+        return {
+            "log_prob": log_prob,
+            "rf_prob": rf_prob,
+            "final_prob": final_prob,
+            "is_stego": final_prob > self.threshold,
+            "top_index": top,
+            "top_score": top_score
+        }
+
+    def top_influences(self, X, top_k=TOP_K, log_prob=None):
+
+        # Top-k by |influence| without sorting all features
+        scores = self.contributions(X, log_prob)
+        k = min(top_k, scores.shape[1])
+        magnitude = -np.abs(scores)
+
+        top = np.argpartition(magnitude, k - 1, axis=1)[:, :k] if k < scores.shape[1] else np.tile(np.arange(k), (len(X), 1))
+        order = np.argsort(np.take_along_axis(magnitude, top, axis=1), axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+
+        return top, np.take_along_axis(scores, top, axis=1)
+
+    def results(self, X, top_k=TOP_K):
+
+        out = self.predict(X, top_k=top_k)
+        names = self.feature_names
+
+        return [
+            {
+                "prediction": "STEGO" if is_stego else "COVER",
+                "confidence": round(float(prob), 4),
+                "top_features": [
+                    {
+                        "feature": names[index],
+                        "influence_score": round(float(score), 6)
+                    }
+                    for index, score in zip(indices, scores)
+                ]
+            }
+            for prob, is_stego, indices, scores in zip(
+                out["final_prob"], out["is_stego"], out["top_index"], out["top_score"]
+            )
+        ]
+
+    # ---------------------------------------------------
+    # Compiled Artifacts (no sklearn / joblib needed to serve)
+    # ---------------------------------------------------
+    def save(self, path):
+
+        os.makedirs(path, exist_ok=True)
+
+        for name in COMPILED_ARRAYS:
+            np.save(os.path.join(path, name + ".npy"), np.ascontiguousarray(getattr(self, name)))
+
+        with open(os.path.join(path, "engine.json"), "w") as f:
+            json.dump({
+                "format": COMPILED_FORMAT,
+                "feature_names": self.feature_names,
+                "log_weight": self.log_weight,
+                "rf_weight": self.rf_weight,
+                "threshold": self.threshold,
+                "log_bias": self.log_bias,
+                "log_intercept": self.log_intercept,
+                "max_depth": self.max_depth
+            }, f)
+
+    @classmethod
+    def load_compiled(cls, path, mmap_mode="r"):
+
+        with open(os.path.join(path, "engine.json")) as f:
+            meta = json.load(f)
+
+        if meta.get("format") != COMPILED_FORMAT:
+            raise ValueError("Compiled engine format is out of date.")
+
+        # Memory-mapped: pages come from the OS page cache and are shared
+        # by every process that maps the same files
+        engine = cls.__new__(cls)
+        engine.feature_names = list(meta["feature_names"])
+        engine.log_weight = meta["log_weight"]
+        engine.rf_weight = meta["rf_weight"]
+        engine.threshold = meta["threshold"]
+        engine.log_bias = meta["log_bias"]
+        engine.log_intercept = meta["log_intercept"]
+        engine.max_depth = meta["max_depth"]
+
+        for name in COMPILED_ARRAYS:
+            setattr(engine, name, np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode))
+
+        return engine
+
+    @classmethod
+    def load(cls, model_dir, feature_names=None, **kwargs):
+        import joblib
+
+        log_model = joblib.load(os.path.join(model_dir, "log_model.pkl"))
+        rf_model = joblib.load(os.path.join(model_dir, "rf_model.pkl"))
+        scaler = joblib.load(os.path.join(model_dir, "scaler.pkl"))
+
+        if feature_names is None:
+            feature_names = scaler.feature_names_in_
+
+        return cls(log_model, rf_model, scaler, feature_names, **kwargs)
+
+# ---------------------------------------------------
+# Reference (sklearn calls and recursive TreeSHAP, one row at a time)
+# ---------------------------------------------------
+def reference_results(log_model, rf_model, scaler, feature_names, X,
+                      log_weight=LOG_WEIGHT, rf_weight=RF_WEIGHT, threshold=THRESHOLD, top_k=TOP_K):
+
+    X = np.asarray(X, dtype=np.float64).reshape(-1, len(feature_names))
+    results = []
+
+    for row in X:
+        feature_array = row.reshape(1, -1)
+
+        scaled_features = scaler.transform(feature_array)
+        log_prob = float(log_model.predict_proba(scaled_features)[0][1])
+        rf_prob = float(rf_model.predict_proba(feature_array)[0][1])
+
+        final_prob = log_weight * log_prob + rf_weight * rf_prob
+
+        # Logit terms shared into probability units, as linear_contributions does
+        log_terms = scaled_features[0] * log_model.coef_[0]
+        base = float(sigmoid(log_model.intercept_[0]))
+        delta = float(log_model.decision_function(scaled_features)[0] - log_model.intercept_[0])
+        log_contrib = log_terms * ((log_prob - base) / delta if abs(delta) >= 1e-12 else base * (1.0 - base))
+
+        rf_contrib = np.zeros(len(feature_names))
+        for estimator in rf_model.estimators_:
+            reference_tree_shap(estimator.tree_, row, rf_contrib, 1.0 / len(rf_model.estimators_))
+
+        ensemble_score = log_weight * log_contrib + rf_weight * rf_contrib
+
+        top_features = sorted(
+            zip(feature_names, ensemble_score),
+            key=lambda x: abs(x[1]),
+            reverse=True
+        )[:top_k]
+
+        results.append({
+            "prediction": "STEGO" if final_prob > threshold else "COVER",
+            "confidence": round(final_prob, 4),
+            "top_features": [
+                {
+                    "feature": name,
+                    "influence_score": round(float(score), 6)
+                }
+                for name, score in top_features
+            ]
+        })
+
+    return results
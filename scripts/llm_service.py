@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import asyncio
+import httpx
+from scripts.metrics import record_llm
+
+# ---------------------------------------------------
+# Async Ollama Client
+# ---------------------------------------------------
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
+LLM_MODEL = os.environ.get("STEGO_LLM_MODEL", "phi3:latest")
+LLM_TIMEOUT = float(os.environ.get("STEGO_LLM_TIMEOUT", 60))
+
+# Generations allowed at once against the local model
+LLM_CONCURRENCY = int(os.environ.get("STEGO_LLM_CONCURRENCY", 2))
+
+LLM_FAILED_MESSAGE = "Explanation generation failed. LLM unavailable."
+
+_client = None
+_slots = None
+
+def get_slots():
+    global _slots
+
+    if _slots is None:
+        _slots = asyncio.Semaphore(LLM_CONCURRENCY)
+
+    return _slots
+
+def get_client():
+    global _client
+
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=LLM_TIMEOUT)
+
+    return _client
+
+async def close_client():
+    global _client, _slots
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+    _slots = None
+
+async def generate_explanation_async(prompt):
+
+    start = time.perf_counter()
+    failed = False
+
+    try:
+        async with get_slots():
+            response = await get_client().post(
+                OLLAMA_URL,
+                json={
+                    "model": LLM_MODEL,
+                    "prompt": prompt,
+                    "stream": False
+                }
+            )
+
+        response.raise_for_status()
+        data = response.json()
+
+        return data["response"].strip()
+
+    except Exception as e:
+        print("LLM ERROR:", str(e))
+        failed = True
+        return LLM_FAILED_MESSAGE
+
+    finally:
+        record_llm("blocking", time.perf_counter() - start, failed)
+
+async def stream_explanation(prompt):
+
+    # Ollama streams one JSON object per line: {"response": "<token>", "done": false}
+    async with get_slots():
+        async with get_client().stream(
+            "POST",
+            OLLAMA_URL,
+            json={
+                "model": LLM_MODEL,
+                "prompt": prompt,
+                "stream": True
+            }
+        ) as response:
+
+            response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+
+                token = chunk.get("response", "")
+                if token:
+                    yield token
+
+                if chunk.get("done"):
+                    break
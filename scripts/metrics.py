@@ -0,0 +1,259 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+# Set STEGO_METRICS=0 to turn recording off (timers become no-ops)
+METRICS_ENABLED = os.environ.get("STEGO_METRICS", "1") != "0"
+
+# Seconds. Fine at the bottom for per-stage work (a few ms),
+# wide at the top for LLM calls and big batches
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ---------------------------------------------------
+# Metric types (Prometheus text exposition format)
+# ---------------------------------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _labels(self.labelnames, key), value) for key, value in items]
+
+class Counter(Metric):
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(Metric):
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), function=None):
+        super().__init__(name, help, labelnames)
+        # function: read the current value at scrape time (no bookkeeping)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self.function is not None:
+            return [(self.name, "", self.function())]
+        return super().samples()
+
+class Histogram(Metric):
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+
+        # Per-bucket (not cumulative) counts; summed when rendered
+        index = bisect.bisect_left(self.buckets, value)
+        key = self._key(labels)
+
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                lines.append((f"{self.name}_bucket", _labels(self.labelnames, key, [("le", _number(bound))]), cumulative))
+            lines.append((f"{self.name}_sum", _labels(self.labelnames, key), total))
+            lines.append((f"{self.name}_count", _labels(self.labelnames, key), count))
+        return lines
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        # Re-registering a name returns the existing metric (module reloads)
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=(), function=None):
+        return self.register(Gauge(name, help, labelnames, function))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                print("METRICS ERROR:", metric.name, str(e))
+                continue
+            lines.extend(metric.header())
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in samples)
+
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+# ---------------------------------------------------
+# Service metrics
+# ---------------------------------------------------
+REQUEST_SECONDS = metrics.histogram(
+    "stego_request_seconds", "End-to-end request latency.", ["endpoint", "status"]
+)
+STAGE_SECONDS = metrics.histogram(
+    "stego_stage_seconds", "Time spent in each stage of a request.", ["endpoint", "stage"]
+)
+CACHE_REQUESTS = metrics.counter(
+    "stego_cache_requests_total", "Analyses answered from the result cache (hit) or computed (miss).", ["result"]
+)
+LLM_REQUESTS = metrics.counter(
+    "stego_llm_requests_total", "Calls to the LLM.", ["mode"]
+)
+LLM_FAILURES = metrics.counter(
+    "stego_llm_failures_total", "LLM calls that failed or timed out.", ["mode"]
+)
+LLM_SECONDS = metrics.histogram(
+    "stego_llm_seconds", "LLM call latency, including waiting for a generation slot.", ["mode"]
+)
+REJECTED = metrics.counter(
+    "stego_requests_rejected_total", "Requests turned away by admission control.", ["status"]
+)
+DECISIONS = metrics.counter(
+    "stego_decisions_total", "Verdicts computed, by the cascade stage that decided them.", ["stage"]
+)
+
+def _cache_hit_ratio():
+    hits = CACHE_REQUESTS.value(result="hit")
+    total = hits + CACHE_REQUESTS.value(result="miss")
+    return hits / total if total else 0.0
+
+metrics.gauge("stego_cache_hit_ratio", "Share of analyses answered from the result cache.", function=_cache_hit_ratio)
+
+def record_cache(hit):
+    CACHE_REQUESTS.inc(result="hit" if hit else "miss")
+
+def record_decision(result):
+    DECISIONS.inc(stage=result.get("decided_by", "full"))
+
+def record_llm(mode, seconds, failed):
+    LLM_REQUESTS.inc(mode=mode)
+    LLM_SECONDS.observe(seconds, mode=mode)
+    if failed:
+        LLM_FAILURES.inc(mode=mode)
+
+# ---------------------------------------------------
+# Stage timers (one per request)
+# ---------------------------------------------------
+class Timings:
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def merge(self, stages):
+        # Stages timed in a pool worker come back as a plain dict
+        for name, seconds in stages.items():
+            self.add(name, seconds)
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def as_dict(self):
+        # Milliseconds, for the optional "timings" block in responses
+        report = {name: round(seconds * 1e3, 3) for name, seconds in self.stages.items()}
+        report["total"] = round(self.total() * 1e3, 3)
+        return report
+
+    def record(self, endpoint, status="success"):
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=name)
+        REQUEST_SECONDS.observe(self.total(), endpoint=endpoint, status=status)
+
+@contextmanager
+def timed(timings, name):
+    # Lets callers pass timings=None when nobody is measuring
+    if timings is None:
+        yield
+    else:
+        with timings.stage(name):
+            yield
@@ -0,0 +1,408 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+
+# ---------------------------------------------------
+# Project Base Directory
+# ---------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from scripts.inference_engine import EnsembleEngine, LOG_WEIGHT, RF_WEIGHT, THRESHOLD
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+# <registry>/manifest.json        {"active": "<version>", "versions": {...}}
+#           /<version>/bundle.json (feature schema, ensemble weights, threshold)
+#           /<version>/log_model.pkl, rf_model.pkl, scaler.pkl
+#           /<version>/cascade.json    (optional fast first stage)
+#           /<version>/engine/*.npy    (compiled, memory-mapped at serve time)
+#
+# Bundles are immutable once renamed into place; activating another
+# version only rewrites the manifest (atomically), which every process
+# notices on its next request.
+
+REGISTRY_DIR = os.environ.get("STEGO_MODEL_REGISTRY", os.path.join(BASE_DIR, "models", "registry"))
+LEGACY_DIR = os.path.join(BASE_DIR, "models")
+MODEL_FILES = ("log_model.pkl", "rf_model.pkl", "scaler.pkl")
+OPTIONAL_FILES = ("cascade.json",)
+
+# Compiled engine arrays inside a bundle (legacy models get models/compiled/<version>)
+COMPILED_DIR = "engine"
+
+# Seconds between manifest checks in each process
+RELOAD_INTERVAL = float(os.environ.get("STEGO_MODEL_RELOAD_INTERVAL", 2))
+
+# A version that failed to load is retried when the manifest changes, or
+# after this many seconds
+RELOAD_RETRY = float(os.environ.get("STEGO_MODEL_RELOAD_RETRY", 60))
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+def files_version(model_dir):
+
+    # Same hash the old MODEL_VERSION used, so cache keys survive the move
+    digest = hashlib.sha256()
+    for name in MODEL_FILES:
+        with open(os.path.join(model_dir, name), "rb") as f:
+            digest.update(f.read())
+
+    # Optional files only count when present, older hashes stay valid
+    for name in OPTIONAL_FILES:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+
+    return digest.hexdigest()[:12]
+
+def bundle_version(model_dir, log_weight=LOG_WEIGHT, rf_weight=RF_WEIGHT, threshold=THRESHOLD):
+
+    # A tuned operating point changes verdicts, so it gets its own version
+    # (and cache keys); the default config keeps the plain file hash
+    version = files_version(model_dir)
+    config = (float(log_weight), float(rf_weight), float(threshold))
+
+    if config != (LOG_WEIGHT, RF_WEIGHT, THRESHOLD):
+        version += "-" + hashlib.sha256(json.dumps(config).encode()).hexdigest()[:6]
+
+    return version
+
+# ---------------------------------------------------
+# Bundle
+# ---------------------------------------------------
+def _engine_from_pickles(path, meta):
+    import joblib
+
+    return EnsembleEngine(
+        joblib.load(os.path.join(path, "log_model.pkl")),
+        joblib.load(os.path.join(path, "rf_model.pkl")),
+        joblib.load(os.path.join(path, "scaler.pkl")),
+        meta["feature_names"],
+        log_weight=meta.get("log_weight", LOG_WEIGHT),
+        rf_weight=meta.get("rf_weight", RF_WEIGHT),
+        threshold=meta.get("threshold", THRESHOLD)
+    )
+
+def _load_cascade(path):
+    from scripts.cascade import Cascade, CASCADE_FILE
+
+    if not os.path.exists(os.path.join(path, CASCADE_FILE)):
+        return None
+    return Cascade.load(os.path.join(path, CASCADE_FILE))
+
+class ModelBundle:
+
+    def __init__(self, version, engine, meta, cascade=None):
+        self.version = version
+        self.engine = engine
+        self.meta = meta
+
+        # The band only holds for the ensemble it was calibrated against;
+        # tuned bundles (other weights / threshold) skip the fast stage
+        self.cascade = cascade if cascade is not None and cascade.matches(engine) else None
+        self.feature_names = engine.feature_names
+        self.loaded = time.time()
+
+    @classmethod
+    def load(cls, path, version=None, meta=None, compiled_dir=None, compiled=True):
+
+        if meta is None:
+            with open(os.path.join(path, "bundle.json")) as f:
+                meta = json.load(f)
+
+        compiled_dir = compiled_dir or os.path.join(path, COMPILED_DIR)
+        cascade = _load_cascade(path)
+
+        # Flat NumPy arrays, memory-mapped: no sklearn import, no unpickling
+        if compiled:
+            try:
+                return cls(version or meta["version"], EnsembleEngine.load_compiled(compiled_dir), meta, cascade)
+            except (OSError, ValueError):
+                pass
+
+        engine = _engine_from_pickles(path, meta)
+
+        # Compile once so the next process starts from the arrays. Workers
+        # may race here; whoever renames first wins, the rest discard theirs
+        if compiled:
+            temp = f"{compiled_dir}.{os.getpid()}.tmp"
+            try:
+                engine.save(temp)
+                if os.path.isdir(compiled_dir):
+                    stale = f"{compiled_dir}.{os.getpid()}.old"
+                    os.rename(compiled_dir, stale)
+                    shutil.rmtree(stale, ignore_errors=True)
+                os.rename(temp, compiled_dir)
+            except OSError as e:
+                shutil.rmtree(temp, ignore_errors=True)
+                if not os.path.isdir(compiled_dir):
+                    print("MODEL COMPILE ERROR:", str(e))
+
+        return cls(version or meta["version"], engine, meta, cascade)
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "created": self.meta.get("created"),
+            "features": len(self.feature_names),
+            "log_weight": self.engine.log_weight,
+            "rf_weight": self.engine.rf_weight,
+            "threshold": self.engine.threshold,
+            "cascade_band": self.cascade.band if self.cascade is not None else None
+        }
+
+# ---------------------------------------------------
+# Publishing
+# ---------------------------------------------------
+def read_manifest(registry_dir=REGISTRY_DIR):
+    path = os.path.join(registry_dir, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def activate(version, registry_dir=REGISTRY_DIR):
+
+    manifest = read_manifest(registry_dir) or {"active": None, "versions": {}}
+
+    if version not in manifest["versions"]:
+        raise ValueError(f"Unknown model version: {version}")
+
+    manifest["active"] = version
+    _write_json(os.path.join(registry_dir, "manifest.json"), manifest)
+
+def publish_bundle(model_dir, feature_names, registry_dir=REGISTRY_DIR,
+                   log_weight=LOG_WEIGHT, rf_weight=RF_WEIGHT, threshold=THRESHOLD,
+                   extra=None, make_active=True):
+
+    # model_dir holds log_model.pkl / rf_model.pkl / scaler.pkl
+    os.makedirs(registry_dir, exist_ok=True)
+
+    version = bundle_version(model_dir, log_weight, rf_weight, threshold)
+    final = os.path.join(registry_dir, version)
+
+    if not os.path.isdir(final):
+        temp = final + ".tmp"
+        shutil.rmtree(temp, ignore_errors=True)
+        os.makedirs(temp)
+
+        for name in MODEL_FILES:
+            shutil.copy2(os.path.join(model_dir, name), os.path.join(temp, name))
+        for name in OPTIONAL_FILES:
+            if os.path.exists(os.path.join(model_dir, name)):
+                shutil.copy2(os.path.join(model_dir, name), os.path.join(temp, name))
+
+        meta = {
+            "version": version,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "feature_names": list(feature_names),
+            "log_weight": log_weight,
+            "rf_weight": rf_weight,
+            "threshold": threshold,
+            **(extra or {})
+        }
+        _write_json(os.path.join(temp, "bundle.json"), meta)
+        _engine_from_pickles(temp, meta).save(os.path.join(temp, COMPILED_DIR))
+
+        os.rename(temp, final)
+
+    manifest = read_manifest(registry_dir) or {"active": None, "versions": {}}
+    with open(os.path.join(final, "bundle.json")) as f:
+        manifest["versions"][version] = {"created": json.load(f).get("created")}
+
+    if make_active or manifest["active"] is None:
+        manifest["active"] = version
+
+    _write_json(os.path.join(registry_dir, "manifest.json"), manifest)
+    return version
+
+# ---------------------------------------------------
+# Registry (one per process, hot reload)
+# ---------------------------------------------------
+class ModelRegistry:
+
+    def __init__(self, registry_dir=REGISTRY_DIR, legacy_dir=LEGACY_DIR, reload_interval=RELOAD_INTERVAL,
+                 reload_retry=RELOAD_RETRY):
+        self.registry_dir = registry_dir
+        self.legacy_dir = legacy_dir
+        self.reload_interval = reload_interval
+        self.reload_retry = reload_retry
+
+        self._bundle = None
+        self._wanted = None
+        self._stamp = None
+        self._checked = 0.0
+        self._loading = None
+        self._failed = None
+        self._lock = threading.Lock()
+
+    def _manifest_stamp(self):
+        path = os.path.join(self.registry_dir, "manifest.json")
+        try:
+            st = os.stat(path)
+            return ("registry", st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            pass
+
+        # No registry yet: serve models/*.pkl directly
+        stamps = []
+        for name in MODEL_FILES:
+            st = os.stat(os.path.join(self.legacy_dir, name))
+            stamps.append((st.st_mtime_ns, st.st_size))
+        for name in OPTIONAL_FILES:
+            path = os.path.join(self.legacy_dir, name)
+            st = os.stat(path) if os.path.exists(path) else None
+            stamps.append((st.st_mtime_ns, st.st_size) if st else None)
+        return ("legacy", tuple(stamps))
+
+    def active_version(self, force=False):
+
+        # Cheap: a stat per interval, the manifest only re-read when it changed
+        now = time.monotonic()
+        if not force and self._wanted is not None and now - self._checked < self.reload_interval:
+            return self._wanted
+
+        self._checked = now
+        stamp = self._manifest_stamp()
+
+        if stamp != self._stamp:
+            if stamp[0] == "registry":
+                self._wanted = read_manifest(self.registry_dir)["active"]
+            else:
+                self._wanted = files_version(self.legacy_dir)
+            self._stamp = stamp
+
+        return self._wanted
+
+    def _load(self, version):
+
+        if self._stamp[0] == "registry":
+            path = os.path.join(self.registry_dir, version)
+            if not os.path.isdir(path):
+                raise ValueError(f"Active model version {version} has no bundle.")
+            return ModelBundle.load(path, version=version)
+
+        # Legacy directory: schema comes from the extractor, not the CSV
+        from scripts.feature_extract import FEATURE_NAMES
+        return ModelBundle.load(
+            self.legacy_dir, version=version, meta={"feature_names": FEATURE_NAMES},
+            compiled_dir=os.path.join(self.legacy_dir, "compiled", version)
+        )
+
+    def _load_in_background(self, version):
+
+        stamp = self._stamp
+
+        def run():
+            try:
+                bundle = self._load(version)
+                with self._lock:
+                    self._bundle = bundle
+                    self._failed = None
+            except Exception as e:
+                print("MODEL RELOAD ERROR:", str(e))
+                with self._lock:
+                    self._failed = (version, stamp, time.monotonic())
+            finally:
+                with self._lock:
+                    self._loading = None
+
+        self._loading = version
+        threading.Thread(target=run, daemon=True).start()
+
+    def current(self):
+
+        wanted = self.active_version()
+        bundle = self._bundle
+
+        if bundle is not None and bundle.version == wanted:
+            return bundle
+
+        # First load blocks; later swaps load beside the serving bundle so
+        # requests in progress (and arriving meanwhile) keep the old one
+        if bundle is None:
+            return self.reload()
+
+        with self._lock:
+            if self._loading is None and not self._backing_off(wanted):
+                self._load_in_background(wanted)
+
+        return bundle
+
+    def _backing_off(self, version):
+
+        # Same version, same manifest, failed recently: keep serving the
+        # old bundle instead of reloading on every request
+        if self._failed is None:
+            return False
+
+        failed_version, stamp, when = self._failed
+        return (failed_version, stamp) == (version, self._stamp) and time.monotonic() - when < self.reload_retry
+
+    def reload(self):
+
+        # Load fully first, then swap the reference: never half a model
+        version = self.active_version(force=True)
+        bundle = self._load(version)
+
+        with self._lock:
+            self._bundle = bundle
+            self._failed = None
+
+        return bundle
+
+# ---------------------------------------------------
+# CLI
+# ---------------------------------------------------
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Manage versioned model bundles")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    publish = commands.add_parser("publish", help="add log_model/rf_model/scaler .pkl files as a bundle")
+    publish.add_argument("--models", default=LEGACY_DIR)
+    publish.add_argument("--log-weight", type=float, default=LOG_WEIGHT)
+    publish.add_argument("--rf-weight", type=float, default=RF_WEIGHT)
+    publish.add_argument("--threshold", type=float, default=THRESHOLD)
+    publish.add_argument("--no-activate", action="store_true")
+
+    commands.add_parser("list", help="show bundles and the active version")
+
+    use = commands.add_parser("activate", help="switch serving to another bundle")
+    use.add_argument("version")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "publish":
+        from scripts.feature_extract import FEATURE_NAMES
+        version = publish_bundle(
+            args.models, FEATURE_NAMES, args.registry,
+            log_weight=args.log_weight, rf_weight=args.rf_weight, threshold=args.threshold,
+            make_active=not args.no_activate
+        )
+        print(f"Published {version}")
+
+    elif args.command == "activate":
+        activate(args.version, args.registry)
+        print(f"Active: {args.version}")
+
+    manifest = read_manifest(args.registry) or {"active": None, "versions": {}}
+    for version, info in sorted(manifest["versions"].items(), key=lambda item: item[1].get("created") or ""):
+        marker = "*" if version == manifest["active"] else " "
+        print(f" {marker} {version}  {info.get('created')}")
+
+
+if __name__ == "__main__":
+    main()
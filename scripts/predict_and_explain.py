@@ -1,10 +1,8 @@
 import os
 import sys
+import time
 import cv2
 import numpy as np
-import joblib
-import pandas as pd
-import requests
 import warnings
 
 warnings.filterwarnings("ignore")
@@ -15,67 +13,80 @@ warnings.filterwarnings("ignore")
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 
-from scripts.feature_extract import extract_features
+from scripts.feature_extract import extract_features, extract_fast_features
+from scripts.decode import decode_gray
+from scripts.cascade import CASCADE_ENABLED
+from scripts.model_registry import ModelRegistry
+from scripts.llm_service import OLLAMA_URL, LLM_MODEL, LLM_TIMEOUT, LLM_FAILED_MESSAGE
+from scripts.metrics import timed, record_llm
 
 # ---------------------------------------------------
-# Load Models
+# Models (versioned bundles, loaded on first use, hot reloaded)
 # ---------------------------------------------------
-log_model = joblib.load(os.path.join(BASE_DIR, "models", "log_model.pkl"))
-rf_model = joblib.load(os.path.join(BASE_DIR, "models", "rf_model.pkl"))
-scaler = joblib.load(os.path.join(BASE_DIR, "models", "scaler.pkl"))
+registry = ModelRegistry()
 
-LOG_WEIGHT = 0.6
-RF_WEIGHT = 0.4
+def current_model():
+    return registry.current()
 
-feature_names = pd.read_csv(
-    os.path.join(BASE_DIR, "features", "dataset_features.csv"),
-    nrows=0
-).columns[:-1]
+def model_version():
+    # Active version without loading anything (cache keys, responses)
+    return registry.active_version()
 
 # ---------------------------------------------------
 # SAFE IMAGE LOADING
 # ---------------------------------------------------
+def prepare_image(img):
+
+    if len(img.shape) == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    if img.dtype != np.uint8:
+        img = cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX)
+        img = img.astype(np.uint8)
+
+    target_size = 512
+    h, w = img.shape
+
+    if h > target_size and w > target_size:
+        start_y = (h - target_size) // 2
+        start_x = (w - target_size) // 2
+        img = img[start_y:start_y + target_size, start_x:start_x + target_size]
+
+    h, w = img.shape
+    if h < target_size or w < target_size:
+        pad_y = max(target_size - h, 0)
+        pad_x = max(target_size - w, 0)
+        img = cv2.copyMakeBorder(
+            img,
+            0, pad_y,
+            0, pad_x,
+            cv2.BORDER_REFLECT
+        )
+
+    if np.std(img) < 1:
+        raise ValueError("Image has insufficient texture.")
+
+    return img
+
 def safe_load_image(image_path):
 
     if not os.path.exists(image_path):
         raise ValueError("Image file does not exist.")
 
     try:
-        img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
-
-        if img is None:
-            raise ValueError("Invalid or corrupted image.")
-
-        if len(img.shape) == 3:
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-        if img.dtype != np.uint8:
-            img = cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX)
-            img = img.astype(np.uint8)
-
-        target_size = 512
-        h, w = img.shape
-
-        if h > target_size and w > target_size:
-            start_y = (h - target_size) // 2
-            start_x = (w - target_size) // 2
-            img = img[start_y:start_y + target_size, start_x:start_x + target_size]
+        with open(image_path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise ValueError(f"Image loading failed: {str(e)}")
 
-        h, w = img.shape
-        if h < target_size or w < target_size:
-            pad_y = max(target_size - h, 0)
-            pad_x = max(target_size - w, 0)
-            img = cv2.copyMakeBorder(
-                img,
-                0, pad_y,
-                0, pad_x,
-                cv2.BORDER_REFLECT
-            )
+    return decode_image_bytes(data)
 
-        if np.std(img) < 1:
-            raise ValueError("Image has insufficient texture.")
+def decode_image_bytes(data):
 
-        return img
+    # Header first (size limits), then only the centre crop is decoded
+    # where the codec allows it, straight to one channel
+    try:
+        return prepare_image(decode_gray(data))
 
     except Exception as e:
         raise ValueError(f"Image loading failed: {str(e)}")
@@ -83,56 +94,77 @@ def safe_load_image(image_path):
 # ---------------------------------------------------
 # SAFE PREDICTION
 # ---------------------------------------------------
-def predict_image(image_path):
+def image_features(img, bundle=None):
 
-    img = safe_load_image(image_path)
+    bundle = bundle or current_model()
 
     try:
         features = extract_features(img)
     except Exception:
         raise ValueError("Feature extraction failed.")
 
-    if len(features) != len(feature_names):
+    if len(features) != len(bundle.feature_names):
         raise ValueError("Feature mismatch with trained model.")
 
     if np.std(img) == 0:
         raise ValueError("Image has no texture information.")
 
-    feature_array = np.array(features).reshape(1, -1)
+    return features
+
+def predict_features(feature_matrix, bundle=None):
+
+    # Scaler, LR and RF evaluated together by the compiled engine; every
+    # result records the bundle that produced it
+    bundle = bundle or current_model()
+    results = bundle.engine.results(feature_matrix)
 
-    scaled_features = scaler.transform(feature_array)
-    log_prob = float(log_model.predict_proba(scaled_features)[0][1])
-    rf_prob = float(rf_model.predict_proba(feature_array)[0][1])
+    for result in results:
+        result["model_version"] = bundle.version
+        result["decided_by"] = "full"
 
-    final_prob = LOG_WEIGHT * log_prob + RF_WEIGHT * rf_prob
-    prediction = "STEGO" if final_prob > 0.4 else "COVER"
+    return results
 
-    log_coefs = log_model.coef_[0]
-    log_contrib = scaled_features[0] * log_coefs
+def fast_decision(img, bundle, timings=None):
 
-    rf_importance = rf_model.feature_importances_
-    rf_contrib = feature_array[0] * rf_importance
+    # Cascade first stage: float32 histogram / LSB / difference features.
+    # Returns (features, result) when it is sure, None otherwise
+    if not CASCADE_ENABLED or bundle.cascade is None:
+        return None
 
-    ensemble_score = LOG_WEIGHT * log_contrib + RF_WEIGHT * rf_contrib
-    feature_influence = dict(zip(feature_names, ensemble_score))
+    with timed(timings, "fast_features"):
+        features = extract_fast_features(img)
+        result = bundle.cascade.decide([features])[0]
 
-    top_features = sorted(
-        feature_influence.items(),
-        key=lambda x: abs(x[1]),
-        reverse=True
-    )[:5]
+    if result is None:
+        return None
 
-    return {
-        "prediction": prediction,
-        "confidence": round(final_prob, 4),
-        "top_features": [
-            {
-                "feature": name,
-                "influence_score": round(float(score), 6)
-            }
-            for name, score in top_features
-        ]
-    }
+    result["model_version"] = bundle.version
+    return features, result
+
+def score_image(img, bundle=None, timings=None):
+
+    # Clear-cut images exit after the fast stage; the rest pay for the
+    # GLCM / FFT features and the full ensemble
+    bundle = bundle or current_model()
+
+    decided = fast_decision(img, bundle, timings)
+    if decided is not None:
+        return decided
+
+    with timed(timings, "features"):
+        features = image_features(img, bundle)
+
+    with timed(timings, "inference"):
+        return features, predict_features([features], bundle)[0]
+
+def predict_image(image_path, timings=None):
+
+    bundle = current_model()
+
+    with timed(timings, "decode"):
+        img = safe_load_image(image_path)
+
+    return score_image(img, bundle, timings)[1]
 
 # ---------------------------------------------------
 # STRICT PROMPT BUILDER
@@ -162,15 +194,20 @@ Keep it clear and technical but simple.
 # CONTROLLED LLM CALL (HTTP VERSION)
 # ---------------------------------------------------
 def generate_explanation(prompt):
+    import requests
+
+    start = time.perf_counter()
+    failed = False
+
     try:
         response = requests.post(
-            "http://localhost:11434/api/generate",
+            OLLAMA_URL,
             json={
-                "model": "phi3:latest",   # ← IMPORTANT FIX
+                "model": LLM_MODEL,
                 "prompt": prompt,
                 "stream": False
             },
-            timeout=60
+            timeout=LLM_TIMEOUT
         )
 
         response.raise_for_status()
@@ -180,7 +217,11 @@ def generate_explanation(prompt):
 
     except Exception as e:
         print("LLM ERROR:", str(e))
-        return "Explanation generation failed. LLM unavailable."
+        failed = True
+        return LLM_FAILED_MESSAGE
+
+    finally:
+        record_llm("sync", time.perf_counter() - start, failed)
 
 # ---------------------------------------------------
 # MAIN (Testing)
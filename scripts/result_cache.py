@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+CACHE_MAX_BYTES = int(os.environ.get("STEGO_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_DIR = os.environ.get("STEGO_CACHE_DIR") or None
+CACHE_DISK_MAX_BYTES = int(os.environ.get("STEGO_CACHE_DISK_MAX_BYTES", 1024 * 1024 * 1024))
+
+# Part of every key: bump when the content of a cached result changes
+# for the same model (2: top_features are exact TreeSHAP shares), so the
+# disk tier stops serving entries computed the old way
+RESULT_FORMAT = 2
+
+# ---------------------------------------------------
+# Keys
+# ---------------------------------------------------
+def pixel_key(img, model_version):
+
+    # Decoded pixels, not file bytes: re-encoded copies of an image share a key
+    digest = hashlib.sha256()
+    digest.update(f"{img.shape}|{img.dtype}|{model_version}|{RESULT_FORMAT}|".encode())
+    digest.update(np.ascontiguousarray(img))
+
+    return digest.hexdigest()
+
+def upload_key(data, model_version):
+
+    digest = hashlib.sha256()
+    digest.update(f"upload|{model_version}|{RESULT_FORMAT}|".encode())
+    digest.update(data)
+
+    return digest.hexdigest()
+
+# ---------------------------------------------------
+# Disk Tier (SQLite)
+# ---------------------------------------------------
+class DiskTier:
+
+    def __init__(self, directory, max_bytes=CACHE_DISK_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "results.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+        self._db.commit()
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return row[0]
+
+    def put(self, key, value):
+        with self._lock:
+            old = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._total += len(value) - (old[0] if old else 0)
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time())
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        while self._total > self.max_bytes:
+            row = self._db.execute("SELECT key, size FROM entries ORDER BY accessed LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            self._total -= row[1]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# ---------------------------------------------------
+# Result Cache (memory LRU + optional disk tier)
+# ---------------------------------------------------
+class ResultCache:
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, disk_dir=CACHE_DIR, disk_max_bytes=CACHE_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._aliases = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.disk = DiskTier(disk_dir, disk_max_bytes) if disk_dir else None
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def get(self, key):
+
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(value)
+
+        value = self.disk.get(key) if self.disk is not None else None
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, value)
+
+        return json.loads(value)
+
+    def put(self, key, entry):
+
+        value = json.dumps(entry).encode()
+
+        with self._lock:
+            self._store(key, value)
+
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def _store(self, key, value):
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+
+        self._entries[key] = value
+        self._bytes += len(value)
+
+        # Size-based LRU eviction
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    # Upload digest -> pixel key, lets byte-identical re-uploads skip decoding
+    def alias(self, upload, key):
+        with self._lock:
+            self._aliases[upload] = key
+            self._aliases.move_to_end(upload)
+            while len(self._aliases) > max(1024, len(self._entries) * 2):
+                self._aliases.popitem(last=False)
+
+    def resolve(self, upload):
+        with self._lock:
+            return self._aliases.get(upload)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
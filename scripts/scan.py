@@ -0,0 +1,434 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from tqdm import tqdm
+
+# ---------------------------------------------------
+# Project Base Directory
+# ---------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from scripts.predict_and_explain import (
+    current_model, decode_image_bytes, fast_decision, image_features,
+    predict_features, build_prompt, generate_explanation
+)
+from scripts.llm_service import LLM_CONCURRENCY
+from scripts.worker_pool import START_METHOD, _init_worker
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+IMAGE_EXTENSIONS = (".png", ".tif", ".tiff", ".bmp", ".pgm", ".jpg", ".jpeg", ".webp")
+
+# Images scored per engine call (and per read-ahead chunk)
+BATCH_SIZE = int(os.environ.get("STEGO_SCAN_BATCH", 64))
+
+# File reads and decodes are mostly I/O (network shares): more threads
+# than cores pays off
+READERS = int(os.environ.get("STEGO_SCAN_READERS", 8))
+
+# Rows per Parquet part file
+PART_ROWS = int(os.environ.get("STEGO_SCAN_PART_ROWS", 10000))
+
+# Every output row has these columns (Parquet needs a fixed schema)
+FIELDS = (
+    "path", "size", "mtime", "status", "message", "prediction", "confidence",
+    "decided_by", "model_version", "top_features", "explanation", "scanned_at"
+)
+
+# ---------------------------------------------------
+# Inputs
+# ---------------------------------------------------
+def walk_images(root, extensions=IMAGE_EXTENSIONS):
+
+    if os.path.isfile(root):
+        yield os.path.abspath(root)
+        return
+
+    for folder, dirs, files in os.walk(root):
+        dirs.sort()
+        for file in sorted(files):
+            if file.lower().endswith(extensions):
+                yield os.path.abspath(os.path.join(folder, file))
+
+def iter_paths(sources, stream=None):
+
+    # Directories / files from the command line, or one path per line on
+    # stdin ("-") so listings from find / object-store mounts can be piped in
+    for source in sources:
+        if source == "-":
+            for line in stream or sys.stdin:
+                line = line.strip()
+                if line:
+                    yield os.path.abspath(line)
+        else:
+            yield from walk_images(source)
+
+def _chunks(items, size):
+
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+# ---------------------------------------------------
+# Stage 1: read + decode (thread pool)
+# ---------------------------------------------------
+def read_job(path, done):
+
+    # -> (row, image or None). A file whose path, size and mtime match a
+    # previous successful row is skipped before any bytes are read
+    row = {"path": path}
+
+    try:
+        stat = os.stat(path)
+        row["size"] = stat.st_size
+        row["mtime"] = stat.st_mtime_ns
+
+        if (path, stat.st_size, stat.st_mtime_ns) in done:
+            row["status"] = "skipped"
+            return row, None
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        return row, decode_image_bytes(data)
+
+    except (OSError, ValueError) as e:
+        row["status"] = "error"
+        row["message"] = str(e)
+        return row, None
+
+def read_ahead(reader_pool, chunks, done):
+
+    # Submit the reads of chunk i + 1 before handing chunk i on, so the
+    # readers keep going while the processes extract features
+    ahead = None
+
+    for chunk in chunks:
+        futures = [reader_pool.submit(read_job, path, done) for path in chunk]
+        if ahead is not None:
+            yield [future.result() for future in ahead]
+        ahead = futures
+
+    if ahead is not None:
+        yield [future.result() for future in ahead]
+
+# ---------------------------------------------------
+# Stage 2: features (process pool)
+# ---------------------------------------------------
+def extract_job(img, bundle=None):
+
+    # -> (features, fast result or None, error). Runs in a worker, where
+    # the bundle was loaded by the pool initializer
+    bundle = bundle or current_model()
+
+    try:
+        decided = fast_decision(img, bundle)
+        if decided is not None:
+            return decided[0], decided[1], None
+
+        return image_features(img, bundle), None, None
+    except Exception as e:
+        return None, None, str(e)
+
+# ---------------------------------------------------
+# Stage 3: batched scoring
+# ---------------------------------------------------
+def score_chunk(decoded, extract, bundle):
+
+    images = [img for _, img in decoded if img is not None]
+    extracted = iter(extract(images))
+
+    rows = []
+    undecided = []
+
+    for row, img in decoded:
+
+        if img is not None:
+            features, result, error = next(extracted)
+
+            if error is not None:
+                row.update(status="error", message=error)
+            elif result is not None:
+                row.update(status="ok", **result)
+            else:
+                undecided.append((row, features))
+
+        rows.append(row)
+
+    # One engine call for everything the fast stage left open
+    if undecided:
+        try:
+            results = predict_features([features for _, features in undecided], bundle)
+            for (row, _), result in zip(undecided, results):
+                row.update(status="ok", **result)
+        except Exception as e:
+            for row, _ in undecided:
+                row.update(status="error", message=str(e))
+
+    return rows
+
+def explain_rows(rows, pool):
+
+    ok = [row for row in rows if row.get("status") == "ok"]
+    prompts = [build_prompt(row) for row in ok]
+
+    for row, explanation in zip(ok, pool.map(generate_explanation, prompts)):
+        row["explanation"] = explanation
+
+# ---------------------------------------------------
+# Outputs (the previous output doubles as the skip state)
+# ---------------------------------------------------
+def _row_key(row):
+    return row["path"], row.get("size"), row.get("mtime")
+
+def _is_done(row, model_version):
+    # Only verdicts of the serving bundle count: a new model rescans
+    return row.get("status") == "ok" and (model_version is None or row.get("model_version") == model_version)
+
+class JsonlWriter:
+
+    def __init__(self, path):
+        self.path = path
+        self.file = sys.stdout if path == "-" else open(path, "a", encoding="utf-8")
+
+        # Start on a fresh line after a torn row from an interrupted run
+        if self.file is not sys.stdout and self.file.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.file.write("\n")
+
+    @staticmethod
+    def done_keys(path, model_version=None):
+
+        done = set()
+        if path == "-" or not os.path.exists(path):
+            return done
+
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    # A torn last line from an interrupted run
+                    continue
+                if _is_done(row, model_version):
+                    done.add(_row_key(row))
+
+        return done
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+class ParquetWriter:
+
+    # A directory of part files: each part is complete once written, so an
+    # interrupted scan keeps everything up to the last flushed part
+    def __init__(self, path, part_rows=PART_ROWS):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet output requires pyarrow (pip install pyarrow).")
+
+        self.path = path
+        self.part_rows = part_rows
+        self.pending = []
+        os.makedirs(path, exist_ok=True)
+        self.part = len(self._parts(path))
+
+    @staticmethod
+    def _parts(path):
+        if not os.path.isdir(path):
+            return []
+        return sorted(f for f in os.listdir(path) if f.startswith("part-") and f.endswith(".parquet"))
+
+    @staticmethod
+    def schema():
+        import pyarrow as pa
+
+        # Fixed types, so a part whose rows are all errors (or all None in
+        # some column) still matches the others
+        feature = pa.struct([("feature", pa.string()), ("influence_score", pa.float64())])
+        types = {
+            "path": pa.string(), "size": pa.int64(), "mtime": pa.int64(), "status": pa.string(),
+            "message": pa.string(), "prediction": pa.string(), "confidence": pa.float64(),
+            "decided_by": pa.string(), "model_version": pa.string(), "top_features": pa.list_(feature),
+            "explanation": pa.string(), "scanned_at": pa.float64()
+        }
+        return pa.schema([(field, types[field]) for field in FIELDS])
+
+    @classmethod
+    def done_keys(cls, path, model_version=None):
+        import pyarrow.parquet as pq
+
+        done = set()
+        for part in cls._parts(path):
+            table = pq.read_table(
+                os.path.join(path, part), columns=["path", "size", "mtime", "status", "model_version"]
+            )
+            for row in table.to_pylist():
+                if _is_done(row, model_version):
+                    done.add(_row_key(row))
+
+        return done
+
+    def write(self, rows):
+        self.pending.extend(rows)
+        if len(self.pending) >= self.part_rows:
+            self.flush()
+
+    def flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self.pending:
+            return
+
+        table = pa.Table.from_pylist(
+            [{field: row.get(field) for field in FIELDS} for row in self.pending], schema=self.schema()
+        )
+        temp = os.path.join(self.path, f".part-{self.part:05d}.tmp")
+        pq.write_table(table, temp)
+        os.replace(temp, os.path.join(self.path, f"part-{self.part:05d}.parquet"))
+
+        self.part += 1
+        self.pending = []
+
+    def close(self):
+        self.flush()
+
+def open_writer(path, output_format=None):
+
+    output_format = output_format or ("parquet" if path.endswith(".parquet") else "jsonl")
+    if output_format == "parquet":
+        return ParquetWriter(path)
+    return JsonlWriter(path)
+
+# ---------------------------------------------------
+# Pipeline
+# ---------------------------------------------------
+def scan(paths, writer, done=frozenset(), workers=None, readers=READERS,
+         batch_size=BATCH_SIZE, explain=False, bundle=None, progress=None):
+
+    bundle = bundle or current_model()
+    counts = {"ok": 0, "fast": 0, "skipped": 0, "error": 0}
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    pool = None
+    llm_pool = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY) if explain else None
+
+    # workers=0 extracts in this process (small scans, tests)
+    if workers > 0:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(START_METHOD),
+            initializer=_init_worker
+        )
+        extract = lambda images: pool.map(extract_job, images, chunksize=max(1, len(images) // (workers * 4)))
+    else:
+        extract = lambda images: (extract_job(img, bundle) for img in images)
+
+    try:
+        with ThreadPoolExecutor(max_workers=readers) as reader_pool:
+            for decoded in read_ahead(reader_pool, _chunks(paths, batch_size), done):
+
+                rows = score_chunk(decoded, extract, bundle)
+                if llm_pool is not None:
+                    explain_rows(rows, llm_pool)
+
+                scanned_at = time.time()
+                written = []
+
+                for row in rows:
+                    counts[row["status"]] += 1
+                    if row.get("decided_by") == "fast":
+                        counts["fast"] += 1
+
+                    # Skipped files already have their row
+                    if row["status"] != "skipped":
+                        row["scanned_at"] = scanned_at
+                        written.append(row)
+
+                writer.write(written)
+
+                if progress is not None:
+                    progress.update(len(rows))
+                    progress.set_postfix(counts)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        if llm_pool is not None:
+            llm_pool.shutdown(wait=True)
+
+    return counts
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Scan directories of images and stream verdicts to JSON Lines or Parquet")
+    parser.add_argument("sources", nargs="+", help="directories or files to scan ('-' reads paths from stdin)")
+    parser.add_argument("-o", "--output", default="scan_results.jsonl",
+                        help="JSON Lines file ('-' for stdout) or a Parquet directory ending in .parquet")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), help="override the format chosen from --output")
+    parser.add_argument("--workers", type=int, default=None, help="feature extraction processes (0: in process)")
+    parser.add_argument("--readers", type=int, default=READERS, help="file read / decode threads")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--explain", action="store_true", help="also ask the LLM for an explanation of every verdict")
+    parser.add_argument("--rescan", action="store_true", help="ignore earlier results in --output")
+    args = parser.parse_args(argv)
+
+    try:
+        writer = open_writer(args.output, args.format)
+    except ValueError as e:
+        print("SCAN ERROR:", str(e))
+        return 1
+
+    bundle = current_model()
+    done = frozenset() if args.rescan else frozenset(writer.done_keys(args.output, bundle.version))
+
+    # Progress and summary go to stderr so "-o -" stays clean JSON Lines
+    log = sys.stderr
+    print(f"Model version   : {bundle.version}", file=log)
+    print(f"Already scanned : {len(done)}", file=log)
+
+    try:
+        with tqdm(desc="Scanning", unit="img", file=log) as progress:
+            counts = scan(
+                iter_paths(args.sources), writer, done,
+                workers=args.workers, readers=args.readers, batch_size=args.batch_size,
+                explain=args.explain, bundle=bundle, progress=progress
+            )
+    finally:
+        writer.close()
+
+    print(
+        f"Scanned {counts['ok']} ({counts['fast']} by the fast stage), "
+        f"{counts['skipped']} already done, {counts['error']} errors",
+        file=log
+    )
+    if args.output != "-":
+        print(f"Results: {args.output}", file=log)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
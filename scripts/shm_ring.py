@@ -0,0 +1,151 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from multiprocessing import shared_memory
+import numpy as np
+
+from scripts.worker_pool import MAX_IN_FLIGHT
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+# STEGO_SHM=0 sends uploads to the workers pickled, as before
+SHM_ENABLED = os.environ.get("STEGO_SHM", "1") != "0"
+
+# Images that can be with the workers at once; a full ring makes the
+# next request wait for a slot
+SHM_SLOTS = int(os.environ.get("STEGO_SHM_SLOTS", MAX_IN_FLIGHT))
+
+# Bytes per image slot. Prepared images are 512 x 512 unless one side was
+# 512 or less to begin with; larger ones take the pickled path
+SLOT_BYTES = int(os.environ.get("STEGO_SHM_SLOT_BYTES", 512 * 512 * 4))
+
+# float64 values per result slot (the feature vector)
+RESULT_WIDTH = 64
+
+# ---------------------------------------------------
+# Slot Ring (one shared block: image slots, then result slots)
+# ---------------------------------------------------
+class SlotRing:
+
+    def __init__(self, slots=SHM_SLOTS, slot_bytes=SLOT_BYTES, result_width=RESULT_WIDTH, name=None):
+
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.result_width = result_width
+        size = slots * (slot_bytes + result_width * 8)
+
+        # name=None creates the block (API process); a name attaches to it
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.name = self.shm.name
+
+        self._free = list(range(slots))
+        self._busy = set()
+        self._available = None
+
+    def describe(self):
+        # Everything a worker needs to attach
+        return self.name, self.slots, self.slot_bytes, self.result_width
+
+    def image(self, index, shape):
+        if int(np.prod(shape)) > self.slot_bytes:
+            raise ValueError("Image does not fit a shared memory slot.")
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=index * self.slot_bytes)
+
+    def result(self, index):
+        offset = self.slots * self.slot_bytes + index * self.result_width * 8
+        return np.ndarray((self.result_width,), dtype=np.float64, buffer=self.shm.buf, offset=offset)
+
+    def fits(self, img):
+        return img.dtype == np.uint8 and img.size <= self.slot_bytes and img.ndim == 2
+
+    @asynccontextmanager
+    async def slot(self):
+
+        # Backpressure: wait for a free slot, hand it back however the
+        # request ends
+        if self._available is None:
+            self._available = asyncio.Semaphore(self.slots)
+
+        await self._available.acquire()
+        index = self._free.pop()
+        try:
+            yield index
+        finally:
+            if index not in self._busy:
+                self._release(index)
+
+    def _release(self, index):
+        self._busy.discard(index)
+        self._free.append(index)
+        self._available.release()
+
+    def release_after(self, index, future):
+        # The request went away while a worker still reads the slot: keep
+        # it out of the ring until the worker is done
+        self._busy.add(index)
+        future.add_done_callback(lambda _: self._release(index))
+
+    def in_use(self):
+        return self.slots - len(self._free)
+
+    def close(self):
+        try:
+            self.shm.close()
+        except BufferError:
+            # A view is still alive somewhere; the unlink below still frees
+            # the block once every process lets go of it
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+# ---------------------------------------------------
+# API side (created in the lifespan, like the pool)
+# ---------------------------------------------------
+_ring = None
+
+def get_ring():
+    global _ring
+
+    if _ring is None and SHM_ENABLED:
+        try:
+            _ring = SlotRing()
+        except OSError as e:
+            print("SHARED MEMORY ERROR:", str(e))
+
+    return _ring
+
+def current_ring():
+    # The request path only uses a ring the lifespan set up
+    return _ring
+
+def slots_in_use():
+    return _ring.in_use() if _ring is not None else 0
+
+def close_ring():
+    global _ring
+
+    if _ring is not None:
+        _ring.close()
+        _ring = None
+
+# ---------------------------------------------------
+# Worker side (attached once per process)
+# ---------------------------------------------------
+_attached = {}
+
+def attach(descriptor):
+
+    name, slots, slot_bytes, result_width = descriptor
+    ring = _attached.get(name)
+
+    if ring is None:
+        # A restarted API creates a new block: drop the old mapping
+        for old in _attached.values():
+            old.shm.close()
+        _attached.clear()
+
+        ring = _attached[name] = SlotRing(slots, slot_bytes, result_width, name=name)
+
+    return ring
@@ -0,0 +1,336 @@
+import io
+import os
+import math
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.feature_extract import extract_features
+from scripts.decode import MAX_PIXELS, probe, check_limits, to_gray, _tiff_region
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+TILE_SIZE = 512
+TILE_CHUNK = int(os.environ.get("STEGO_TILE_CHUNK", 256))
+TILE_THREADS = int(os.environ.get("STEGO_TILE_THREADS", 1))
+MAX_TILES = int(os.environ.get("STEGO_MAX_TILES", 4096))
+
+# The verdict is the mean of the most suspicious fraction of tiles, so a
+# payload hidden in one region is not averaged away by clean sky
+TILE_TOP_FRACTION = float(os.environ.get("STEGO_TILE_TOP_FRACTION", 0.25))
+
+# Header-checked before decoding: the most pixels a stride-512 grid
+# within MAX_TILES can cover. Only TIFFs read in place or region by region
+# get this budget; anything decoded whole keeps decode.MAX_PIXELS
+MAX_TILED_PIXELS = MAX_TILES * TILE_SIZE * TILE_SIZE
+
+# Rows per strip when scanning a large image for its value range
+STRIP_ROWS = 1024
+
+TIFF_MAGIC = (b"II*\x00", b"MM\x00*")
+
+# ---------------------------------------------------
+# Image Sources (memory-mapped where the format allows)
+# ---------------------------------------------------
+def _tiff_view(source):
+    import tifffile
+
+    # Uncompressed TIFFs are viewed in place (file memmap or the upload
+    # buffer itself); None when the image would have to be decoded
+    if isinstance(source, str):
+        try:
+            return tifffile.memmap(source, mode="r")
+        except ValueError:
+            return None
+
+    with tifffile.TiffFile(io.BytesIO(source)) as tif:
+        page = tif.pages[0]
+
+        # is_final: uncompressed, contiguous, no predictor / bit reordering
+        if not page.is_final or page.dtype is None:
+            return None
+
+        dtype = page.dtype.newbyteorder(tif.byteorder)
+        array = np.frombuffer(source, dtype=dtype, count=math.prod(page.shape), offset=page.dataoffsets[0])
+
+        if page.planarconfig == 2 and len(page.shape) == 3:
+            return np.moveaxis(array.reshape(page.shape), 0, -1)
+
+        return array.reshape(page.shape)
+
+def _tiff_decode(source):
+    import tifffile
+    return tifffile.imread(source if isinstance(source, str) else io.BytesIO(source))
+
+class TiffRegions:
+
+    # An 8-bit strip- or tile-organised TIFF, decoded one region at a time:
+    # load() decodes the segments under one chunk of tiles, slices inside
+    # it are served from there, anything else is decoded on its own
+    dtype = np.dtype(np.uint8)
+
+    def __init__(self, data, height, width, channels=()):
+        self.data = data
+        self.shape = (height, width) + tuple(channels)
+        self.ndim = len(self.shape)
+        self.size = math.prod(self.shape)
+        self.box = None
+        self.region = None
+
+    @classmethod
+    def open(cls, source, info):
+
+        data = source
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                data = f.read()
+
+        # None when _tiff_region cannot read this layout region by region
+        corner = _tiff_region(data, (0, 0, 1, 1))
+        if corner is None:
+            return None
+
+        return cls(data, info["height"], info["width"], corner.shape[2:])
+
+    def _read(self, box):
+
+        region = _tiff_region(self.data, box)
+        if region is None:
+            raise ValueError("Invalid or corrupted image.")
+
+        return region
+
+    def load(self, box):
+        self.region = self._read(box)
+        self.box = box
+
+    def __getitem__(self, index):
+
+        rows, cols = index if isinstance(index, tuple) else (index, slice(None))
+        y0, y1, _ = rows.indices(self.shape[0])
+        x0, x1, _ = cols.indices(self.shape[1])
+
+        if self.box is not None:
+            by0, bx0, by1, bx1 = self.box
+            if by0 <= y0 and y1 <= by1 and bx0 <= x0 and x1 <= bx1:
+                return self.region[y0 - by0:y1 - by0, x0 - bx0:x1 - bx0]
+
+        return self._read((y0, x0, y1, x1))
+
+class TiledImage:
+
+    def __init__(self, array, channel_order="BGR"):
+
+        if array is None or array.ndim not in (2, 3) or array.size == 0:
+            raise ValueError("Invalid or corrupted image.")
+
+        self.array = array
+        self.channel_order = channel_order
+        self.height, self.width = array.shape[:2]
+        self._range = None
+
+    @classmethod
+    def open(cls, source):
+
+        # source: a file path or the raw upload bytes
+        if isinstance(source, str):
+            if not os.path.exists(source):
+                raise ValueError("Image file does not exist.")
+            with open(source, "rb") as f:
+                is_tiff = f.read(4) in TIFF_MAGIC
+        else:
+            is_tiff = bytes(source[:4]) in TIFF_MAGIC
+
+        info = probe(source)
+        check_limits(info, MAX_TILED_PIXELS)
+
+        if is_tiff:
+            try:
+                view = _tiff_view(source)
+            except Exception:
+                view = None
+            if view is not None:
+                return cls(view, channel_order="RGB")
+
+            try:
+                regions = TiffRegions.open(source, info) if info is not None else None
+            except Exception:
+                regions = None
+            if regions is not None:
+                return cls(regions, channel_order="RGB")
+
+        # Everything below decodes the whole image into memory
+        check_limits(info, MAX_PIXELS)
+
+        if is_tiff:
+            try:
+                return cls(_tiff_decode(source), channel_order="RGB")
+            except Exception:
+                # Let OpenCV try TIFF variants tifffile rejects
+                pass
+
+        if isinstance(source, str):
+            array = cv2.imread(source, cv2.IMREAD_UNCHANGED)
+        else:
+            array = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+
+        return cls(array)
+
+    def _gray(self, region):
+        return to_gray(region, self.channel_order)
+
+    def prefetch(self, origins, size=TILE_SIZE):
+
+        # Region-decoded TIFFs: decode every segment under these tiles once
+        if isinstance(self.array, TiffRegions):
+            ys, xs = [y for y, _ in origins], [x for _, x in origins]
+            self.array.load((
+                min(ys), min(xs), min(max(ys) + size, self.height), min(max(xs) + size, self.width)
+            ))
+
+    def value_range(self):
+
+        # Same min-max scaling prepare_image applies, over the whole image,
+        # read strip by strip so a memmap is never loaded at once
+        if self._range is None:
+            lo, hi = np.inf, -np.inf
+            for y in range(0, self.height, STRIP_ROWS):
+                strip = self._gray(self.array[y:y + STRIP_ROWS])
+                lo = min(lo, float(strip.min()))
+                hi = max(hi, float(strip.max()))
+            self._range = (lo, hi)
+
+        return self._range
+
+    def tile(self, y, x, size=TILE_SIZE):
+
+        region = self._gray(self.array[y:y + size, x:x + size])
+
+        if region.dtype != np.uint8:
+            lo, hi = self.value_range()
+            scale = 255.0 / (hi - lo) if hi > lo else 0.0
+            region = np.clip(np.rint((region.astype(np.float64) - lo) * scale), 0, 255).astype(np.uint8)
+
+        # Edge tiles of small images are padded the way prepare_image pads
+        h, w = region.shape
+        if h < size or w < size:
+            region = cv2.copyMakeBorder(region, 0, size - h, 0, size - w, cv2.BORDER_REFLECT)
+
+        return region
+
+# ---------------------------------------------------
+# Tile Grid
+# ---------------------------------------------------
+def tile_origins(length, size=TILE_SIZE, stride=TILE_SIZE):
+
+    if length <= size:
+        return [0]
+
+    origins = list(range(0, length - size + 1, stride))
+
+    # Last tile is flush with the edge so every pixel is covered
+    if origins[-1] != length - size:
+        origins.append(length - size)
+
+    return origins
+
+def tile_grid(height, width, size=TILE_SIZE, stride=TILE_SIZE):
+
+    if stride < 1:
+        raise ValueError("Tile stride must be positive.")
+
+    ys = tile_origins(height, size, stride)
+    xs = tile_origins(width, size, stride)
+
+    if len(ys) * len(xs) > MAX_TILES:
+        raise ValueError(f"Image would need {len(ys) * len(xs)} tiles (limit {MAX_TILES}); use a larger stride.")
+
+    return ys, xs
+
+# ---------------------------------------------------
+# Tiled Analysis
+# ---------------------------------------------------
+def _tile_features(image, origin):
+
+    img = image.tile(*origin)
+
+    # Flat tiles carry no texture to score
+    if np.std(img) < 1:
+        return None
+
+    return extract_features(img)
+
+def aggregate_confidence(probs, top_fraction=TILE_TOP_FRACTION):
+    k = max(1, int(math.ceil(len(probs) * top_fraction)))
+    return float(np.mean(np.partition(probs, len(probs) - k)[len(probs) - k:]))
+
+def analyze_tiles(source, engine, stride=TILE_SIZE, threads=TILE_THREADS, chunk_size=TILE_CHUNK):
+
+    image = source if isinstance(source, TiledImage) else TiledImage.open(source)
+    ys, xs = tile_grid(image.height, image.width, stride=stride)
+
+    origins = [(y, x) for y in ys for x in xs]
+    probs = np.full(len(origins), np.nan)
+    features = np.zeros((len(origins), len(engine.feature_names)))
+
+    pool = ThreadPoolExecutor(max_workers=threads) if threads > 1 else None
+
+    try:
+        # Bounded memory: one chunk of tiles in flight, one model call each
+        for start in range(0, len(origins), chunk_size):
+            chunk = origins[start:start + chunk_size]
+            image.prefetch(chunk)
+
+            if pool is not None:
+                extracted = list(pool.map(lambda o: _tile_features(image, o), chunk))
+            else:
+                extracted = [_tile_features(image, o) for o in chunk]
+
+            valid = [i for i, f in enumerate(extracted) if f is not None]
+            if not valid:
+                continue
+
+            rows = np.asarray([extracted[i] for i in valid], dtype=np.float64)
+            positions = np.asarray(valid) + start
+
+            features[positions] = rows
+            probs[positions] = engine.predict(rows, top_k=0)["final_prob"]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    scored = ~np.isnan(probs)
+    if not scored.any():
+        raise ValueError("Image has insufficient texture.")
+
+    confidence = aggregate_confidence(probs[scored])
+    worst = int(np.nanargmax(probs))
+
+    # Feature attributions of the most suspicious tile only
+    top_features = engine.results(features[worst:worst + 1])[0]["top_features"]
+
+    heatmap = [
+        [None if np.isnan(p) else round(float(p), 4) for p in row]
+        for row in probs.reshape(len(ys), len(xs))
+    ]
+
+    return {
+        "prediction": "STEGO" if confidence > engine.threshold else "COVER",
+        "confidence": round(confidence, 4),
+        "top_features": top_features,
+        "tiles": {
+            "size": TILE_SIZE,
+            "stride": stride,
+            "rows": len(ys),
+            "cols": len(xs),
+            "count": len(origins),
+            "scored": int(scored.sum()),
+            "stego": int((probs[scored] > engine.threshold).sum()),
+            "max_confidence": round(float(probs[worst]), 4),
+            "max_tile": {"y": origins[worst][0], "x": origins[worst][1]},
+            "mean_confidence": round(float(probs[scored].mean()), 4)
+        },
+        "heatmap": heatmap,
+        "image": {"height": image.height, "width": image.width}
+    }
@@ -1,112 +1,472 @@
 import os
-import pandas as pd
+import sys
+import json
+import math
+import hashlib
+import argparse
 import numpy as np
 
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, f1_score, roc_auc_score, classification_report
+from sklearn.metrics import f1_score, roc_auc_score, classification_report
 
 # ---------------------------------------------------
-# Load Dataset
+# Project Base Directory
 # ---------------------------------------------------
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-data_path = os.path.join(BASE_DIR, "features", "dataset_features.csv")
+sys.path.append(BASE_DIR)
 
-df = pd.read_csv(data_path)
+from scripts.inference_engine import LOG_WEIGHT, RF_WEIGHT, THRESHOLD
 
-print("Original dataset size:", len(df))
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+STORE_DIR = os.path.join(BASE_DIR, "features", "store")
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+
+# Fitted fold / final models, keyed on data hash + hyperparameters
+CACHE_DIR = os.environ.get("STEGO_TRAIN_CACHE", os.path.join(MODEL_DIR, "cache"))
+
+FOLDS = 5
+TEST_FRACTION = 5        # 1 row in 5 held out for the final report
+SEED = 42
+
+PARAMS = {
+    "log_max_iter": 2000,
+    "rf_trees": 200,
+    "seed": SEED
+}
 
 # ---------------------------------------------------
-# BALANCE DATASET (Downsample Stego)
+# Data
 # ---------------------------------------------------
-cover_df = df[df["label"] == 0]
-stego_df = df[df["label"] == 1]
+def load_features(csv_path=None, store_dir=STORE_DIR):
+
+    from scripts.feature_extract import FEATURE_NAMES
+
+    # Columns are selected by name in the extractor's order, never by
+    # position, so a reordered CSV cannot shuffle features silently
+    if csv_path:
+        import pandas as pd
+        df = pd.read_csv(csv_path)
+
+        missing = [name for name in FEATURE_NAMES + ["label"] if name not in df.columns]
+        if missing:
+            raise ValueError(f"{csv_path} lacks columns: {', '.join(missing)}")
+
+        return df[FEATURE_NAMES].to_numpy(dtype=np.float64), df["label"].to_numpy(dtype=np.int64), list(FEATURE_NAMES)
+
+    from scripts.feature_store import FeatureStore
+    X, y, _ = FeatureStore(store_dir, FEATURE_NAMES).load(latest=True)
 
-print("Cover samples :", len(cover_df))
-print("Stego samples :", len(stego_df))
+    if not len(y):
+        raise ValueError(
+            f"Feature store {store_dir} has no rows for the current extractor; run scripts/build_dataset.py "
+            f"or import a CSV with scripts/feature_store.py --import-csv."
+        )
 
-# Downsample stego to match cover count
-stego_downsampled = stego_df.sample(n=len(cover_df), random_state=42)
+    return np.ascontiguousarray(X, dtype=np.float64), np.asarray(y, dtype=np.int64), list(FEATURE_NAMES)
 
-# Combine
-balanced_df = pd.concat([cover_df, stego_downsampled])
+def row_hashes(X):
 
-# Shuffle
-balanced_df = balanced_df.sample(frac=1, random_state=42).reset_index(drop=True)
+    # Stable 64-bit hash per row (FNV-1a over the float bits, then a
+    # splitmix finalizer). Splits and folds are derived from it, so a row
+    # stays in the same split as the corpus grows
+    bits = np.ascontiguousarray(X, dtype=np.float64).view(np.uint64)
+    h = np.full(len(X), 0xcbf29ce484222325, dtype=np.uint64)
 
-print("Balanced dataset size:", len(balanced_df))
+    for column in bits.T:
+        h = (h ^ column) * np.uint64(0x100000001b3)
+
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xbf58476d1ce4e5b9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94d049bb133111eb)
+    h ^= h >> np.uint64(31)
+
+    return h
+
+def balance(hashes, y):
+
+    # Downsample stego to the cover count. Stego rows are kept in hash
+    # order rather than at random, so added rows barely change the set
+    cover = np.flatnonzero(y == 0)
+    stego = np.flatnonzero(y == 1)
+
+    if len(stego) > len(cover):
+        stego = stego[np.argsort(hashes[stego], kind="stable")[:len(cover)]]
+
+    return np.sort(np.concatenate([cover, stego]))
+
+def data_digest(X, y):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y, dtype=np.int64).tobytes())
+    return digest.hexdigest()
 
 # ---------------------------------------------------
-# Split Features and Labels
+# Fitting
 # ---------------------------------------------------
-X = balanced_df.drop("label", axis=1)
-y = balanced_df["label"]
+def fit_models(X, y, params, rf_jobs=1):
+
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    log_model = LogisticRegression(max_iter=params["log_max_iter"])
+    log_model.fit(X_scaled, y)
+
+    rf_model = RandomForestClassifier(n_estimators=params["rf_trees"], random_state=params["seed"], n_jobs=rf_jobs)
+    rf_model.fit(X, y)
 
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y,
-    test_size=0.2,
-    random_state=42,
-    stratify=y
-)
+    return {"log_model": log_model, "rf_model": rf_model, "scaler": scaler}
+
+def refresh_models(models, X, y, added, params, rf_jobs=1):
+
+    # Incremental update after rows were appended. The logistic model is
+    # refit on everything, starting from the previous coefficients; the
+    # forest keeps most of its trees and replaces the share that matches
+    # the share of new rows with trees grown on the full training set
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    log_model = LogisticRegression(max_iter=params["log_max_iter"], warm_start=True)
+    log_model.coef_ = models["log_model"].coef_.copy()
+    log_model.intercept_ = models["log_model"].intercept_.copy()
+    log_model.fit(X_scaled, y)
+
+    rf_model = models["rf_model"]
+    trees = len(rf_model.estimators_)
+    replace = min(trees, max(1, math.ceil(trees * added / len(y))))
+
+    fresh = RandomForestClassifier(n_estimators=replace, random_state=params["seed"] + len(y), n_jobs=rf_jobs)
+    fresh.fit(X, y)
+
+    rf_model.estimators_ = rf_model.estimators_[replace:] + fresh.estimators_
+
+    return {"log_model": log_model, "rf_model": rf_model, "scaler": scaler}, replace
+
+def predict_models(models, X):
+    log_prob = models["log_model"].predict_proba(models["scaler"].transform(X))[:, 1]
+    rf_prob = models["rf_model"].predict_proba(X)[:, 1]
+    return log_prob, rf_prob
 
 # ---------------------------------------------------
-# Standardization (for Logistic Regression)
+# Model Cache
 # ---------------------------------------------------
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
+def cache_key(X, y, params, role):
+    payload = json.dumps({"params": params, "role": role, "data": data_digest(X, y)}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def cache_load(key, cache_dir=CACHE_DIR):
+    import joblib
+
+    path = os.path.join(cache_dir, f"{key}.joblib")
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path)
+    except Exception as e:
+        print("TRAIN CACHE ERROR:", str(e))
+        return None
+
+def cache_store(key, models, cache_dir=CACHE_DIR):
+    import joblib
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.joblib")
+    temp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(models, temp)
+    os.replace(temp, path)
+
+def fit_cached(X, y, params, role, cache_dir=CACHE_DIR, rf_jobs=1):
+
+    key = cache_key(X, y, params, role)
+    models = cache_load(key, cache_dir) if cache_dir else None
+    if models is not None:
+        return models, True
+
+    models = fit_models(X, y, params, rf_jobs)
+    if cache_dir:
+        cache_store(key, models, cache_dir)
+    return models, False
 
 # ---------------------------------------------------
-# Logistic Regression
+# Cross-Validation (folds fitted in parallel)
 # ---------------------------------------------------
-log_model = LogisticRegression(max_iter=2000)
-log_model.fit(X_train_scaled, y_train)
+def _run_fold(X, y, train, valid, params, cache_dir, fold):
+
+    models, cached = fit_cached(X[train], y[train], params, f"fold-{fold}", cache_dir)
+    log_prob, rf_prob = predict_models(models, X[valid])
+
+    return fold, valid, log_prob, rf_prob, cached
+
+def fold_scores(y, log_prob, rf_prob):
+
+    ensemble = LOG_WEIGHT * log_prob + RF_WEIGHT * rf_prob
+    scores = {}
+
+    for name, prob, threshold in (
+        ("log", log_prob, 0.5), ("rf", rf_prob, 0.5), ("ensemble", ensemble, THRESHOLD)
+    ):
+        scores[name] = {
+            "f1": float(f1_score(y, prob > threshold)),
+            "auc": float(roc_auc_score(y, prob)) if len(np.unique(y)) > 1 else float("nan")
+        }
 
-log_probs = log_model.predict_proba(X_test_scaled)[:, 1]
-log_preds = (log_probs > 0.5).astype(int)
+    return scores
 
-log_f1 = f1_score(y_test, log_preds)
-log_auc = roc_auc_score(y_test, log_probs)
+def cross_validate(X, y, hashes, folds=FOLDS, params=PARAMS, jobs=-1, cache_dir=CACHE_DIR):
+    from joblib import Parallel, delayed
+
+    # Fold = row hash mod k, so a row never changes fold as the corpus
+    # grows. A fold's model is cached on its exact training rows, though,
+    # and an added row joins the training set of every other fold: reruns
+    # on the same data are served from the cache, a grown corpus refits
+    # (nearly) every fold
+    assignment = hashes % np.uint64(folds)
+    splits = [
+        (np.flatnonzero(assignment != fold), np.flatnonzero(assignment == fold))
+        for fold in range(folds)
+    ]
+
+    runs = Parallel(n_jobs=jobs)(
+        delayed(_run_fold)(X, y, train, valid, params, cache_dir, fold)
+        for fold, (train, valid) in enumerate(splits)
+    )
+
+    # Out-of-fold probabilities: every row scored by a model that never saw it
+    oof_log = np.empty(len(y))
+    oof_rf = np.empty(len(y))
+    per_fold = []
+
+    for fold, valid, log_prob, rf_prob, cached in sorted(runs, key=lambda run: run[0]):
+        oof_log[valid] = log_prob
+        oof_rf[valid] = rf_prob
+        per_fold.append({"fold": fold, "rows": len(valid), "cached": cached, **fold_scores(y[valid], log_prob, rf_prob)})
+
+    return oof_log, oof_rf, per_fold
+
+def summarize_folds(per_fold):
+    summary = {}
+    for model in ("log", "rf", "ensemble"):
+        for metric in ("f1", "auc"):
+            values = np.array([fold[model][metric] for fold in per_fold])
+            summary[f"{model}_{metric}"] = {"mean": float(np.nanmean(values)), "std": float(np.nanstd(values))}
+    return summary
 
 # ---------------------------------------------------
-# Random Forest
+# Final Model (incremental when only rows were added)
 # ---------------------------------------------------
-rf_model = RandomForestClassifier(n_estimators=200, random_state=42)
-rf_model.fit(X_train, y_train)
+def _state_paths(cache_dir):
+    return os.path.join(cache_dir, "latest.json"), os.path.join(cache_dir, "latest_rows.npy")
+
+def _read_state(cache_dir, params):
+    state_path, rows_path = _state_paths(cache_dir)
+    if not os.path.exists(state_path) or not os.path.exists(rows_path):
+        return None
+    with open(state_path) as f:
+        state = json.load(f)
+    if state.get("params") != params:
+        return None
+    return state, np.load(rows_path)
+
+def _write_state(cache_dir, key, params, hashes):
+    # Which rows the latest final model saw, for the next incremental run
+    state_path, rows_path = _state_paths(cache_dir)
+    np.save(rows_path, np.sort(hashes))
+    with open(state_path, "w") as f:
+        json.dump({"key": key, "params": params, "rows": int(len(hashes))}, f)
+
+def fit_final(X, y, hashes, params=PARAMS, cache_dir=CACHE_DIR, incremental=True, rf_jobs=-1):
+
+    # Refreshed models are cached under their own role, so --full never
+    # gets an incremental model back; an incremental run takes either
+    key = cache_key(X, y, params, "final")
+    refreshed_key = cache_key(X, y, params, "final-incremental")
 
-rf_probs = rf_model.predict_proba(X_test)[:, 1]
-rf_preds = (rf_probs > 0.5).astype(int)
+    candidates = (key, refreshed_key) if incremental else (key,)
 
-rf_f1 = f1_score(y_test, rf_preds)
-rf_auc = roc_auc_score(y_test, rf_probs)
+    for cached_key in candidates if cache_dir else ():
+        models = cache_load(cached_key, cache_dir)
+        if models is not None:
+            _write_state(cache_dir, cached_key, params, hashes)
+            return models, {"mode": "cached", "key": cached_key}
+
+    info = {"mode": "full", "key": key}
+    previous = _read_state(cache_dir, params) if incremental and cache_dir else None
+
+    # Every previous training row is still here and some are new
+    if previous is not None:
+        state, old_rows = previous
+        added = len(y) - len(old_rows)
+        old_models = cache_load(state["key"], cache_dir)
+
+        if old_models is not None and added > 0 and np.isin(old_rows, hashes).all():
+            models, replaced = refresh_models(old_models, X, y, added, params, rf_jobs)
+            info = {"mode": "incremental", "key": refreshed_key, "added_rows": int(added), "replaced_trees": replaced}
+
+    if info["mode"] == "full":
+        models = fit_models(X, y, params, rf_jobs)
+
+    if cache_dir:
+        cache_store(info["key"], models, cache_dir)
+        _write_state(cache_dir, info["key"], params, hashes)
+
+    return models, info
 
 # ---------------------------------------------------
-# Compare Models
+# Main
 # ---------------------------------------------------
-print("\nLogistic Regression")
-print("F1  :", round(log_f1, 4))
-print("AUC :", round(log_auc, 4))
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Train the LR + RF ensemble with cached, parallel cross-validation.")
+    parser.add_argument("--store", default=STORE_DIR, help="feature store directory")
+    parser.add_argument("--csv", help="train from a features CSV instead of the store")
+    parser.add_argument("--models", default=MODEL_DIR)
+    parser.add_argument("--folds", type=int, default=FOLDS, help="k for cross-validation (0 skips it)")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fold fits (-1: all cores)")
+    parser.add_argument("--trees", type=int, default=PARAMS["rf_trees"])
+    parser.add_argument("--cache", default=CACHE_DIR, help="fitted model cache ('' disables it)")
+    parser.add_argument("--full", action="store_true", help="refit from scratch even if only rows were added")
+    parser.add_argument("--no-cascade", action="store_true", help="serve without the fast first stage")
+    parser.add_argument("--no-publish", action="store_true")
+    args = parser.parse_args(argv)
+
+    params = {**PARAMS, "rf_trees": args.trees}
+    cache_dir = args.cache or None
+
+    # ---------------------------------------------------
+    # Load + Balance
+    # ---------------------------------------------------
+    try:
+        X, y, feature_names = load_features(args.csv, args.store)
+    except ValueError as e:
+        print("TRAINING ERROR:", str(e))
+        return 1
+
+    print("Original dataset size:", len(y))
+    print("Cover samples :", int(np.sum(y == 0)))
+    print("Stego samples :", int(np.sum(y == 1)))
+
+    hashes = row_hashes(X)
+    keep = balance(hashes, y)
+    X, y, hashes = X[keep], y[keep], hashes[keep]
+    print("Balanced dataset size:", len(y))
+
+    # Held-out rows for the final report (hash based, stable across runs).
+    # High bits here, low bits pick the CV fold
+    test = (hashes >> np.uint64(32)) % np.uint64(TEST_FRACTION) == 0
+    X_train, y_train, h_train = X[~test], y[~test], hashes[~test]
+    X_test, y_test = X[test], y[test]
+
+    # ---------------------------------------------------
+    # Cross-Validation
+    # ---------------------------------------------------
+    recommended = None
+
+    if args.folds > 1:
+        from scripts.evaluation import sweep, recommend
+
+        oof_log, oof_rf, per_fold = cross_validate(X_train, y_train, h_train, args.folds, params, args.jobs, cache_dir)
+
+        print(f"\n{args.folds}-fold cross-validation")
+        print(f"{'fold':<6} {'rows':>6} {'LR F1':>7} {'LR AUC':>7} {'RF F1':>7} {'RF AUC':>7} {'Ens F1':>7} {'cached':>7}")
+        for fold in per_fold:
+            print(
+                f"{fold['fold']:<6} {fold['rows']:>6} {fold['log']['f1']:>7.4f} {fold['log']['auc']:>7.4f} "
+                f"{fold['rf']['f1']:>7.4f} {fold['rf']['auc']:>7.4f} {fold['ensemble']['f1']:>7.4f} {str(fold['cached']):>7}"
+            )
+
+        summary = summarize_folds(per_fold)
+        for name, stats in summary.items():
+            print(f"  {name:<14} {stats['mean']:.4f} ± {stats['std']:.4f}")
+
+        # Operating point from out-of-fold scores, not one small split
+        recommended = recommend(sweep(oof_log, oof_rf, y_train), prefer=(LOG_WEIGHT, THRESHOLD))
+
+    # ---------------------------------------------------
+    # Final Fit + Held-out Report
+    # ---------------------------------------------------
+    models, info = fit_final(X_train, y_train, h_train, params, cache_dir, incremental=not args.full)
+    print(f"\nFinal model: {info['mode']}" + (
+        f" ({info['added_rows']} new rows, {info['replaced_trees']} trees replaced)" if info["mode"] == "incremental" else ""
+    ))
+
+    log_probs, rf_probs = predict_models(models, X_test)
+    log_preds = (log_probs > 0.5).astype(int)
+    rf_preds = (rf_probs > 0.5).astype(int)
+
+    log_f1, log_auc = f1_score(y_test, log_preds), roc_auc_score(y_test, log_probs)
+    rf_f1, rf_auc = f1_score(y_test, rf_preds), roc_auc_score(y_test, rf_probs)
+
+    print("\nLogistic Regression")
+    print("F1  :", round(log_f1, 4))
+    print("AUC :", round(log_auc, 4))
+
+    print("\nRandom Forest")
+    print("F1  :", round(rf_f1, 4))
+    print("AUC :", round(rf_auc, 4))
+
+    if (rf_f1 + rf_auc) > (log_f1 + log_auc):
+        print("\n✅ Best Model: Random Forest")
+        print(classification_report(y_test, rf_preds))
+    else:
+        print("\n✅ Best Model: Logistic Regression")
+        print(classification_report(y_test, log_preds))
+
+    if recommended is None:
+        from scripts.evaluation import sweep, recommend
+        recommended = recommend(sweep(log_probs, rf_probs, y_test), prefer=(LOG_WEIGHT, THRESHOLD))
+
+    print(
+        f"Recommended ensemble: log {recommended['log_weight']:g} / rf {recommended['rf_weight']:g}, "
+        f"threshold {recommended['threshold']:g} (F1 {recommended['f1']:.4f})"
+    )
+
+    # ---------------------------------------------------
+    # Save + Publish to the Model Registry (servers hot reload it)
+    # ---------------------------------------------------
+    import joblib
+
+    os.makedirs(args.models, exist_ok=True)
+    for name, model in models.items():
+        joblib.dump(model, os.path.join(args.models, f"{name}.pkl"))
+
+    print("Models saved successfully.")
+
+    # ---------------------------------------------------
+    # Cascade first stage (fit on train rows, band calibrated on held-out
+    # rows against the full ensemble's verdicts)
+    # ---------------------------------------------------
+    from scripts.cascade import fit_cascade, CASCADE_FILE
 
-print("\nRandom Forest")
-print("F1  :", round(rf_f1, 4))
-print("AUC :", round(rf_auc, 4))
+    cascade_path = os.path.join(args.models, CASCADE_FILE)
 
-if (rf_f1 + rf_auc) > (log_f1 + log_auc):
-    print("\n✅ Best Model: Random Forest")
-    print(classification_report(y_test, rf_preds))
-else:
-    print("\n✅ Best Model: Logistic Regression")
-    print(classification_report(y_test, log_preds))
+    if args.no_cascade:
+        if os.path.exists(cascade_path):
+            os.remove(cascade_path)
+    else:
+        cascade = fit_cascade(
+            X_train, y_train, X_test, LOG_WEIGHT * log_probs + RF_WEIGHT * rf_probs, feature_names
+        )
+        cascade.save(cascade_path)
+        print(
+            f"Cascade: band ±{cascade.band:g}, {cascade.stats['early_fraction']:.1%} of held-out images "
+            f"decided by the fast stage"
+        )
 
-import joblib
+    # Serving keeps the default operating point until
+    # evaluate_model.py --apply publishes a tuned bundle
+    if not args.no_publish:
+        from scripts.model_registry import publish_bundle
 
-model_dir = os.path.join(BASE_DIR, "models")
-os.makedirs(model_dir, exist_ok=True)
+        from scripts.feature_extract import EXTRACTOR_VERSION
 
-joblib.dump(log_model, os.path.join(model_dir, "log_model.pkl"))
-joblib.dump(rf_model, os.path.join(model_dir, "rf_model.pkl"))
-joblib.dump(scaler, os.path.join(model_dir, "scaler.pkl"))
+        version = publish_bundle(args.models, feature_names, extra={
+            "recommended": recommended, "training": info, "extractor_version": EXTRACTOR_VERSION
+        })
+        print("Published model bundle:", version)
 
-print("Models saved successfully.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import numpy as np
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+# Working-set cap (samples x paths x path features x quadrature nodes)
+# for one vectorized block
+ATTRIBUTION_BLOCK = 1 << 17
+
+# Flat path arrays compiled into the engine
+PATH_ARRAYS = ("path_feature", "path_lower", "path_upper", "path_zero", "path_value", "path_groups")
+
+# ---------------------------------------------------
+# Root-to-leaf Paths (built once, when the engine is compiled)
+# ---------------------------------------------------
+# Path-dependent TreeSHAP only needs, for every leaf, the features on its
+# path with:
+#   lower < x <= upper   the interval that follows every split on that
+#                        feature towards the leaf (the "one" fraction)
+#   zero                 the share of training cover that goes the same
+#                        way at those splits (the "zero" fraction)
+# A feature split on twice along a path is merged into one entry, as the
+# recursive algorithm does when it unwinds the earlier occurrence.
+
+def tree_paths(tree):
+
+    left, right = tree.children_left, tree.children_right
+    cover = tree.weighted_n_node_samples
+
+    proba = tree.value[:, 0, :]
+    proba = proba / proba.sum(axis=1, keepdims=True)
+
+    paths = []
+    stack = [(0, {})]
+
+    while stack:
+        node, bounds = stack.pop()
+
+        if left[node] == -1:
+            paths.append((proba[node, 1], bounds))
+            continue
+
+        feature, threshold = int(tree.feature[node]), tree.threshold[node]
+        lower, upper, zero = bounds.get(feature, (-np.inf, np.inf, 1.0))
+
+        for child, child_lower, child_upper in (
+            (left[node], lower, min(upper, threshold)),
+            (right[node], max(lower, threshold), upper)
+        ):
+            child_bounds = dict(bounds)
+            child_bounds[feature] = (child_lower, child_upper, zero * cover[child] / cover[node])
+            stack.append((child, child_bounds))
+
+    return paths
+
+def compile_paths(rf_model):
+
+    # A constant added to every leaf of a tree gets no share, so each tree
+    # gives up its most common leaf value (0 or 1 for pure leaves): those
+    # paths become zero and are dropped, as are single-leaf trees. Leaf
+    # values are divided by the tree count, so contributions add up to the
+    # forest mean directly
+    paths = []
+    for estimator in rf_model.estimators_:
+        tree = tree_paths(estimator.tree_)
+        weight = {}
+        for value, bounds in tree:
+            weight[value] = weight.get(value, 0) + len(bounds)
+        common = max(weight, key=weight.get)
+        paths.extend((value - common, bounds) for value, bounds in tree if value != common and bounds)
+
+    # Paths grouped by their number of distinct features m; within a group
+    # entry j of every path comes before entry j + 1 of any path, so a
+    # group reshapes to a dense (m x paths) block with long contiguous
+    # rows. path_groups holds (m, first path, first entry) per group
+    groups = {}
+    for value, bounds in paths:
+        groups.setdefault(len(bounds), []).append((value, sorted(bounds.items())))
+
+    values, entries, index = [], [], []
+    for length in sorted(groups):
+        members = groups[length]
+        index.append((length, len(values), len(entries)))
+        values.extend(value for value, _ in members)
+        for j in range(length):
+            entries.extend((items[j][0],) + items[j][1] for _, items in members)
+
+    entries = np.asarray(entries, dtype=np.float64).reshape(-1, 4)
+
+    return {
+        "path_feature": entries[:, 0].astype(np.intp),
+        "path_lower": entries[:, 1],
+        "path_upper": entries[:, 2],
+        "path_zero": entries[:, 3],
+        "path_value": np.asarray(values, dtype=np.float64) / len(rf_model.estimators_),
+        "path_groups": np.asarray(index, dtype=np.intp).reshape(-1, 3)
+    }
+
+# ---------------------------------------------------
+# Vectorized Path-dependent TreeSHAP
+# ---------------------------------------------------
+# For one path with distinct features j (zero fraction z_j, one fraction
+# o_j in {0, 1}) and leaf value v, feature i receives
+#     v * (o_i - z_i) * sum_S |S|! (m - |S| - 1)! / m! * prod_{j in S} o_j * prod_{j not in S, j != i} z_j
+# The Shapley weights are Beta integrals, which folds the sum into
+#     v * (o_i - z_i) * integral_0^1 prod_{j != i} (z_j (1 - u) + o_j u) du
+# The integrand is a polynomial of degree m - 1, so ceil(m / 2)
+# Gauss-Legendre nodes give it exactly. Everything below runs over all
+# samples, paths, path features and nodes of a group at once.
+
+_quadrature = {}
+
+def quadrature(length):
+
+    # Gauss-Legendre nodes and weights on [0, 1], exact up to degree length - 1
+    if length not in _quadrature:
+        nodes, weights = np.polynomial.legendre.leggauss((length + 1) // 2)
+        _quadrature[length] = ((nodes + 1.0) / 2.0, weights / 2.0)
+
+    return _quadrature[length]
+
+def _path_block(x, feature, lower, upper, zero, value, nodes, node_weights):
+
+    # Arrays are (samples, path features, paths) and (nodes, ...) on top:
+    # every step is a pass over long contiguous rows
+    values = x[:, feature]
+
+    # o_j - z_j
+    shift = ((values > lower) & (values <= upper)) - zero
+
+    # h_j(u) = z_j (1 - u) + o_j u = z_j + (o_j - z_j) u
+    factor = np.empty((len(nodes),) + shift.shape)
+    for k, node in enumerate(nodes):
+        np.multiply(shift, node, out=factor[k])
+        factor[k] += zero
+
+    total = factor[:, :, 0].copy()
+    for j in range(1, factor.shape[2]):
+        total *= factor[:, :, j]
+
+    # prod_{j != i} = prod_j / h_i (h_i > 0 inside (0, 1))
+    integral = np.zeros(shift.shape)
+    for k, weight in enumerate(node_weights):
+        integral += (weight * total[k])[:, None, :] / factor[k]
+
+    return shift * integral * value
+
+def path_shap(X, paths, n_features, block=ATTRIBUTION_BLOCK):
+
+    # -> (samples x features) contributions to the forest's mean P(stego);
+    # each row sums to rf_proba(x) minus the forest's expected value.
+    # sklearn compares float32 features, so the paths do too
+    X = np.asarray(X, dtype=np.float32).astype(np.float64)
+    n = len(X)
+    phi = np.zeros((n, n_features))
+    row_offsets = np.arange(n)[:, None, None] * n_features
+    groups = np.asarray(paths["path_groups"])
+    ends = np.append(groups[1:, 1], len(paths["path_value"]))
+
+    for (length, first, start), last in zip(groups, ends):
+
+        nodes, node_weights = quadrature(length)
+
+        rows = max(1, min(n, block // ((last - first) * length * len(nodes))))
+        span = max(1, block // (rows * length * len(nodes)))
+
+        group = slice(start, start + (last - first) * length)
+        shape = (length, last - first)
+
+        for begin in range(0, last - first, span):
+            part = slice(begin, begin + span)
+
+            feature = paths["path_feature"][group].reshape(shape)[:, part]
+            lower = paths["path_lower"][group].reshape(shape)[:, part]
+            upper = paths["path_upper"][group].reshape(shape)[:, part]
+            zero = paths["path_zero"][group].reshape(shape)[:, part]
+            value = paths["path_value"][first:last][part]
+
+            for row in range(0, n, rows):
+                x = X[row:row + rows]
+                contributions = _path_block(x, feature, lower, upper, zero, value, nodes, node_weights)
+                phi[row:row + rows] += np.bincount(
+                    (row_offsets[:len(x)] + feature).ravel(), contributions.ravel(), minlength=len(x) * n_features
+                ).reshape(len(x), n_features)
+
+    return phi
+
+# ---------------------------------------------------
+# Reference (recursive TreeSHAP, one tree and one sample at a time)
+# ---------------------------------------------------
+def _extend(path, zero, one, feature):
+
+    depth = len(path)
+    path = [list(entry) for entry in path] + [[feature, zero, one, 1.0 if depth == 0 else 0.0]]
+
+    for i in range(depth - 1, -1, -1):
+        path[i + 1][3] += one * path[i][3] * (i + 1) / (depth + 1)
+        path[i][3] = zero * path[i][3] * (depth - i) / (depth + 1)
+
+    return path
+
+def _unwind(path, index):
+
+    depth = len(path) - 1
+    _, zero, one, _ = path[index]
+    path = [list(entry) for entry in path]
+    carry = path[depth][3]
+
+    for i in range(depth - 1, -1, -1):
+        if one != 0:
+            previous = path[i][3]
+            path[i][3] = carry * (depth + 1) / ((i + 1) * one)
+            carry = previous - path[i][3] * zero * (depth - i) / (depth + 1)
+        else:
+            path[i][3] = path[i][3] * (depth + 1) / (zero * (depth - i))
+
+    for i in range(index, depth):
+        path[i][:3] = path[i + 1][:3]
+
+    return path[:depth]
+
+def _unwound_sum(path, index):
+
+    depth = len(path) - 1
+    _, zero, one, _ = path[index]
+    carry = path[depth][3]
+    total = 0.0
+
+    for i in range(depth - 1, -1, -1):
+        if one != 0:
+            share = carry * (depth + 1) / ((i + 1) * one)
+            total += share
+            carry = path[i][3] - share * zero * (depth - i) / (depth + 1)
+        else:
+            total += path[i][3] * (depth + 1) / (zero * (depth - i))
+
+    return total
+
+def reference_tree_shap(tree, x, phi, scale=1.0):
+
+    # Lundberg et al., Algorithm 2; adds scale * contributions into phi
+    left, right = tree.children_left, tree.children_right
+    cover = tree.weighted_n_node_samples
+    proba = tree.value[:, 0, :]
+    proba = proba[:, 1] / proba.sum(axis=1)
+    x = np.asarray(x, dtype=np.float32)
+
+    def recurse(node, path, zero, one, feature):
+        path = _extend(path, zero, one, feature)
+
+        if left[node] == -1:
+            for i in range(1, len(path)):
+                phi[path[i][0]] += scale * _unwound_sum(path, i) * (path[i][2] - path[i][1]) * proba[node]
+            return
+
+        split = int(tree.feature[node])
+        hot, cold = (left[node], right[node]) if x[split] <= tree.threshold[node] else (right[node], left[node])
+        incoming_zero, incoming_one = 1.0, 1.0
+
+        previous = next((i for i in range(1, len(path)) if path[i][0] == split), None)
+        if previous is not None:
+            incoming_zero, incoming_one = path[previous][1], path[previous][2]
+            path = _unwind(path, previous)
+
+        recurse(hot, path, incoming_zero * cover[hot] / cover[node], incoming_one, split)
+        recurse(cold, path, incoming_zero * cover[cold] / cover[node], 0.0, split)
+
+    recurse(0, [], 1.0, 1.0, -1)
+    return phi
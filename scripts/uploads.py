@@ -0,0 +1,141 @@
+import os
+import json
+from contextlib import aclosing
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.exceptions import HTTPException
+from starlette.formparsers import MultiPartParser, MultiPartException
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+MAX_UPLOAD_BYTES = int(os.environ.get("STEGO_MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+MAX_BATCH_UPLOAD_BYTES = int(os.environ.get("STEGO_MAX_BATCH_UPLOAD_BYTES", 2 * 1024 * 1024 * 1024))
+
+# Room for an uncompressed 8-bit TIFF at the tiled pixel budget (4096 tiles)
+MAX_TILED_UPLOAD_BYTES = int(os.environ.get("STEGO_MAX_TILED_UPLOAD_BYTES", 2 * 1024 * 1024 * 1024))
+SPOOL_THRESHOLD = int(os.environ.get("STEGO_SPOOL_THRESHOLD", 16 * 1024 * 1024))
+
+class UploadTooLarge(Exception):
+    pass
+
+# ---------------------------------------------------
+# Multipart Spooling (this app's routes only)
+# ---------------------------------------------------
+# Multipart files stay in memory up to the threshold; only larger
+# uploads roll over to an anonymous temp file (auto-deleted on close)
+class SpooledMultiPartParser(MultiPartParser):
+    spool_max_size = SPOOL_THRESHOLD
+
+class UploadRequest(Request):
+
+    # Overrides Starlette's private Request._get_form with its keywords;
+    # requirements.txt pins Starlette and test_uploads.py checks them
+    async def _get_form(self, *, max_files=1000, max_fields=1000, max_part_size=1024 * 1024):
+
+        # Parsed here with the larger spool; Starlette then returns the
+        # cached form as it would its own
+        if self._form is None and self.headers.get("content-type", "").startswith("multipart/form-data"):
+            try:
+                async with aclosing(self.stream()) as stream:
+                    parser = SpooledMultiPartParser(
+                        self.headers, stream, max_files=max_files, max_fields=max_fields, max_part_size=max_part_size
+                    )
+                    self._form = await parser.parse()
+            except MultiPartException as e:
+                raise HTTPException(status_code=400, detail=e.message)
+
+        return await super()._get_form(max_files=max_files, max_fields=max_fields, max_part_size=max_part_size)
+
+class UploadRoute(APIRoute):
+
+    # app.router.route_class = UploadRoute: handlers get an UploadRequest
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request):
+            return await handler(UploadRequest(request.scope, request.receive))
+
+        return route_handler
+
+# ---------------------------------------------------
+# Body Size Limit (enforced while the body streams in)
+# ---------------------------------------------------
+class BodySizeLimitMiddleware:
+
+    def __init__(self, app, max_bytes=MAX_UPLOAD_BYTES, path_limits=None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    def limit_for(self, path):
+        return self.path_limits.get(path.rstrip("/"), self.max_bytes)
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        limit = self.limit_for(scope["path"])
+
+        # Declared length: reject before reading anything
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                return await self._reject(send, limit)
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise UploadTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            # The framework turns the aborted body into its own error
+            # response; swap it for a 413
+            if exceeded:
+                if message["type"] == "http.response.start" and not started:
+                    started = True
+                    await self._reject(send, limit)
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            if not started:
+                await self._reject(send, limit)
+
+    async def _reject(self, send, limit):
+        body = json.dumps({"detail": f"Upload exceeds {limit} bytes."}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+# ---------------------------------------------------
+# Upload Bytes
+# ---------------------------------------------------
+async def read_upload(upload, max_bytes=MAX_UPLOAD_BYTES):
+
+    data = await upload.read(max_bytes + 1)
+
+    if len(data) > max_bytes:
+        raise UploadTooLarge()
+
+    return data
@@ -0,0 +1,89 @@
+import os
+import asyncio
+import multiprocessing
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+# ---------------------------------------------------
+# Configuration
+# ---------------------------------------------------
+WORKERS = int(os.environ.get("STEGO_WORKERS", os.cpu_count() or 1))
+MAX_IN_FLIGHT = int(os.environ.get("STEGO_MAX_IN_FLIGHT", WORKERS * 2))
+MAX_QUEUE = int(os.environ.get("STEGO_MAX_QUEUE", WORKERS * 8))
+QUEUE_TIMEOUT = float(os.environ.get("STEGO_QUEUE_TIMEOUT", 30))
+START_METHOD = os.environ.get("STEGO_START_METHOD") or None
+
+# ---------------------------------------------------
+# Process Pool (models loaded once per worker)
+# ---------------------------------------------------
+_executor = None
+
+def _init_worker():
+    # Load the active model bundle before the first request arrives
+    from scripts.predict_and_explain import current_model
+    current_model()
+
+def get_executor():
+    global _executor
+
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=WORKERS,
+            mp_context=multiprocessing.get_context(START_METHOD),
+            initializer=_init_worker
+        )
+
+    return _executor
+
+def shutdown_executor():
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+async def run_in_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), fn, *args)
+
+# ---------------------------------------------------
+# Admission Control
+# ---------------------------------------------------
+class Overloaded(Exception):
+
+    def __init__(self, status_code, message, retry_after=1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class AdmissionController:
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+    @asynccontextmanager
+    async def admit(self):
+
+        # Queue full -> reject straight away, the client should back off
+        if self.in_flight + self.waiting >= self.max_in_flight + self.max_queue:
+            raise Overloaded(429, "Too many requests queued. Retry later.")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise Overloaded(503, "Server busy. Timed out waiting for a worker.")
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
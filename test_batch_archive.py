@@ -0,0 +1,46 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from scripts.backend_service import ArchiveTooLarge, read_archive
+
+
+def zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def tar_bytes(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("pack", [zip_bytes, tar_bytes])
+def test_archive_limits_stop_reading_early(pack):
+    members = {f"{i}.png": bytes(100) for i in range(5)}
+    assert len(list(read_archive(pack(members)))) == 5
+
+    read = []
+    with pytest.raises(ArchiveTooLarge, match="more than 3 images"):
+        for item in read_archive(pack(members), max_images=3):
+            read.append(item)
+    assert len(read) == 3
+
+    # A member that inflates past the cap is refused before it is read
+    with pytest.raises(ArchiveTooLarge, match="uncompressed"):
+        list(read_archive(pack({"bomb.png": bytes(10 ** 6)}), max_member_bytes=10 ** 5))
+
+    with pytest.raises(ArchiveTooLarge, match="Archive exceeds"):
+        list(read_archive(pack(members), max_total_bytes=250))
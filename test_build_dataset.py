@@ -0,0 +1,37 @@
+import cv2
+import numpy as np
+
+from scripts.build_dataset import collect_covers, run_build
+from scripts.embedding import embed, image_rng
+from scripts.feature_extract import FEATURE_NAMES, extract_features
+from scripts.feature_store import FeatureStore
+
+
+def test_one_pass_build_matches_embed_then_extract(tmp_path):
+    cover_dir = tmp_path / "cover"
+    cover_dir.mkdir()
+
+    rng = np.random.default_rng(4)
+    for i in range(3):
+        img = cv2.GaussianBlur(rng.integers(0, 256, (96, 96), dtype=np.uint8), (3, 3), 0)
+        cv2.imwrite(str(cover_dir / f"{i}.png"), img)
+
+    store = FeatureStore(str(tmp_path / "store"), FEATURE_NAMES)
+    covers = collect_covers(str(cover_dir))
+
+    counts = run_build(covers, store, str(tmp_path / "stego"), methods=["lsb", "hill"], payloads=[0.2], workers=2)
+    features, labels, index = store.load()
+
+    assert counts["rows"] == 9 and len(index) == 9
+    assert sorted(labels.tolist()) == [0] * 3 + [1] * 6
+    assert {(row["method"], row["payload"]) for row in index} == {("cover", 0.0), ("lsb", 0.2), ("hill", 0.2)}
+
+    # Same features as writing the variant out and extracting it separately
+    cover = cv2.imread(covers[0], cv2.IMREAD_GRAYSCALE)
+    stego = embed(cover, "hill", 0.2, rng=image_rng(0, "0.png", "hill", 0.2))
+    row = next(i for i, r in enumerate(index) if r["method"] == "hill" and r["path"].endswith("hill_0.2/0.png"))
+    np.testing.assert_allclose(features[row], np.nan_to_num(extract_features(stego)))
+
+    # A second run finds everything already stored
+    again = run_build(covers, store, str(tmp_path / "stego"), methods=["lsb", "hill"], payloads=[0.2], workers=1)
+    assert again["skipped"] == 3 and again["rows"] == 0
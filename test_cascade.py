@@ -0,0 +1,32 @@
+import cv2
+import numpy as np
+
+from scripts.feature_extract import extract_features, extract_fast_features, FAST_FEATURE_NAMES
+from scripts.cascade import Cascade, choose_band
+
+
+def test_fast_features_match_full_extractor():
+    rng = np.random.default_rng(0)
+    img = cv2.GaussianBlur(rng.integers(0, 256, (512, 512), dtype=np.uint8), (3, 3), 0)
+
+    fast = extract_fast_features(img)
+    full = extract_features(img)[:len(FAST_FEATURE_NAMES)]
+
+    assert np.allclose(fast, full, rtol=1e-3, atol=1e-6)
+
+
+def test_band_keeps_uncertain_images_for_the_full_ensemble():
+    # First stage is right far from the threshold, wrong close to it
+    fast_prob = np.array([0.01, 0.05, 0.35, 0.45, 0.9, 0.95])
+    full_verdict = np.array([False, False, True, False, True, True])
+
+    calibration = choose_band(fast_prob, full_verdict, threshold=0.4, target=1.0)
+    assert calibration["band"] == 0.1
+    assert calibration["early_fraction"] == 4 / 6
+
+    cascade = Cascade(np.zeros(len(FAST_FEATURE_NAMES)), 0.0, np.zeros(len(FAST_FEATURE_NAMES)), threshold=0.4, band=0.2)
+    assert cascade.decide(np.zeros((1, len(FAST_FEATURE_NAMES))))[0] is None
+
+    cascade.band = 0.05
+    result = cascade.decide(np.zeros((1, len(FAST_FEATURE_NAMES))))[0]
+    assert result["prediction"] == "STEGO" and result["decided_by"] == "fast"
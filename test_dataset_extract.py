@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+
+from scripts.feature_extract import FEATURE_NAMES
+from scripts.feature_store import FeatureStore
+from scripts.dataset_extract import collect_jobs, run_extraction, store_path, content_hash
+
+
+def write_image(path, seed):
+    rng = np.random.default_rng(seed)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(path), rng.integers(0, 256, (64, 64), dtype=np.uint8))
+
+
+def test_extraction_resumes_without_duplicates(tmp_path):
+    cover, stego = tmp_path / "cover", tmp_path / "stego"
+    write_image(cover / "a.png", 0)
+    write_image(cover / "b.png", 1)
+    write_image(stego / "lsb_0.2" / "a.png", 2)
+    (cover / "broken.png").write_bytes(b"not an image")
+
+    store = FeatureStore(str(tmp_path / "store"), FEATURE_NAMES)
+    jobs = collect_jobs(str(cover), str(stego))
+    assert len(jobs) == 4
+
+    # chunk_size=1: every row is flushed as its own part
+    counts = run_extraction(jobs, store, workers=2, chunk_size=1)
+    assert counts == {"done": 3, "skipped": 0, "error": 1}
+    assert len(store.parts()) == 3
+
+    X, y, index = store.load()
+    by_path = {row["path"]: row for row in index}
+    stego_row = by_path[store_path(str(stego / "lsb_0.2" / "a.png"))]
+    assert (stego_row["method"], stego_row["payload"]) == ("lsb", 0.2)
+    assert stego_row["hash"] == content_hash((stego / "lsb_0.2" / "a.png").read_bytes())
+    assert sorted(y.tolist()) == [0, 0, 1]
+
+    # Second run: one new file, one rewritten with different pixels
+    write_image(cover / "c.png", 3)
+    write_image(cover / "b.png", 4)
+
+    counts = run_extraction(collect_jobs(str(cover), str(stego)), store, workers=2)
+    assert counts == {"done": 2, "skipped": 2, "error": 1}
+
+    keys = [(row["path"], row["hash"]) for row in store.index()]
+    assert len(keys) == len(set(keys)) == 5
+
+    # The rewritten file keeps only its new row for training
+    X, y, index = store.load(latest=True)
+    assert len(index) == 4
+    assert by_path[store_path(str(cover / "b.png"))]["hash"] not in {row["hash"] for row in index}
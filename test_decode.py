@@ -0,0 +1,46 @@
+import io
+import struct
+import zlib
+
+import cv2
+import numpy as np
+import pytest
+import tifffile
+
+from scripts.decode import probe
+from scripts.predict_and_explain import prepare_image, decode_image_bytes
+
+
+def full_decode(data):
+    return prepare_image(cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED))
+
+
+def test_region_decode_matches_full_decode():
+    rng = np.random.default_rng(0)
+    color = cv2.GaussianBlur(rng.integers(0, 256, (900, 1300, 3), dtype=np.uint8), (5, 5), 0)
+
+    tiled = io.BytesIO()
+    tifffile.imwrite(tiled, color[:, :, ::-1], photometric="rgb", tile=(256, 256), compression="zlib")
+
+    inputs = {
+        "png": cv2.imencode(".png", color)[1].tobytes(),
+        "jpeg": cv2.imencode(".jpg", color)[1].tobytes(),
+        "bmp": cv2.imencode(".bmp", color)[1].tobytes(),
+        "pnm": cv2.imencode(".pgm", color[:, :, 0])[1].tobytes(),
+        "tiff": tiled.getvalue()
+    }
+
+    for fmt, data in inputs.items():
+        assert probe(data)["format"] == fmt
+        assert (probe(data)["width"], probe(data)["height"]) == (1300, 900)
+        np.testing.assert_array_equal(decode_image_bytes(data), full_decode(data), err_msg=fmt)
+
+
+def test_oversized_header_is_rejected_before_decoding():
+    # A 2 KB PNG that claims to be 100000 x 100000
+    ihdr = struct.pack(">IIBBBBB", 100000, 100000, 8, 0, 0, 0, 0)
+    chunk = lambda kind, body: struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+    data = b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", zlib.compress(bytes(2000))) + chunk(b"IEND", b"")
+
+    with pytest.raises(ValueError, match="limit"):
+        decode_image_bytes(data)
@@ -0,0 +1,53 @@
+import hashlib
+import os
+
+import cv2
+import numpy as np
+
+from scripts.embedding import EMBEDDERS, collect_covers, run_embedding, top_k_indices
+
+
+def cover():
+    rng = np.random.default_rng(5)
+    return cv2.GaussianBlur(rng.integers(0, 256, (64, 64), dtype=np.uint8), (3, 3), 0)
+
+
+def test_embedders_change_only_budgeted_pixels():
+    img = cover()
+
+    for name, embed in EMBEDDERS.items():
+        stego = embed(img, 0.2, np.random.default_rng(0))
+        diff = np.abs(stego.astype(int) - img)
+
+        assert stego.dtype == np.uint8 and stego.shape == img.shape
+        assert diff.max() <= (2 if name == "pvd" else 1)
+        assert np.count_nonzero(diff) <= 2 * int(0.2 * img.size)
+
+
+def test_top_k_matches_full_sort():
+    cost = np.random.default_rng(2).permutation(1000).astype(np.float32)
+
+    assert set(top_k_indices(cost, 100)) == set(np.argsort(-cost)[:100])
+    assert len(top_k_indices(cost, 0)) == 0
+    assert len(top_k_indices(cost, 5000)) == 1000
+
+
+def test_output_independent_of_worker_count(tmp_path):
+    cover_dir = tmp_path / "cover"
+    cover_dir.mkdir()
+    for i in range(4):
+        cv2.imwrite(str(cover_dir / f"{i}.png"), np.roll(cover(), i, axis=0))
+
+    def digest(root):
+        h = hashlib.sha256()
+        for path in sorted(root.rglob("*.png")):
+            h.update(str(path.relative_to(root)).encode())
+            h.update(path.read_bytes())
+        return h.hexdigest()
+
+    covers = collect_covers(str(cover_dir))
+    run_embedding(covers, str(tmp_path / "one"), payloads=[0.2], workers=1)
+    run_embedding(covers, str(tmp_path / "two"), payloads=[0.2], workers=2)
+
+    assert digest(tmp_path / "one") == digest(tmp_path / "two")
+    assert sorted(os.listdir(tmp_path / "one")) == ["hill_0.2", "lsb_0.2", "pvd_0.2", "wow_0.2"]
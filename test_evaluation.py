@@ -0,0 +1,75 @@
+import numpy as np
+
+from sklearn.metrics import roc_auc_score, f1_score, average_precision_score
+
+from scripts.evaluation import sweep, curves, recommend, breakdown
+
+
+def synthetic_scores(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    y = rng.integers(0, 2, n)
+    log_prob = np.clip(rng.normal(0.4 + 0.2 * y, 0.2), 0, 1)
+    # Coarse forest-like probabilities, so ties are exercised
+    rf_prob = np.round(np.clip(rng.normal(0.3 + 0.3 * y, 0.25), 0, 1), 2)
+    return log_prob, rf_prob, y
+
+
+def test_sweep_matches_sklearn():
+    log_prob, rf_prob, y = synthetic_scores()
+    weights = np.array([0.0, 0.6, 1.0])
+    thresholds = np.array([0.2, 0.4, 0.6])
+
+    result = sweep(log_prob, rf_prob, y, weights, thresholds)
+
+    for w, weight in enumerate(weights):
+        scores = weight * log_prob + (1 - weight) * rf_prob
+        assert np.isclose(result["auc"][w], roc_auc_score(y, scores))
+        for t, threshold in enumerate(thresholds):
+            assert np.isclose(result["f1"][w, t], f1_score(y, scores > threshold))
+
+
+def test_curves_and_recommendation():
+    log_prob, rf_prob, y = synthetic_scores(seed=1)
+    scores = 0.6 * log_prob + 0.4 * rf_prob
+
+    curve = curves(scores, y)
+    assert np.isclose(curve["roc_auc"], roc_auc_score(y, scores))
+    assert np.isclose(curve["average_precision"], average_precision_score(y, scores))
+
+    result = sweep(log_prob, rf_prob, y)
+    best = recommend(result)
+    assert best["f1"] == result["f1"].max()
+    assert recommend(result, max_fpr=0.05)["fpr"] <= 0.05
+
+
+def test_breakdown_per_group():
+    scores = np.array([0.1, 0.2, 0.9, 0.8, 0.3])
+    labels = np.array([0, 0, 1, 1, 1])
+    methods = [None, None, "lsb", "lsb", "wow"]
+
+    report = breakdown(scores, labels, methods, threshold=0.5)
+
+    assert report["lsb"]["count"] == 2
+    assert report["lsb"]["detection_rate"] == 1.0
+    assert np.isclose(report["lsb"]["mean_score"], 0.85)
+    assert report["lsb"]["auc"] == 1.0
+    assert report["wow"]["detection_rate"] == 0.0
+    assert report["wow"]["auc"] == 1.0
+
+
+def test_evaluation_rows_are_the_training_hold_out():
+    from evaluate_model import held_out
+    from scripts.train_models import row_hashes, balance, TEST_FRACTION
+
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(500, 6))
+    y = (rng.random(500) < 0.7).astype(int)
+
+    test = held_out(X)
+    assert 0 < test.sum() < len(y)
+
+    # Whatever train_models balances away, every row it fits on is outside the evaluation set
+    hashes = row_hashes(X)
+    keep = balance(hashes, y)
+    fitted = keep[(hashes[keep] >> np.uint64(32)) % np.uint64(TEST_FRACTION) != 0]
+    assert not test[fitted].any()
@@ -0,0 +1,77 @@
+import asyncio
+
+from scripts import explanation_cache
+from scripts.explanation_cache import ExplanationCache, explanation_key, quantize
+from scripts.llm_service import LLM_FAILED_MESSAGE
+
+
+def result(prediction, *scores):
+    return {
+        "prediction": prediction,
+        "top_features": [{"feature": f"f{i}", "influence_score": s} for i, s in enumerate(scores)]
+    }
+
+
+def test_nearby_scores_share_a_key():
+    assert quantize(0.012345) == 0.012 and quantize(-431.0) == -430.0
+    assert quantize(0.0) == 0.0 and quantize(float("nan")) == 0.0
+
+    key = explanation_key(result("STEGO", 0.01234, -0.501))
+    assert explanation_key(result("STEGO", 0.01231, -0.503)) == key
+    assert explanation_key(result("STEGO", 0.01234, -0.501)) == key
+
+    # Another label, feature order or a real change in a score: new key
+    assert explanation_key(result("COVER", 0.01234, -0.501)) != key
+    assert explanation_key(result("STEGO", -0.501, 0.01234)) != key
+    assert explanation_key(result("STEGO", 0.0129, -0.501)) != key
+
+
+def test_concurrent_generations_of_one_key_call_the_llm_once():
+
+    async def run():
+        cache = ExplanationCache()
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "explained"
+
+        texts = await asyncio.gather(*(cache.generate("k", factory) for _ in range(8)))
+        assert texts == ["explained"] * 8
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 7 and cache.stats()["inflight"] == 0
+
+        # Later calls are plain hits
+        assert await cache.generate("k", factory) == "explained"
+        assert len(calls) == 1
+
+        # A failed generation is handed to the waiters but never cached
+        async def failing():
+            calls.append(1)
+            return LLM_FAILED_MESSAGE
+
+        assert await cache.generate("down", failing) == LLM_FAILED_MESSAGE
+        assert cache.get("down") is None
+
+    asyncio.run(run())
+
+
+def test_entries_expire_and_stay_within_the_size_bound(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(explanation_cache.time, "monotonic", lambda: now[0])
+
+    cache = ExplanationCache(max_entries=2, ttl=60)
+    cache.put("a", "A")
+    now[0] += 59
+    assert cache.get("a") == "A"
+    now[0] += 2
+    assert cache.get("a") is None and cache.stats()["entries"] == 0
+
+    # Least recently used goes first
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+from scripts import explanation_jobs
+from scripts.explanation_cache import ExplanationCache
+from scripts.explanation_jobs import ExplanationJobs, webhook_allowed
+
+
+def test_webhooks_are_denied_unless_allowlisted():
+    allow = ["https://hooks.example.com/stego/", "http://10.0.0.5:8080"]
+
+    assert not webhook_allowed("https://hooks.example.com/stego/x")
+    assert webhook_allowed("https://hooks.example.com/stego/x", allow)
+    assert webhook_allowed("http://10.0.0.5:8080/any", allow)
+
+    for url in ["http://127.0.0.1:11434/api/generate", "http://169.254.169.254/latest",
+                "https://hooks.example.com.evil.net/stego/", "https://hooks.example.com/stegox",
+                "http://10.0.0.5/any", "ftp://hooks.example.com/stego/", "http://[::1"]:
+        assert not webhook_allowed(url, allow), url
+
+
+def test_jobs_stream_coalesce_and_notify(monkeypatch):
+    calls, posts = [], []
+
+    async def fake_stream(prompt):
+        calls.append(prompt)
+        for token in ["The ", "image ", "is clean."]:
+            await asyncio.sleep(0.01)
+            yield token
+
+    class Client:
+        async def post(self, url, json):
+            posts.append((url, json))
+            return type("Response", (), {"raise_for_status": lambda self: None})()
+
+    monkeypatch.setattr(explanation_jobs, "stream_explanation", fake_stream)
+    monkeypatch.setattr(explanation_jobs, "get_client", lambda: Client())
+
+    async def run():
+        cache = ExplanationCache()
+        jobs = ExplanationJobs(cache=cache)
+
+        first = jobs.submit("prompt", key="k", callback_url="http://hook/x", context={"prediction": "COVER"})
+        second = jobs.submit("prompt", key="k")
+        assert first.describe()["stream"] == f"/explanations/{first.id}/stream"
+
+        events = [event async for event in jobs.stream(first.id)]
+        await asyncio.sleep(0.05)
+
+        # One generation, mirrored to the second job, then cached
+        assert calls == ["prompt"]
+        assert first.to_dict()["llm_explanation"] == second.explanation == "The image is clean."
+        assert jobs.submit("prompt", key="k").text == "The image is clean."
+
+        tokens = [json.loads(e.split("data: ")[1])["token"] for e in events if e.startswith("event: token")]
+        assert "".join(tokens) == "The image is clean."
+        assert events[-1].startswith("event: done") and '"prediction": "COVER"' in events[-1]
+        assert posts == [("http://hook/x", first.to_dict())]
+
+        await jobs.close()
+
+    asyncio.run(run())
+
+
+def test_prune_skips_running_jobs(monkeypatch):
+
+    async def slow_stream(prompt):
+        await asyncio.sleep(10)
+        yield "never"
+
+    monkeypatch.setattr(explanation_jobs, "stream_explanation", slow_stream)
+
+    async def run():
+        jobs = ExplanationJobs(max_jobs=3)
+        running = jobs.submit("slow")
+        done = [jobs.submit("x") for _ in range(2)]
+        for job in done:
+            await jobs._finish(job, "done", "text", None)
+
+        # The oldest job is still running: finished ones behind it still go
+        for _ in range(3):
+            await jobs._finish(jobs.submit("more"), "done", "text", None)
+        assert jobs.get(running.id) is running
+        assert all(jobs.get(job.id) is None for job in done)
+        assert len(jobs._jobs) <= 3
+
+        await jobs.close()
+
+    asyncio.run(run())
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.feature_store import FeatureStore
+
+
+NAMES = ["a", "b", "c"]
+
+
+def rows(values, path="img.png", label=0):
+    return [{"path": f"{path}{i}", "hash": str(v), "label": label, "features": [v, v * 2, v * 3]} for i, v in enumerate(values)]
+
+
+def test_schema_and_extractor_version_are_enforced(tmp_path):
+    root = str(tmp_path / "store")
+    FeatureStore(root, NAMES, extractor_version=1).append(rows([1.0, 2.0]))
+
+    with pytest.raises(ValueError, match="column 1"):
+        FeatureStore(root, ["a", "c", "b"], extractor_version=1)
+
+    # A new extractor version ignores (and recomputes) the old rows
+    store = FeatureStore(root, NAMES, extractor_version=2)
+    assert len(store) == 0 and store.keys() == set()
+    store.append(rows([5.0]))
+
+    X, y, index = store.load()
+    assert X.tolist() == [[5.0, 10.0, 15.0]]
+    assert store.describe()["stale_rows"] == 2
+
+
+def test_csv_import_by_name_latest_rows_and_column_reads(tmp_path):
+    csv = tmp_path / "features.csv"
+    # Columns shuffled on purpose: matched by name, not position
+    pd.DataFrame({"label": [0, 1, 1], "c": [3.0, 6.0, 9.0], "a": [1.0, 2.0, 3.0], "b": [2.0, 4.0, 6.0],
+                  "path": ["x.png", "y.png", "x.png"]}).to_csv(csv, index=False)
+
+    store = FeatureStore(str(tmp_path / "store"), NAMES)
+    assert store.import_csv(str(csv), chunk_size=2) == 3
+    assert len(store.parts()) == 2
+
+    X, y, index = store.load()
+    assert X[:, 0].tolist() == [1.0, 2.0, 3.0] and X[:, 2].tolist() == [3.0, 6.0, 9.0]
+
+    X, y, index = store.load(columns=["c"], latest=True)
+    assert [row["path"] for row in index] == ["y.png", "x.png"]
+    assert X.ravel().tolist() == [6.0, 9.0] and y.tolist() == [1, 1]
+
+    np.testing.assert_array_equal(store.column("b"), [2.0, 4.0, 6.0])
+
+
+def test_export_and_compaction_keep_the_latest_rows(tmp_path):
+    image = tmp_path / "kept.png"
+    image.write_bytes(b"")
+
+    store = FeatureStore(str(tmp_path / "store"), NAMES, extractor_version=1)
+    store.append([{"path": str(image), "hash": "old", "label": 0, "features": [1.0, 1.0, 1.0]}])
+    FeatureStore(store.root, NAMES, extractor_version=2).append(rows([7.0]))
+
+    store = FeatureStore(store.root, NAMES, extractor_version=2)
+    store.append([
+        {"path": str(image), "hash": "old", "label": 0, "features": [1.0, 2.0, 3.0]},
+        {"path": str(tmp_path / "deleted.png"), "hash": "gone", "label": 1, "features": [4.0, 5.0, 6.0]},
+        {"path": "features.csv#0", "hash": "csv", "label": 1, "features": [0.0, 0.0, 0.0]}
+    ])
+    store.append([{"path": str(image), "hash": "new", "label": 0, "features": [2.0, 4.0, 6.0]}])
+
+    csv = tmp_path / "export.csv"
+    assert store.export_csv(str(csv)) == 4
+    assert pd.read_csv(csv)["a"].tolist() == [7.0, 4.0, 0.0, 2.0]
+
+    assert store.compact() == 4
+    assert len(store.parts()) == 1 and store.describe()["stale_rows"] == 0
+
+    assert store.compact(drop_missing=True) == 2
+    X, y, index = store.load()
+    assert [row["hash"] for row in index] == ["csv", "new"]
+    assert X[:, 0].tolist() == [0.0, 2.0]
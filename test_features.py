@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+import pytest
+
+from scripts.glcm import glcm_features
+from scripts.feature_extract import (
+    FEATURE_NAMES, FeatureExtractor, extract_features, extract_features_reference
+)
+
+
+def sample_images():
+    rng = np.random.default_rng(7)
+
+    noise = rng.integers(0, 256, (512, 512), dtype=np.uint8)
+    smooth = cv2.GaussianBlur(noise, (9, 9), 0)
+    odd = rng.integers(0, 256, (37, 53), dtype=np.uint8)
+    flat = np.full((16, 16), 9, dtype=np.uint8)
+
+    return [noise, smooth, odd, flat]
+
+
+def skimage_glcm_features(img):
+    feature = pytest.importorskip("skimage.feature")
+
+    glcm = feature.graycomatrix(
+        img,
+        distances=[1],
+        angles=[0, np.pi/4, np.pi/2, 3*np.pi/4],
+        levels=256,
+        symmetric=True,
+        normed=True
+    )
+
+    features = []
+    for prop in ['contrast', 'correlation', 'energy', 'homogeneity']:
+        features.extend(feature.graycoprops(glcm, prop)[0])
+
+    return features
+
+
+@pytest.mark.parametrize("index", range(4))
+def test_glcm_matches_skimage(index):
+    img = sample_images()[index]
+
+    expected = skimage_glcm_features(img)
+    actual = glcm_features(img)
+
+    assert len(actual) == 16
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("index", range(3))
+def test_fused_extractor_matches_reference(index):
+    img = sample_images()[index]
+
+    expected = np.array(extract_features_reference(img), dtype=np.float64)
+    actual = extract_features(img)
+
+    assert actual.dtype == np.float64
+    assert actual.shape == (len(FEATURE_NAMES),)
+
+    # The reference computes the residual in float32
+    tolerance = np.full(len(FEATURE_NAMES), 1e-7)
+    tolerance[FEATURE_NAMES.index("residual_variance"):FEATURE_NAMES.index("high_freq_energy")] = 1e-4
+
+    np.testing.assert_array_less(
+        np.abs(actual - expected),
+        tolerance * np.maximum(np.abs(expected), 1e-3)
+    )
+
+
+def test_fused_extractor_reuses_buffers_across_shapes():
+    extractor = FeatureExtractor()
+
+    for img in sample_images()[:3]:
+        expected = np.array(extract_features_reference(img), dtype=np.float64)
+        np.testing.assert_allclose(extractor.extract(img), expected, rtol=1e-4)
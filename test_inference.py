@@ -0,0 +1,108 @@
+import itertools
+import math
+
+import numpy as np
+
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+
+from scripts.inference_engine import EnsembleEngine, reference_results
+from scripts.tree_shap import PATH_ARRAYS, compile_paths, path_shap
+
+
+def trained_models():
+    rng = np.random.default_rng(3)
+
+    # Features on very different scales, like the real extractor output
+    X = rng.standard_normal((400, 31)) * rng.uniform(0.01, 1000, 31)
+    y = (X[:, 0] / X[:, 0].std() + rng.standard_normal(400) > 0).astype(int)
+
+    scaler = StandardScaler().fit(X)
+    log_model = LogisticRegression(max_iter=2000).fit(scaler.transform(X), y)
+    rf_model = RandomForestClassifier(n_estimators=20, random_state=42).fit(X, y)
+
+    names = [f"f{i}" for i in range(31)]
+    return log_model, rf_model, scaler, names, rng.standard_normal((50, 31)) * X.std(axis=0)
+
+
+def test_engine_matches_sklearn_path():
+    log_model, rf_model, scaler, names, X = trained_models()
+    engine = EnsembleEngine(log_model, rf_model, scaler, names)
+
+    assert engine.results(X) == reference_results(log_model, rf_model, scaler, names, X)
+
+
+def test_engine_probabilities():
+    log_model, rf_model, scaler, names, X = trained_models()
+    out = EnsembleEngine(log_model, rf_model, scaler, names).predict(X)
+
+    np.testing.assert_array_equal(out["rf_prob"], rf_model.predict_proba(X)[:, 1])
+    np.testing.assert_allclose(out["log_prob"], log_model.predict_proba(scaler.transform(X))[:, 1], rtol=1e-12)
+    assert out["top_index"].shape == (len(X), 5)
+
+    # top_k=0 gives the same probabilities without any attribution
+    engine = EnsembleEngine(log_model, rf_model, scaler, names)
+    engine.rf_contributions = None
+    bare = engine.predict(X, top_k=0)
+    np.testing.assert_array_equal(bare["final_prob"], out["final_prob"])
+    assert bare["top_index"].shape == bare["top_score"].shape == (len(X), 0)
+
+    # Blocks of a few rows walk the same paths
+    engine = EnsembleEngine(log_model, rf_model, scaler, names)
+    leaves = np.stack([estimator.apply(X.astype(np.float32)) for estimator in rf_model.estimators_])
+    np.testing.assert_array_equal(engine.rf_leaves(X, block=60) - engine.tree_roots[:, None], leaves)
+
+
+def test_compiled_engine_round_trip(tmp_path):
+    log_model, rf_model, scaler, names, X = trained_models()
+    engine = EnsembleEngine(log_model, rf_model, scaler, names)
+
+    engine.save(str(tmp_path / "engine"))
+    compiled = EnsembleEngine.load_compiled(str(tmp_path / "engine"))
+
+    assert isinstance(compiled.node_threshold, np.memmap)
+    assert compiled.results(X) == engine.results(X)
+
+
+def test_contributions_add_up_to_the_prediction():
+    log_model, rf_model, scaler, names, X = trained_models()
+    engine = EnsembleEngine(log_model, rf_model, scaler, names)
+    out = engine.predict(X)
+
+    contributions = engine.contributions(X)
+    np.testing.assert_allclose(contributions.sum(axis=1) + engine.expected_value(), out["final_prob"], atol=1e-12)
+
+    # Small blocks split paths and rows differently, same numbers
+    np.testing.assert_allclose(path_shap(X, {name: getattr(engine, name) for name in PATH_ARRAYS}, 31, block=64),
+                               engine.rf_contributions(X), atol=1e-15)
+
+
+def test_tree_contributions_are_exact_shapley_values():
+    rng = np.random.default_rng(5)
+    X = rng.standard_normal((300, 4))
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.standard_normal(300) * 0.5 > 0).astype(int)
+    rf_model = RandomForestClassifier(n_estimators=4, max_depth=6, random_state=0).fit(X, y)
+
+    def expected(tree, x, known, node=0):
+        # E[tree(x) | features in known], following training cover elsewhere
+        left, right = tree.children_left[node], tree.children_right[node]
+        if left == -1:
+            return tree.value[node, 0, 1] / tree.value[node, 0].sum()
+        if tree.feature[node] in known:
+            return expected(tree, x, known, left if np.float32(x[tree.feature[node]]) <= tree.threshold[node] else right)
+        cover = tree.weighted_n_node_samples
+        return (cover[left] * expected(tree, x, known, left) + cover[right] * expected(tree, x, known, right)) / cover[node]
+
+    x = rng.standard_normal(4)
+    exact = np.zeros(4)
+    for estimator in rf_model.estimators_:
+        for i in range(4):
+            others = [j for j in range(4) if j != i]
+            for size in range(4):
+                for subset in itertools.combinations(others, size):
+                    weight = math.factorial(size) * math.factorial(3 - size) / math.factorial(4)
+                    gain = expected(estimator.tree_, x, set(subset) | {i}) - expected(estimator.tree_, x, set(subset))
+                    exact[i] += weight * gain / len(rf_model.estimators_)
+
+    np.testing.assert_allclose(path_shap(x[None], compile_paths(rf_model), 4)[0], exact, atol=1e-12)
@@ -0,0 +1,36 @@
+from scripts.metrics import MetricsRegistry, Timings
+
+
+def test_histogram_renders_cumulative_buckets():
+    metrics = MetricsRegistry()
+    latency = metrics.histogram("demo_seconds", "Demo latency.", ["stage"], buckets=(0.1, 1.0))
+    hits = metrics.counter("demo_total", "Demo counter.", ["result"])
+
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, stage="features")
+    hits.inc(result="hit")
+    hits.inc(result="hit")
+
+    text = metrics.render()
+
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{stage="features",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="features",le="1.0"} 3' in text
+    assert 'demo_seconds_bucket{stage="features",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{stage="features"} 4' in text
+    assert 'demo_total{result="hit"} 2' in text
+
+
+def test_timings_accumulate_per_stage():
+    timings = Timings()
+
+    timings.add("features", 0.010)
+    timings.merge({"features": 0.005, "inference": 0.001})
+    with timings.stage("llm"):
+        pass
+
+    report = timings.as_dict()
+
+    assert report["features"] == 15.0
+    assert report["inference"] == 1.0
+    assert set(report) == {"features", "inference", "llm", "total"}
@@ -0,0 +1,106 @@
+import json
+import time
+
+import joblib
+import numpy as np
+
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+
+from scripts.feature_extract import FEATURE_NAMES
+from scripts.model_registry import ModelBundle, ModelRegistry, activate, publish_bundle, read_manifest
+from scripts.cascade import Cascade, CASCADE_FILE, FAST_FEATURE_NAMES
+
+
+def save_models(path, seed):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((200, len(FEATURE_NAMES)))
+    y = (X[:, seed] > 0).astype(int)
+
+    scaler = StandardScaler().fit(X)
+    path.mkdir()
+    joblib.dump(scaler, path / "scaler.pkl")
+    joblib.dump(LogisticRegression().fit(scaler.transform(X), y), path / "log_model.pkl")
+    joblib.dump(RandomForestClassifier(n_estimators=5, random_state=seed).fit(X, y), path / "rf_model.pkl")
+
+    return str(path)
+
+
+def test_publish_and_hot_swap(tmp_path):
+    registry_dir = str(tmp_path / "registry")
+
+    v1 = publish_bundle(save_models(tmp_path / "a", 1), FEATURE_NAMES, registry_dir, threshold=0.5)
+    v2 = publish_bundle(save_models(tmp_path / "b", 2), FEATURE_NAMES, registry_dir, make_active=False)
+
+    assert read_manifest(registry_dir)["active"] == v1
+    with open(tmp_path / "registry" / v1 / "bundle.json") as f:
+        assert json.load(f)["feature_names"] == FEATURE_NAMES
+
+    registry = ModelRegistry(registry_dir, reload_interval=0)
+    first = registry.current()
+    assert first.version == v1 and first.engine.threshold == 0.5
+
+    # The old bundle keeps serving while the new one loads beside it
+    activate(v2, registry_dir)
+    assert registry.current() is first
+
+    deadline = time.time() + 10
+    while registry.current().version != v2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert registry.current().version == v2
+    assert registry.reload().version == v2
+
+
+def test_failed_reload_backs_off_until_the_manifest_changes(tmp_path):
+    registry_dir = str(tmp_path / "registry")
+    v1 = publish_bundle(save_models(tmp_path / "a", 1), FEATURE_NAMES, registry_dir)
+    v2 = publish_bundle(save_models(tmp_path / "b", 2), FEATURE_NAMES, registry_dir, make_active=False)
+
+    registry = ModelRegistry(registry_dir, reload_interval=0, reload_retry=3600)
+    first = registry.current()
+
+    attempts = []
+    load = registry._load
+
+    def broken(version):
+        attempts.append(version)
+        raise ValueError("broken bundle")
+
+    registry._load = broken
+    activate(v2, registry_dir)
+
+    deadline = time.time() + 10
+    while registry._failed is None and time.time() < deadline:
+        registry.current()
+        time.sleep(0.01)
+
+    # Further requests keep the old bundle and start no new loads
+    for _ in range(20):
+        assert registry.current() is first
+    time.sleep(0.05)
+    assert attempts == [v2]
+
+    # A manifest change retries at once
+    registry._load = load
+    activate(v1, registry_dir)
+    activate(v2, registry_dir)
+
+    deadline = time.time() + 10
+    while registry.current().version != v2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert registry.current().version == v2
+
+
+def test_tuned_bundles_serve_without_the_default_cascade(tmp_path):
+    model_dir = save_models(tmp_path / "models", 1)
+    width = len(FAST_FEATURE_NAMES)
+    Cascade(np.zeros(width), 0.0, np.zeros(width), band=0.2).save(f"{model_dir}/{CASCADE_FILE}")
+
+    registry_dir = tmp_path / "registry"
+    default = publish_bundle(model_dir, FEATURE_NAMES, str(registry_dir))
+    tuned = publish_bundle(model_dir, FEATURE_NAMES, str(registry_dir), log_weight=0.3, rf_weight=0.7, threshold=0.55)
+
+    assert ModelBundle.load(str(registry_dir / default)).cascade.band == 0.2
+    assert ModelBundle.load(str(registry_dir / tuned)).cascade is None
@@ -0,0 +1,95 @@
+import json
+
+import cv2
+import numpy as np
+
+from scripts import result_cache
+from scripts.result_cache import DiskTier, ResultCache, pixel_key, upload_key
+
+
+def entry(n):
+    return {"prediction": "COVER", "confidence": 0.1, "padding": "x" * n}
+
+
+def test_keys_follow_pixels_model_version_and_result_format(monkeypatch):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 256, (32, 48), dtype=np.uint8)
+
+    # Re-encoded copies decode to the same pixels, so they share a key
+    png = cv2.imdecode(cv2.imencode(".png", img)[1], cv2.IMREAD_UNCHANGED)
+    bmp = cv2.imdecode(cv2.imencode(".bmp", img)[1], cv2.IMREAD_UNCHANGED)
+    assert pixel_key(png, "v1") == pixel_key(bmp, "v1") == pixel_key(img, "v1")
+
+    # Same bytes in another shape, another model, another format: new keys
+    keys = {
+        pixel_key(img, "v1"), pixel_key(img.reshape(48, 32), "v1"), pixel_key(img, "v2"),
+        upload_key(img.tobytes(), "v1"), upload_key(img.tobytes(), "v2")
+    }
+    assert len(keys) == 5
+
+    monkeypatch.setattr(result_cache, "RESULT_FORMAT", result_cache.RESULT_FORMAT + 1)
+    assert pixel_key(img, "v1") not in keys
+    assert upload_key(img.tobytes(), "v1") not in keys
+
+
+def test_memory_tier_hits_misses_and_evicts_by_bytes():
+    size = len(json.dumps(entry(100)).encode())
+    cache = ResultCache(max_bytes=2 * size)
+
+    assert cache.get("a") is None
+    cache.put("a", entry(100))
+    cache.put("b", entry(100))
+    assert cache.get("a") == entry(100)
+
+    # "a" was used last, so "b" goes when "c" does not fit
+    cache.put("c", entry(100))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["bytes"] == 2 * size
+    assert (stats["hits"], stats["misses"]) == (3, 2)
+
+    # One entry over the whole budget is not kept
+    cache.put("huge", entry(10 * size))
+    assert cache.get("huge") is None
+
+
+def test_disk_tier_survives_a_restart_and_evicts_least_recently_used(tmp_path):
+    directory = str(tmp_path / "cache")
+
+    cache = ResultCache(disk_dir=directory)
+    cache.put("a", entry(10))
+    cache.disk.close()
+
+    # New process: memory is empty, the result comes back from SQLite
+    cache = ResultCache(disk_dir=directory)
+    assert cache.get("a") == entry(10)
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get("a") == entry(10)
+    assert cache.stats()["disk_hits"] == 1
+    cache.disk.close()
+
+    disk = DiskTier(str(tmp_path / "small"), max_bytes=250)
+    for key in ("a", "b"):
+        disk.put(key, b"x" * 100)
+    disk.get("a")
+    disk.put("c", b"x" * 100)
+    assert disk.get("b") is None
+    assert disk.get("a") == b"x" * 100 and disk.get("c") == b"x" * 100
+    disk.close()
+
+
+def test_upload_aliases_resolve_to_pixel_keys():
+    cache = ResultCache()
+    img = np.zeros((8, 8), dtype=np.uint8)
+
+    upload, key = upload_key(b"file bytes", "v1"), pixel_key(img, "v1")
+    assert cache.resolve(upload) is None
+
+    cache.alias(upload, key)
+    cache.put(key, entry(1))
+    assert cache.get(cache.resolve(upload)) == entry(1)
+
+    # A new model version has its own upload key, so the old alias is unused
+    assert cache.resolve(upload_key(b"file bytes", "v2")) is None
@@ -0,0 +1,86 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+
+from scripts.feature_extract import FEATURE_NAMES
+from scripts.inference_engine import EnsembleEngine
+from scripts.model_registry import ModelBundle
+from scripts.scan import JsonlWriter, ParquetWriter, iter_paths, scan
+
+
+def small_bundle():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((200, len(FEATURE_NAMES)))
+    y = (X[:, 0] > 0).astype(int)
+
+    scaler = StandardScaler().fit(X)
+    engine = EnsembleEngine(
+        LogisticRegression().fit(scaler.transform(X), y),
+        RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y),
+        scaler, FEATURE_NAMES
+    )
+    return ModelBundle("test", engine, {})
+
+
+def test_scan_streams_rows_and_skips_finished_files(tmp_path):
+    rng = np.random.default_rng(1)
+    images = tmp_path / "share" / "nested"
+    images.mkdir(parents=True)
+
+    for i in range(3):
+        cv2.imwrite(str(images / f"img{i}.png"), rng.integers(0, 256, (64, 64), dtype=np.uint8))
+    (images / "broken.png").write_bytes(b"not an image")
+    (images / "notes.txt").write_text("ignored")
+
+    output = str(tmp_path / "scan.jsonl")
+    bundle = small_bundle()
+    paths = list(iter_paths([str(tmp_path / "share")]))
+    assert len(paths) == 4
+
+    writer = JsonlWriter(output)
+    counts = scan(iter(paths), writer, workers=0, batch_size=2, bundle=bundle)
+    writer.close()
+
+    assert counts["ok"] == 3 and counts["error"] == 1
+    with open(output) as f:
+        rows = [json.loads(line) for line in f]
+    assert {row["status"] for row in rows} == {"ok", "error"}
+    assert all(row["model_version"] == "test" for row in rows if row["status"] == "ok")
+    assert all("explanation" not in row for row in rows)
+
+    # Second pass: only the unreadable file is tried again
+    writer = JsonlWriter(output)
+    counts = scan(iter(paths), writer, JsonlWriter.done_keys(output, "test"), workers=0, batch_size=2, bundle=bundle)
+    writer.close()
+
+    assert counts == {"ok": 0, "fast": 0, "skipped": 3, "error": 1}
+
+    # Verdicts of another model version are not reused
+    assert JsonlWriter.done_keys(output, "retrained") == set()
+    assert len(JsonlWriter.done_keys(output, "test")) == 3
+
+
+def test_parquet_parts_keep_one_schema(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    output = str(tmp_path / "scan.parquet")
+    writer = ParquetWriter(output, part_rows=1)
+    writer.write([{"path": "/a.png", "size": 1, "mtime": 2, "status": "error", "message": "bad"}])
+    writer.write([{
+        "path": "/b.png", "size": 3, "mtime": 4, "status": "ok", "prediction": "COVER", "confidence": 0.1,
+        "decided_by": "full", "model_version": "test", "scanned_at": 5.0,
+        "top_features": [{"feature": "f", "influence_score": 0.01}]
+    }])
+    writer.close()
+
+    schemas = [pq.read_schema(f"{output}/{part}") for part in ParquetWriter._parts(output)]
+    assert len(schemas) == 2 and schemas[0] == schemas[1] == ParquetWriter.schema()
+    assert ParquetWriter.done_keys(output, "test") == {("/b.png", 3, 4)}
+    assert ParquetWriter.done_keys(output, "retrained") == set()
@@ -0,0 +1,46 @@
+import asyncio
+
+import numpy as np
+
+from scripts.shm_ring import SlotRing, attach
+
+
+def test_slots_are_shared_and_full_ring_applies_backpressure():
+    ring = SlotRing(slots=2, slot_bytes=64 * 64)
+    worker = attach(ring.describe())
+
+    async def run():
+        async with ring.slot() as first:
+            ring.image(first, (64, 64))[:] = 7
+            assert worker.image(first, (64, 64)).sum() == 7 * 64 * 64
+
+            worker.result(first)[:3] = [1.0, 2.0, 3.0]
+            assert ring.result(first)[:3].tolist() == [1.0, 2.0, 3.0]
+
+            async with ring.slot():
+                assert ring.in_use() == 2
+                waiter = ring.slot()
+                waiting = asyncio.ensure_future(waiter.__aenter__())
+                await asyncio.sleep(0.01)
+                assert not waiting.done()
+
+            # Freed slot goes to the waiter
+            assert await asyncio.wait_for(waiting, 1.0) in (0, 1)
+            await waiter.__aexit__(None, None, None)
+
+        # A slot whose request was cancelled stays out until the worker ends
+        busy = asyncio.get_running_loop().create_future()
+        async with ring.slot() as index:
+            ring.release_after(index, busy)
+        assert ring.in_use() == 1
+        busy.set_result(None)
+        await asyncio.sleep(0)
+        assert ring.in_use() == 0
+
+    try:
+        asyncio.run(run())
+    finally:
+        worker.shm.close()
+        ring.close()
+
+    assert ring.fits(np.zeros((64, 64), dtype=np.uint8)) and not ring.fits(np.zeros((65, 64), dtype=np.uint8))
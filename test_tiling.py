@@ -0,0 +1,111 @@
+import cv2
+import numpy as np
+import pytest
+
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+
+from scripts.feature_extract import FEATURE_NAMES, extract_features
+from scripts.inference_engine import EnsembleEngine
+from scripts.tiling import TiledImage, analyze_tiles, tile_origins
+
+
+def small_engine():
+    rng = np.random.default_rng(8)
+    X = rng.standard_normal((200, len(FEATURE_NAMES))) * rng.uniform(0.1, 100, len(FEATURE_NAMES))
+    y = (X[:, 0] > 0).astype(int)
+
+    scaler = StandardScaler().fit(X)
+    log_model = LogisticRegression(max_iter=1000).fit(scaler.transform(X), y)
+    rf_model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+
+    return EnsembleEngine(log_model, rf_model, scaler, FEATURE_NAMES)
+
+
+def textured(h, w, seed=0):
+    noise = np.random.default_rng(seed).integers(0, 256, (h, w), dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (3, 3), 0)
+
+
+def test_tile_origins_cover_every_pixel():
+    assert tile_origins(300) == [0]
+    assert tile_origins(1024) == [0, 512]
+    assert tile_origins(1100) == [0, 512, 588]
+    assert tile_origins(1100, stride=256) == [0, 256, 512, 588]
+
+
+def test_tiled_analysis_scores_every_tile():
+    engine = small_engine()
+    img = textured(1100, 1300)
+    data = cv2.imencode(".png", img)[1].tobytes()
+
+    # TreeSHAP runs for the worst tile only, not for every chunk
+    explained = []
+    rf_contributions = engine.rf_contributions
+    engine.rf_contributions = lambda X: explained.append(len(X)) or rf_contributions(X)
+
+    result = analyze_tiles(data, engine)
+    assert explained == [1]
+
+    assert (result["tiles"]["rows"], result["tiles"]["cols"]) == (3, 3)
+    assert np.array(result["heatmap"]).shape == (3, 3)
+
+    # Each heatmap cell is the ensemble score of that exact tile
+    expected = engine.predict([extract_features(img[512:1024, 788:1300])])["final_prob"][0]
+    assert result["heatmap"][1][2] == round(float(expected), 4)
+
+
+def test_uncompressed_tiff_is_read_in_place():
+    tifffile = pytest.importorskip("tifffile")
+    import io
+
+    rgb = np.dstack([textured(700, 600, seed) for seed in range(3)])
+    buffer = io.BytesIO()
+    tifffile.imwrite(buffer, rgb)
+    data = buffer.getvalue()
+
+    image = TiledImage.open(data)
+
+    assert not image.array.flags.owndata
+    np.testing.assert_array_equal(image.tile(0, 0), cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)[:512, :512])
+
+    bgr = cv2.imencode(".png", rgb[:, :, ::-1])[1].tobytes()
+    assert analyze_tiles(data, small_engine()) == analyze_tiles(bgr, small_engine())
+
+
+def test_flat_image_is_rejected():
+    flat = cv2.imencode(".png", np.full((600, 600), 7, dtype=np.uint8))[1].tobytes()
+
+    with pytest.raises(ValueError):
+        analyze_tiles(flat, small_engine())
+
+
+def test_only_tiffs_read_in_place_or_by_region_get_the_tiled_pixel_budget(tmp_path, monkeypatch):
+    tifffile = pytest.importorskip("tifffile")
+    from scripts import tiling
+
+    # Budgets scaled down: decoded images 1 MP, TIFFs read by region 4 MP
+    monkeypatch.setattr(tiling, "MAX_PIXELS", 10 ** 6)
+    monkeypatch.setattr(tiling, "MAX_TILED_PIXELS", 4 * 10 ** 6)
+
+    big = textured(1500, 1500)
+    tifffile.imwrite(tmp_path / "raw.tif", big)
+    tifffile.imwrite(tmp_path / "zlib.tif", big, compression="zlib")
+    tifffile.imwrite(tmp_path / "tiled.tif", big, compression="zlib", tile=(256, 256))
+    tifffile.imwrite(tmp_path / "deep.tif", big.astype(np.uint16), compression="zlib")
+    tifffile.imwrite(tmp_path / "huge.tif", textured(2100, 2100))
+
+    assert TiledImage.open(str(tmp_path / "raw.tif")).array.shape == (1500, 1500)
+
+    # Compressed strips and tiles are decoded chunk by chunk, same pixels
+    expected = analyze_tiles(TiledImage(big), small_engine())
+    for name in ("zlib.tif", "tiled.tif"):
+        image = TiledImage.open((tmp_path / name).read_bytes())
+        assert isinstance(image.array, tiling.TiffRegions)
+        assert analyze_tiles(image, small_engine()) == expected
+
+    # Decoded whole: PNG, 16-bit compressed TIFF, and anything past the tiled budget
+    for data in (cv2.imencode(".png", big)[1].tobytes(), (tmp_path / "deep.tif").read_bytes(), str(tmp_path / "huge.tif")):
+        with pytest.raises(ValueError, match="limit"):
+            TiledImage.open(data)
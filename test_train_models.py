@@ -0,0 +1,70 @@
+import numpy as np
+
+from scripts.train_models import row_hashes, balance, fit_final, cross_validate
+
+
+PARAMS = {"log_max_iter": 500, "rf_trees": 10, "seed": 0}
+
+
+def synthetic(n, seed):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, 6))
+    y = (X[:, 0] + 0.3 * rng.standard_normal(n) > 0).astype(np.int64)
+    return X, y
+
+
+def test_hashes_are_stable_and_balance_is_exact():
+    X, y = synthetic(300, 0)
+    hashes = row_hashes(X)
+
+    assert np.array_equal(hashes[:100], row_hashes(X[:100]))
+    assert len(np.unique(hashes)) == len(X)
+
+    # More stego than cover: stego is cut down to the cover count
+    y = (X[:, 0] > -0.5).astype(np.int64)
+    keep = balance(hashes, y)
+    assert np.sum(y[keep] == 1) == np.sum(y[keep] == 0) == np.sum(y == 0)
+
+
+def test_cross_validation_is_cached(tmp_path):
+    X, y = synthetic(200, 1)
+    hashes = row_hashes(X)
+
+    oof_log, oof_rf, folds = cross_validate(X, y, hashes, 3, PARAMS, jobs=1, cache_dir=str(tmp_path))
+    assert not any(fold["cached"] for fold in folds)
+    assert sum(fold["rows"] for fold in folds) == len(y)
+
+    again_log, again_rf, folds = cross_validate(X, y, hashes, 3, PARAMS, jobs=1, cache_dir=str(tmp_path))
+    assert all(fold["cached"] for fold in folds)
+    assert np.array_equal(oof_log, again_log) and np.array_equal(oof_rf, again_rf)
+
+
+def test_appended_rows_refresh_the_final_model(tmp_path):
+    X, y = synthetic(400, 2)
+    cache_dir = str(tmp_path)
+
+    _, info = fit_final(X[:300], y[:300], row_hashes(X[:300]), PARAMS, cache_dir)
+    assert info["mode"] == "full"
+
+    models, info = fit_final(X, y, row_hashes(X), PARAMS, cache_dir)
+    assert info["mode"] == "incremental"
+    assert info["replaced_trees"] == 3
+    assert len(models["rf_model"].estimators_) == PARAMS["rf_trees"]
+
+    _, info = fit_final(X, y, row_hashes(X), PARAMS, cache_dir)
+    assert info["mode"] == "cached"
+
+
+def test_full_refit_ignores_a_cached_incremental_model(tmp_path):
+    X, y = synthetic(400, 3)
+    cache_dir = str(tmp_path)
+
+    fit_final(X[:300], y[:300], row_hashes(X[:300]), PARAMS, cache_dir)
+    _, info = fit_final(X, y, row_hashes(X), PARAMS, cache_dir)
+    assert info["mode"] == "incremental"
+
+    _, info = fit_final(X, y, row_hashes(X), PARAMS, cache_dir, incremental=False)
+    assert info["mode"] == "full"
+
+    _, info = fit_final(X, y, row_hashes(X), PARAMS, cache_dir, incremental=False)
+    assert info["mode"] == "cached"
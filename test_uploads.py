@@ -0,0 +1,129 @@
+import asyncio
+import inspect
+import io
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from starlette.formparsers import MultiPartParser
+from starlette.requests import Request
+
+from scripts.uploads import (
+    BodySizeLimitMiddleware, UploadRequest, UploadRoute, UploadTooLarge, read_upload,
+    MAX_UPLOAD_BYTES, MAX_TILED_UPLOAD_BYTES, SPOOL_THRESHOLD
+)
+
+
+def make_app():
+    app = FastAPI()
+    app.router.route_class = UploadRoute
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=1000, path_limits={"/big": 10 ** 6})
+
+    @app.post("/small")
+    async def small(file: UploadFile = File(...)):
+        return {"size": len(await file.read()), "in_memory": file.file.name is None}
+
+    @app.post("/big")
+    async def big(file: UploadFile = File(...)):
+        return {"size": len(await file.read()), "in_memory": file.file.name is None}
+
+    return app
+
+
+def test_body_limit_rejects_declared_and_streamed_bodies():
+    client = TestClient(make_app())
+
+    assert client.post("/small", files={"file": ("a.png", b"x" * 100)}).json() == {"size": 100, "in_memory": True}
+
+    # Content-Length over the limit: refused before the body is read
+    assert client.post("/small", files={"file": ("a.png", b"x" * 5000)}).status_code == 413
+
+    # No Content-Length (chunked): refused once the stream passes the limit
+    head = b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.png"\r\n\r\n'
+
+    def chunks():
+        yield head
+        for _ in range(10):
+            yield b"y" * 500
+        yield b"\r\n--b--\r\n"
+
+    response = client.post("/small", content=chunks(), headers={"content-type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+
+    # Per-path limits
+    assert client.post("/big", files={"file": ("a.png", b"x" * 5000)}).json()["size"] == 5000
+
+
+def test_spool_threshold_is_per_app_not_global():
+    # Starlette's own default is untouched
+    assert MultiPartParser.spool_max_size == 1024 * 1024
+    assert SPOOL_THRESHOLD > 1024 * 1024
+
+    app = make_app()
+    app.user_middleware.clear()
+    size = 2 * 1024 * 1024
+    assert TestClient(app).post("/big", files={"file": ("a.png", b"x" * size)}).json() == {"size": size, "in_memory": True}
+
+    # Without UploadRoute the same upload rolls over to a temp file
+    plain = FastAPI()
+
+    @plain.post("/big")
+    async def big(file: UploadFile = File(...)):
+        return {"in_memory": file.file.name is None}
+
+    assert TestClient(plain).post("/big", files={"file": ("a.png", b"x" * size)}).json() == {"in_memory": False}
+
+
+def test_form_override_matches_starlette():
+    # UploadRequest._get_form replaces a private Starlette method: fail here,
+    # not in production, if its keywords change
+    ours = inspect.signature(UploadRequest._get_form)
+    theirs = inspect.signature(Request._get_form)
+    assert [(p.name, p.kind, p.default) for p in ours.parameters.values()] == \
+        [(p.name, p.kind, p.default) for p in theirs.parameters.values()]
+
+
+def test_oversized_uploads_keep_cors_headers():
+    import main
+
+    response = TestClient(main.app).post(
+        "/analyze/", content=b"x", headers={"origin": "http://frontend.test", "content-length": str(10 ** 12)}
+    )
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] in ("*", "http://frontend.test")
+
+
+def test_tiled_uploads_get_their_own_limit(monkeypatch):
+    import main
+
+    client = TestClient(main.app)
+    declared = {"content-length": str(MAX_UPLOAD_BYTES + 1)}
+    assert client.post("/analyze/", content=b"x", headers=declared).status_code == 413
+
+    limits = [m.kwargs["path_limits"] for m in main.app.user_middleware if m.cls is BodySizeLimitMiddleware]
+    assert limits == [{"/analyze/batch": main.MAX_BATCH_UPLOAD_BYTES, "/analyze/tiled": MAX_TILED_UPLOAD_BYTES}]
+    assert MAX_TILED_UPLOAD_BYTES > MAX_UPLOAD_BYTES
+
+    # The route reads the upload up to the tiled limit too
+    read = []
+
+    async def capture(upload, max_bytes=MAX_UPLOAD_BYTES):
+        read.append(max_bytes)
+        raise UploadTooLarge()
+
+    monkeypatch.setattr(main, "read_upload", capture)
+    assert client.post("/analyze/tiled", files={"file": ("a.tif", b"x")}).status_code == 413
+    assert read == [MAX_TILED_UPLOAD_BYTES]
+
+
+def test_read_upload_caps_bytes():
+    class Upload:
+        def __init__(self, data):
+            self.stream = io.BytesIO(data)
+
+        async def read(self, n=-1):
+            return self.stream.read(n)
+
+    assert asyncio.run(read_upload(Upload(b"abc"), max_bytes=3)) == b"abc"
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(read_upload(Upload(b"abcd"), max_bytes=3))
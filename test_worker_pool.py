@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from scripts.worker_pool import AdmissionController, Overloaded
+
+
+def test_admission_caps_in_flight_and_queued_requests():
+
+    async def run():
+        controller = AdmissionController(max_in_flight=2, max_queue=1, queue_timeout=0.2)
+        release = asyncio.Event()
+        admitted = []
+
+        async def hold():
+            async with controller.admit():
+                admitted.append(True)
+                await release.wait()
+
+        holders = [asyncio.create_task(hold()) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert controller.in_flight == 2 and len(admitted) == 2
+
+        # Third request queues, then times out waiting for a slot
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        assert controller.waiting == 1
+
+        # Fourth finds the queue full and is turned away at once
+        with pytest.raises(Overloaded) as full:
+            async with controller.admit():
+                pass
+        assert full.value.status_code == 429 and full.value.retry_after == 1
+
+        with pytest.raises(Overloaded) as timed_out:
+            await queued
+        assert timed_out.value.status_code == 503
+        assert controller.waiting == 0
+
+        # Slots come back once the holders finish
+        release.set()
+        await asyncio.gather(*holders)
+        assert controller.in_flight == 0
+
+        async with controller.admit():
+            assert controller.in_flight == 1
+
+    asyncio.run(run())
+
+
+def test_overloaded_requests_get_status_and_retry_after(monkeypatch):
+    import main
+
+    client = TestClient(main.app)
+    upload = {"file": ("a.png", b"x")}
+
+    # No slots and no queue: rejected before anything is read
+    monkeypatch.setattr(main, "admission", AdmissionController(max_in_flight=0, max_queue=0))
+    response = client.post("/analyze/?explain=none", files=upload)
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+
+    # A queue place but no slot ever frees up
+    monkeypatch.setattr(main, "admission", AdmissionController(max_in_flight=0, max_queue=1, queue_timeout=0.01))
+    response = client.post("/analyze/tiled", files=upload)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"